@@ -1,18 +1,287 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from pydantic import BaseModel
-from typing import Optional
-from pypdf import PdfReader
-import openai
-import requests
+from typing import Optional, Union
+from contextlib import asynccontextmanager
+from clients import UpstreamClients
+from cache import ResultCache, make_cache_key
+from coalesce import SingleFlight
+from extraction import ResumeTextCache, cached_resume_text, load_resume_text, parse_resume_text
+from pdf_engine import PdfExtractor
+from uploads import receive_resume_upload
+from jobqueue import JobQueue
+from job_registry import JobRegistry, diff_job_contexts
+from embeddings import EmbeddingIndex
+from compaction import Compactor, count_tokens, load_tokenizer
+from prescore import PreScorer, describe_skip, merge_missing_keywords, update_missing_keywords
+from resume_parser import ResumeParser, describe_experience_skip
+from metrics import TimingMiddleware, record_tokens, render_metrics, stage, stats_collector, usage_totals
+from router import ModelRouter
+from limiter import AdmissionController, SqliteBucketStore
+from structured import StructuredOutput
+from warmup import Warmup
+import asyncio
+import importlib
 import json
 import os
-import io
+from urllib.parse import quote
 
 load_dotenv()
 
-app = FastAPI(title="velocity-H Backend API")
+# Global Configuration
+OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", '')
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+AI_MODEL = "meta-llama/llama-3.3-70b-instruct:free"
+RESUME_DOWNLOAD_TIMEOUT = 15
+ATS_SYSTEM_PROMPT = "You are a helpful ATS assistant."
+
+# Model pool for routing and failover (AI_MODELS is comma-separated, fastest healthy model first)
+AI_MODELS = [m.strip() for m in os.getenv("AI_MODELS", AI_MODEL).split(",") if m.strip()]
+AI_REQUEST_TIMEOUT = float(os.getenv("AI_REQUEST_TIMEOUT", "60"))
+AI_HEDGE = os.getenv("AI_HEDGE", "false").lower() in ("1", "true", "yes")
+AI_HEDGE_MIN_DELAY = float(os.getenv("AI_HEDGE_MIN_DELAY", "1.0"))
+AI_MODEL_COOLDOWN = float(os.getenv("AI_MODEL_COOLDOWN", "30"))
+
+# Client-side limits for model calls (0 disables a bucket). LLM_PRIORITIES is a JSON
+# map of route -> priority, lower first; unlisted routes and queue workers get 1.
+LLM_RPM = int(os.getenv("LLM_RPM", "60"))
+LLM_TPM = int(os.getenv("LLM_TPM", "100000"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_QUEUE_SIZE = int(os.getenv("LLM_QUEUE_SIZE", "100"))
+LLM_MAX_QUEUE_WAIT = float(os.getenv("LLM_MAX_QUEUE_WAIT", "10"))
+LLM_COMPLETION_TOKEN_ESTIMATE = int(os.getenv("LLM_COMPLETION_TOKEN_ESTIMATE", "500"))
+# SQLite file holding the RPM/TPM buckets, so worker processes share one budget (see serve.py)
+LLM_LIMITER_DB = os.getenv("LLM_LIMITER_DB", '')
+# Response format requested for JSON replies: json_schema, json_object or off
+STRUCTURED_OUTPUT_MODE = os.getenv("STRUCTURED_OUTPUT_MODE", "json_schema")
+# Model prefixes whose provider only caches prompt prefixes marked with cache_control
+PROMPT_CACHE_CONTROL_MODELS = tuple(
+    m.strip() for m in os.getenv("PROMPT_CACHE_CONTROL_MODELS", "anthropic/,google/gemini").split(",") if m.strip()
+)
+
+LLM_PRIORITIES = {
+    "/api/analyze-resume": 0,
+    "/api/analyze-resume/upload": 0,
+    "/api/analyze-resumes/batch": 1,
+    "/api/analyze-resumes/batch/stream": 1,
+    "/api/generate-job-summary": 2,
+    "/api/generate-job-summary/stream": 2,
+    "/test-ai": 2,
+    **json.loads(os.getenv("LLM_PRIORITIES", "{}")),
+}
+
+# Result cache configuration (RESULT_CACHE_DB enables the on-disk SQLite tier)
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1024"))
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "86400"))
+RESULT_CACHE_DB = os.getenv("RESULT_CACHE_DB", '')
+
+# Extracted resume text cache (TEXT_CACHE_DB enables the compressed on-disk store)
+TEXT_CACHE_MAX_ENTRIES = int(os.getenv("TEXT_CACHE_MAX_ENTRIES", "512"))
+TEXT_CACHE_DB = os.getenv("TEXT_CACHE_DB", '')
+TEXT_CACHE_MAX_BYTES = int(os.getenv("TEXT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# PDF extraction limits (PDF_BACKEND is auto, pypdf or pymupdf)
+RESUME_MAX_BYTES = int(os.getenv("RESUME_MAX_BYTES", str(10 * 1024 * 1024)))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "50"))
+PDF_TIME_BUDGET = float(os.getenv("PDF_TIME_BUDGET", "10"))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "8"))
+PDF_PROCESS_WORKERS = int(os.getenv("PDF_PROCESS_WORKERS", "0")) or None
+PDF_BACKEND = os.getenv("PDF_BACKEND", "auto")
+# Uploaded resumes stay in memory up to this size, larger ones are spooled to a temp file
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(1024 * 1024)))
+
+# Batch scoring limits (shared across all in-flight batches)
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+BATCH_DOWNLOAD_CONCURRENCY = int(os.getenv("BATCH_DOWNLOAD_CONCURRENCY", "8"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+
+# Prompt compaction budgets in tokens (RESUME_TOKEN_BUDGETS is a JSON map of model -> budget)
+RESUME_TOKEN_BUDGET = int(os.getenv("RESUME_TOKEN_BUDGET", "3000"))
+RESUME_TOKEN_BUDGETS = json.loads(os.getenv("RESUME_TOKEN_BUDGETS", "{}"))
+JOB_DESCRIPTION_TOKEN_BUDGET = int(os.getenv("JOB_DESCRIPTION_TOKEN_BUDGET", "1500"))
+
+# Local keyword pre-scoring (PRESCORE_SKIP_THRESHOLD skips the LLM for weaker matches)
+PRESCORE_SKIP_THRESHOLD = float(os.getenv("PRESCORE_SKIP_THRESHOLD")) if os.getenv("PRESCORE_SKIP_THRESHOLD") else None
+
+# Resume section parsing: sections never sent to the model, and the slack allowed on required_experience_years
+RESUME_PROMPT_EXCLUDED_SECTIONS = {
+    s.strip() for s in os.getenv("RESUME_PROMPT_EXCLUDED_SECTIONS", "interests,references").split(",") if s.strip()
+}
+EXPERIENCE_TOLERANCE_YEARS = float(os.getenv("EXPERIENCE_TOLERANCE_YEARS", "1.0"))
+
+# Background analysis queue (used by /api/analyze-resume?async=true)
+JOB_QUEUE_DB = os.getenv("JOB_QUEUE_DB", "job_queue.db")
+JOB_QUEUE_WORKERS = int(os.getenv("JOB_QUEUE_WORKERS", "4"))
+JOB_QUEUE_MAX_ATTEMPTS = int(os.getenv("JOB_QUEUE_MAX_ATTEMPTS", "5"))
+
+# Registered job contexts (used by analysis requests that send a job_id)
+JOB_REGISTRY_DB = os.getenv("JOB_REGISTRY_DB", "job_registry.db")
+# Incremental re-scoring after a job edit: applicants whose local pre-score moves by more
+# than RESCORE_THRESHOLD points, or all of them when more than RESCORE_MAX_SUMMARY_CHANGE
+# of the summary's terms changed, go back to the LLM; the rest are updated locally
+RESCORE_THRESHOLD = float(os.getenv("RESCORE_THRESHOLD", "10"))
+RESCORE_MAX_SUMMARY_CHANGE = float(os.getenv("RESCORE_MAX_SUMMARY_CHANGE", "0.5"))
+
+# Applicant embedding index for ranking (EMBEDDING_BACKEND is auto, fastembed or hashing;
+# EMBEDDING_DIM only applies to the hashing encoder)
+EMBEDDING_INDEX_DIR = os.getenv("EMBEDDING_INDEX_DIR", "embedding_index")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "auto")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5")
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "512"))
+RANK_MAX_TOP_K = int(os.getenv("RANK_MAX_TOP_K", "500"))
+RANK_MAX_ANALYZE = int(os.getenv("RANK_MAX_ANALYZE", "20"))
+
+# Shared, pooled upstream clients (reused across all endpoints)
+upstream = UpstreamClients(
+    api_key=OPENROUTER_API_KEY,
+    base_url=OPENROUTER_BASE_URL,
+    download_timeout=RESUME_DOWNLOAD_TIMEOUT,
+    # With several models the router fails over instead of retrying the same one
+    max_retries=0 if len(AI_MODELS) > 1 else 2,
+)
+
+# Keeps model calls under the provider's rate limits, resume scoring first
+llm_admission = AdmissionController(
+    requests_per_minute=LLM_RPM,
+    tokens_per_minute=LLM_TPM,
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    max_queue=LLM_QUEUE_SIZE,
+    max_wait=LLM_MAX_QUEUE_WAIT,
+    priorities=LLM_PRIORITIES,
+    bucket_store=SqliteBucketStore(LLM_LIMITER_DB) if LLM_LIMITER_DB else None,
+)
+
+# JSON mode / schema support per model, reply repair and re-ask counters
+structured_output = StructuredOutput(mode=STRUCTURED_OUTPUT_MODE)
+
+# Picks a model per call from latency and error history
+model_router = ModelRouter(
+    AI_MODELS,
+    hedge=AI_HEDGE,
+    hedge_min_delay=AI_HEDGE_MIN_DELAY,
+    cooldown=AI_MODEL_COOLDOWN,
+)
+
+# Resume analysis results keyed by content, so repeats cost no tokens
+analysis_cache = ResultCache(
+    "resume_analysis",
+    max_entries=RESULT_CACHE_MAX_ENTRIES,
+    ttl=RESULT_CACHE_TTL,
+    db_path=RESULT_CACHE_DB or None,
+)
+
+# Extracted text keyed by PDF hash plus per-URL validators, so each resume is parsed once
+text_cache = ResumeTextCache(
+    max_entries=TEXT_CACHE_MAX_ENTRIES,
+    db_path=TEXT_CACHE_DB or None,
+    max_bytes=TEXT_CACHE_MAX_BYTES,
+)
+
+# Size/page/time limits for resumes, with large PDFs split across worker processes
+pdf_extractor = PdfExtractor(
+    backend=PDF_BACKEND,
+    max_bytes=RESUME_MAX_BYTES,
+    max_pages=PDF_MAX_PAGES,
+    time_budget=PDF_TIME_BUDGET,
+    parallel_min_pages=PDF_PARALLEL_MIN_PAGES,
+    workers=PDF_PROCESS_WORKERS,
+)
+
+# Whitespace/header/duplicate cleanup and section-priority trimming before prompting
+compactor = Compactor(
+    resume_budgets=RESUME_TOKEN_BUDGETS,
+    default_resume_budget=RESUME_TOKEN_BUDGET,
+    job_description_budget=JOB_DESCRIPTION_TOKEN_BUDGET,
+)
+
+# Per-job keyword indexes and BM25 pre-scoring (fixed IDF), no LLM involved
+prescorer = PreScorer(skip_threshold=PRESCORE_SKIP_THRESHOLD)
+
+# Skills, experience and education per resume, parsed once and shared across jobs
+resume_parser = ResumeParser(experience_tolerance=EXPERIENCE_TOLERANCE_YEARS)
+
+# Worker slots for the batch endpoint's download/parse and LLM stages
+batch_download_slots = asyncio.Semaphore(BATCH_DOWNLOAD_CONCURRENCY)
+batch_llm_slots = asyncio.Semaphore(BATCH_LLM_CONCURRENCY)
+
+# Identical concurrent requests and model calls share one computation
+single_flight = SingleFlight()
+
+# Durable queue for analyses that callers poll or receive by webhook, and
+# compacted job summaries, tags and keywords stored once per job. Both open
+# their SQLite files in open_job_stores(), so importing the app creates no files
+job_queue = None
+job_registry = None
+
+def open_job_stores():
+    """
+    Opens the job registry and job queue on first call. Called by lifespan,
+    and by entry points that use the pipeline without it (rescore.py).
+    """
+    global job_queue, job_registry
+    if job_registry is None:
+        job_registry = JobRegistry(JOB_REGISTRY_DB)
+        stats_collector.add("job_registry", job_registry.stats)
+    if job_queue is None:
+        job_queue = JobQueue(
+            JOB_QUEUE_DB,
+            workers=JOB_QUEUE_WORKERS,
+            max_attempts=JOB_QUEUE_MAX_ATTEMPTS,
+        )
+        stats_collector.add("job_queue", job_queue.stats)
+
+def close_job_stores():
+    global job_queue, job_registry
+    for store in (job_queue, job_registry):
+        if store is not None:
+            store.close()
+    job_queue = job_registry = None
+
+# Resume vectors per job for cosine ranking of whole applicant pools on CPU
+embedding_index = EmbeddingIndex(
+    EMBEDDING_INDEX_DIR,
+    backend=EMBEDDING_BACKEND,
+    model=EMBEDDING_MODEL,
+    dim=EMBEDDING_DIM,
+)
+
+async def warm_openrouter():
+    """Imports the OpenAI SDK off the event loop, then creates the pooled client."""
+    await run_in_threadpool(importlib.import_module, "openai")
+    if OPENROUTER_API_KEY:
+        upstream.ai
+
+# Loads left out of startup, run in the background once the app is serving
+warmup = Warmup()
+warmup.add("openrouter", warm_openrouter)
+warmup.add("pdf_backend", pdf_extractor.warm)
+warmup.add("embedding_index", embedding_index.warm)
+warmup.add("tokenizer", load_tokenizer)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await upstream.start()
+    open_job_stores()
+    await job_queue.start(
+        handlers={"resume_analysis": run_resume_analysis, "resume_reanalysis": run_resume_reanalysis},
+        webhook_client=upstream.download,
+    )
+    warmup.start()
+    yield
+    await warmup.stop()
+    await job_queue.stop()
+    await upstream.aclose()
+    close_job_stores()
+    llm_admission.close()
+    embedding_index.close()
+    analysis_cache.close()
+    text_cache.close()
+    pdf_extractor.close()
+
+app = FastAPI(title="velocity-H Backend API", lifespan=lifespan)
 
 # CORS Configuration - Allow all origins for development
 app.add_middleware(
@@ -22,20 +291,32 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
-# Global Configuration
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", '')
-AI_MODEL = "meta-llama/llama-3.3-70b-instruct:free"
+# Per-stage latency histograms and the Server-Timing response header
+app.add_middleware(TimingMiddleware)
+
+for name, source in {
+    "upstream": upstream.stats,
+    "result_cache": analysis_cache.stats,
+    "text_cache": text_cache.stats,
+    "pdf_extraction": pdf_extractor.stats,
+    "compaction": compactor.stats,
+    "llm_admission": llm_admission.stats,
+    "structured_output": structured_output.stats,
+    "prescore": prescorer.stats,
+    "resume_parser": resume_parser.stats,
+    "embedding_index": embedding_index.stats,
+    "llm_usage": usage_totals.stats,
+    "coalescing": single_flight.stats,
+    "warmup": warmup.stats,
+}.items():
+    stats_collector.add(name, source)
 
-# Initialize OpenRouter client once (reused across all endpoints)
 def get_ai_client():
-    """Get configured OpenRouter client."""
+    """Get the shared async OpenRouter client."""
     if not OPENROUTER_API_KEY:
         raise HTTPException(status_code=500, detail="OPENROUTER_API_KEY not configured")
     
-    return openai.OpenAI(
-        base_url="https://openrouter.ai/api/v1",
-        api_key=OPENROUTER_API_KEY,
-    )
+    return upstream.ai
 
 # Model
 
@@ -53,47 +334,249 @@ class JobSummaryRequest(BaseModel):
 class JobSummaryResponse(BaseModel):
     summary: str
 
+class JobContextRequest(BaseModel):
+    job_description: str
+    tags: Optional[list[str]] = None
+
+class JobContextDiff(BaseModel):
+    from_version: int
+    to_version: int
+    added_keywords: list[str]
+    removed_keywords: list[str]
+    summary_change: float
+
+class JobContextResponse(BaseModel):
+    job_id: str
+    summary: str
+    tags: list[str]
+    keywords: list[str]
+    summary_tokens: int
+    updated_at: float
+    version: int = 1
+    changed: bool = False
+    diff: Optional[JobContextDiff] = None
+
 class ResumeAnalysisRequest(BaseModel):
     resume_url: str
-    job_description: str
+    job_description: Optional[str] = None
+    job_id: Optional[str] = None
+    applicant_id: Optional[str] = None
     cover_letter: Optional[str] = None
+    callback_url: Optional[str] = None
+    job_tags: Optional[list[str]] = None
+    prescore_threshold: Optional[float] = None
+    required_experience_years: Optional[float] = None
 
 class ResumeAnalysisResponse(BaseModel):
     score: float
     summary: str
     missing_keywords: list[str]
+    prescore: Optional[float] = None
+
+class AnalysisJobResponse(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+
+class AnalysisJobStatus(BaseModel):
+    job_id: str
+    status: str
+    attempts: int
+    result: Optional[ResumeAnalysisResponse] = None
+    error: Optional[str] = None
+
+class BatchResumeItem(BaseModel):
+    resume_url: str
+    cover_letter: Optional[str] = None
+    id: Optional[str] = None
+
+class BatchResumeAnalysisRequest(BaseModel):
+    job_description: Optional[str] = None
+    job_id: Optional[str] = None
+    resumes: list[BatchResumeItem]
+    job_tags: Optional[list[str]] = None
+    prescore_threshold: Optional[float] = None
+    required_experience_years: Optional[float] = None
+
+class PreScoreRequest(BaseModel):
+    job_description: Optional[str] = None
+    job_id: Optional[str] = None
+    job_tags: Optional[list[str]] = None
+    resume_urls: list[str]
+    required_experience_years: Optional[float] = None
+
+class ResumeProfileResponse(BaseModel):
+    skills: list[str]
+    experience_years: Optional[float] = None
+    stated_experience_years: Optional[float] = None
+    total_experience_years: Optional[float] = None
+    degree: Optional[str] = None
+    education: list[str]
+    sections: list[str]
+
+class PreScoreResult(BaseModel):
+    resume_url: str
+    score: Optional[float] = None
+    matched_keywords: list[str] = []
+    missing_keywords: list[str] = []
+    profile: Optional[ResumeProfileResponse] = None
+    meets_experience: Optional[bool] = None
+    error: Optional[str] = None
+
+class PreScoreResponse(BaseModel):
+    keywords: list[str]
+    results: list[PreScoreResult]
+
+class BatchResumeResult(BaseModel):
+    id: Optional[str] = None
+    resume_url: str
+    result: Optional[ResumeAnalysisResponse] = None
+    error: Optional[str] = None
+    status_code: int = 200
+
+class BatchResumeAnalysisResponse(BaseModel):
+    results: list[BatchResumeResult]
+    succeeded: int
+    failed: int
+
+class ApplicantIndexRequest(BaseModel):
+    applicants: list[BatchResumeItem]
+
+class ApplicantIndexResponse(BaseModel):
+    indexed: int
+    unchanged: int
+    errors: list[BatchResumeResult]
+
+class RankRequest(BaseModel):
+    top_k: int = 20
+    analyze_top: int = 0
+    prescore_threshold: Optional[float] = None
+
+class RankedCandidate(BaseModel):
+    id: str
+    resume_url: str
+    similarity: float
+    result: Optional[ResumeAnalysisResponse] = None
+    error: Optional[str] = None
+    status_code: Optional[int] = None
+
+class RankResponse(BaseModel):
+    job_id: str
+    pool_size: int
+    candidates: list[RankedCandidate]
+
+class RescoreRequest(BaseModel):
+    threshold: Optional[float] = None
+    wait: bool = False
+    callback_url: Optional[str] = None
+
+class RescoreItem(BaseModel):
+    applicant_id: str
+    status: str
+    previous_score: float
+    score: Optional[float] = None
+    summary: Optional[str] = None
+    prescore_delta: Optional[float] = None
+    missing_keywords: list[str] = []
+    analysis_job_id: Optional[str] = None
+    error: Optional[str] = None
+
+class RescoreResponse(BaseModel):
+    job_id: str
+    version: int
+    diffs: list[JobContextDiff]
+    updated: int
+    reanalyzed: int
+    queued: int
+    failed: int
+    applicants: list[RescoreItem]
 
 # Helper Functions
-def get_ai_response(input_prompt):
+def build_messages(model, system_prompt, input_prompt):
+    """
+    The system message comes first and carries everything shared between
+    calls, so providers can serve it from their prompt cache. Providers that
+    only cache marked prefixes get a cache_control breakpoint after it.
+    """
+    system = {"role": "system", "content": system_prompt}
+    if model.startswith(PROMPT_CACHE_CONTROL_MODELS):
+        system["content"] = [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+    return [system, {"role": "user", "content": input_prompt}]
+
+async def get_ai_response(input_prompt, response_schema=None, system_prompt=ATS_SYSTEM_PROMPT):
     """
     Sends the prompt to OpenRouter and returns the text response.
-    Uses global AI client and model configuration.
+    The model router picks the model and fails over between them. With a
+    response_schema ({"name", "schema"}) the reply is constrained to JSON
+    as far as the chosen model supports it.
     """
     try:
         client = get_ai_client()
-        response = client.chat.completions.create(
-            model=AI_MODEL,
-            messages=[
-                {"role": "system", "content": "You are a helpful ATS assistant."},
-                {"role": "user", "content": input_prompt}
-            ],
-        )
+
+        async def create(model, response_format=None):
+            return await client.chat.completions.create(
+                model=model,
+                messages=build_messages(model, system_prompt, input_prompt),
+                timeout=AI_REQUEST_TIMEOUT,
+                **({"response_format": response_format} if response_format else {}),
+            )
+
+        async def request(model):
+            if response_schema is None:
+                return await create(model)
+            return await structured_output.create(
+                model, response_schema, lambda response_format: create(model, response_format)
+            )
+
+        async with llm_admission.slot(estimate_call_tokens(system_prompt, input_prompt)) as grant:
+            with stage("llm"):
+                response, model = await model_router.call(request)
+            grant.settle(response.usage)
+        record_tokens(model, response.usage)
         return response.choices[0].message.content, response.usage
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"OpenRouter API error: {str(e)}")
 
-def extract_pdf_text(file_bytes):
+async def stream_ai_response(input_prompt, system_prompt=ATS_SYSTEM_PROMPT):
     """
-    Extracts text from PDF file bytes.
+    Streams the model's reply as it is generated.
+    Yields (text_delta, usage); usage is only set on the final chunk.
     """
     try:
-        reader = PdfReader(io.BytesIO(file_bytes))
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text()
-        return text
+        client = get_ai_client()
+
+        async def open_stream(model):
+            return await client.chat.completions.create(
+                model=model,
+                messages=build_messages(model, system_prompt, input_prompt),
+                stream=True,
+                stream_options={"include_usage": True},
+                timeout=AI_REQUEST_TIMEOUT,
+            )
+
+        async with llm_admission.slot(estimate_call_tokens(system_prompt, input_prompt)) as grant:
+            async for chunk, model in model_router.stream(open_stream):
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if chunk.usage:
+                    grant.settle(chunk.usage)
+                    record_tokens(model, chunk.usage)
+                if delta or chunk.usage:
+                    yield delta or "", chunk.usage
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"PDF extraction error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"OpenRouter API error: {str(e)}")
+
+def estimate_call_tokens(system_prompt, input_prompt):
+    """Prompt tokens plus a typical reply, charged to the TPM budget up front."""
+    return count_tokens(system_prompt) + count_tokens(input_prompt) + LLM_COMPLETION_TOKEN_ESTIMATE
+
+def sse_event(data, event=None):
+    """Formats one server-sent event with a JSON payload."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
 
 # Prompt Template
 # input_prompt_template = """
@@ -131,21 +614,429 @@ Make it detailed enough for AI systems to accurately match and score candidate r
 Use clear, specific language that can be easily parsed for keyword matching.
 """
 
-resume_analysis_prompt_template = """
-You are an expert ATS (Applicant Tracking System) evaluator. Analyze the resume against the job description and provide:
+# Split so the job-specific part is a stable prefix: the system message holds the
+# instructions and job context, identical for every applicant to the same job, and
+# only the user message (resume and cover letter) changes between calls.
+resume_analysis_system_template = """You are a helpful ATS assistant.
+You are an expert ATS (Applicant Tracking System) evaluator. Analyze the resume in the user message against the job description below and provide:
 1. A match score (0-100) indicating how well the candidate fits the role
 2. A percentage match as string (e.g., "85%")
 3. A list of missing keywords from the job description that are not in the resume
 4. A brief analysis summary (2-3 sentences) highlighting strengths and gaps
 
+Respond in JSON format:
+{{"score": <number 0-100>, "missing_keywords": ["keyword1", "keyword2"], "summary": "<brief analysis>"}}
+
 Job Description: {job_description}
+"""
+
+resume_analysis_prompt_template = """
 Resume Text: {resume_text}
 Cover Letter: {cover_letter}
-
-Respond in JSON format:
-{{"score": <number 0-100>, "missing_keywords": ["keyword1", "keyword2"], "summary": "<brief analysis>"}}
 """
 
+# JSON schema for the reply, sent as response_format where the model supports it
+RESUME_ANALYSIS_SCHEMA = {
+    "name": "resume_analysis",
+    "schema": {
+        "type": "object",
+        "properties": {
+            "score": {"type": "number"},
+            "missing_keywords": {"type": "array", "items": {"type": "string"}},
+            "summary": {"type": "string"},
+        },
+        "required": ["score", "missing_keywords", "summary"],
+        "additionalProperties": False,
+    },
+}
+RESUME_ANALYSIS_KEYS = RESUME_ANALYSIS_SCHEMA["schema"]["required"]
+
+# Changes whenever the template text changes, invalidating cached analyses
+RESUME_ANALYSIS_PROMPT_VERSION = make_cache_key(resume_analysis_system_template, resume_analysis_prompt_template)[:12]
+
+def build_job_summary_prompt(request):
+    """Validates a JobSummaryRequest and formats the summary prompt."""
+    # Validate input
+    if not request.job_title.strip():
+        raise HTTPException(status_code=400, detail="Job title cannot be empty")
+    if not request.job_description.strip():
+        raise HTTPException(status_code=400, detail="Job description cannot be empty")
+    
+    # Format tags for better readability
+    tags_formatted = ", ".join(request.tags) if request.tags else "Not specified"
+    
+    print(f"Job details - Experience: {request.required_experience_years} years, Tags: {tags_formatted}")
+    
+    # Format prompt with all job details
+    return job_summary_prompt_template.format(
+        job_title=request.job_title,
+        job_description=request.job_description,
+        required_experience_years=request.required_experience_years,
+        tags=tags_formatted
+    )
+
+# Resume Analysis Pipeline
+# Split into a download/parse stage and an LLM stage so batch callers can
+# bound each stage with its own concurrency limit.
+def validate_resume_inputs(resume_url, job_description, job_id=None):
+    """Cheap request checks shared by the sync, batch and queued paths."""
+    # Validate inputs
+    if not resume_url.strip():
+        raise HTTPException(status_code=400, detail="Resume URL cannot be empty")
+    if job_id is None and not (job_description or "").strip():
+        raise HTTPException(status_code=400, detail="Job description cannot be empty")
+    
+    # Validate URL format
+    if not resume_url.startswith(('http://', 'https://')):
+        raise HTTPException(status_code=400, detail="Invalid resume URL format")
+
+def parse_form_tags(value):
+    """Job tags from a form field: a JSON list or a comma-separated string."""
+    if value is None or not value.strip():
+        return None
+    value = value.strip()
+    if value.startswith("["):
+        try:
+            tags = json.loads(value)
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="job_tags is not a valid JSON list")
+        if not isinstance(tags, list):
+            raise HTTPException(status_code=400, detail="job_tags must be a list")
+        return [str(tag) for tag in tags]
+    return [tag.strip() for tag in value.split(",") if tag.strip()] or None
+
+async def register_job_context(job_id, job_description, tags):
+    """
+    Compacts the job description, derives its keyword set and stores both
+    under job_id. Returns (record, changed).
+    """
+    if not job_id.strip():
+        raise HTTPException(status_code=400, detail="Job ID cannot be empty")
+    if not job_description.strip():
+        raise HTTPException(status_code=400, detail="Job description cannot be empty")
+    
+    with stage("job_register"):
+        summary, report = compactor.compact_job_description(job_description)
+        keywords = prescorer.index_for(tags, summary).keywords
+    return await run_in_threadpool(
+        job_registry.put, job_id, summary, tags or [], keywords, report["compacted_tokens"]
+    )
+
+async def load_job_context(job_id, job_description=None, job_tags=None):
+    """
+    Registered context for job_id. A request that also carries the job
+    description refreshes the registration first, so callers do not need a
+    separate PUT /api/jobs/{job_id}.
+    """
+    if job_description is not None and job_description.strip():
+        record, changed = await register_job_context(job_id, job_description, job_tags)
+        if changed:
+            print(f"Registered job {job_id} - {record['summary_tokens']} tokens, {len(record['keywords'])} keywords")
+        return record
+    with stage("job_lookup"):
+        record = await run_in_threadpool(job_registry.get, job_id)
+    if record is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Job {job_id} is not registered - PUT /api/jobs/{job_id} first or send job_description",
+        )
+    return record
+
+def collapse_whitespace(text):
+    return " ".join(text.split()) if text else text
+
+def analysis_request_key(request, job_context=None):
+    """
+    Normalized hash of a ResumeAnalysisRequest: texts compared without
+    whitespace differences, tags sorted, and a registered job by its
+    fingerprint. Keys queue deduplication and in-flight coalescing.
+    """
+    if job_context is not None:
+        job_key = (request.job_id, job_context["fingerprint"], request.applicant_id)
+    else:
+        job_key = (collapse_whitespace(request.job_description), sorted(request.job_tags or []))
+    return make_cache_key(
+        request.resume_url.strip(),
+        job_key,
+        collapse_whitespace(request.cover_letter),
+        request.prescore_threshold,
+        request.required_experience_years,
+        ",".join(AI_MODELS),
+        RESUME_ANALYSIS_PROMPT_VERSION,
+    )
+
+async def prepare_resume_analysis(resume_url, job_description, cover_letter, job_tags=None, prescore_threshold=None,
+                                  job_id=None, applicant_id=None, required_experience_years=None):
+    """
+    Validates inputs, loads the resume text, pre-scores it locally and checks
+    the result cache. Returns a dict with `result` set when no LLM call is
+    needed (cache hit or below the pre-screen threshold), otherwise with the
+    `system_prompt`, `prompt`, `cache_key` and local `prescore` for
+    complete_resume_analysis. With a job_id the registered job context
+    replaces job_description and job_tags, and the result is stored for the
+    applicant (applicant_id, else the resume URL) for later re-scoring. With
+    required_experience_years, a resume whose parsed experience clearly falls
+    short is answered locally too.
+    """
+    validate_resume_inputs(resume_url, job_description, job_id)
+    
+    job = await load_job_context(job_id) if job_id is not None else None
+    
+    print(f"Analyzing resume from: {resume_url[:50]}...")
+    
+    # Download (or revalidate) the resume and extract its text, reusing cached parses
+    resume_text = await load_resume_text(upstream.download, resume_url, text_cache, pdf_extractor)
+    
+    if not resume_text.strip():
+        raise HTTPException(status_code=400, detail="Could not extract text from resume PDF - file may be empty or corrupted")
+    
+    print(f"Extracted {len(resume_text)} characters from resume")
+    
+    return await prepare_resume_prompt(
+        resume_text, job_description, cover_letter, job_tags, prescore_threshold, job, applicant_id or resume_url,
+        required_experience_years,
+    )
+
+async def prepare_resume_prompt(resume_text, job_description, cover_letter, job_tags=None, prescore_threshold=None,
+                                job=None, applicant_id=None, required_experience_years=None):
+    """
+    Second half of prepare_resume_analysis, for callers that already have the
+    resume text: section parsing, compaction, pre-scoring, cache lookup and
+    prompt building. `job` is a registered job context, used instead of
+    job_description and job_tags; with an applicant_id as well the result is
+    recorded in the job registry.
+    """
+    # Skills, experience and education, parsed once per resume text
+    with stage("section_parse"):
+        profile = resume_parser.parse(resume_text)
+    
+    # Compact both texts to the model's token budget
+    with stage("compaction"):
+        # Budget of the smallest model in the pool, so any fallback can take the prompt
+        resume_text, resume_report = compactor.compact_resume(
+            resume_text, min(AI_MODELS, key=compactor.resume_budget), RESUME_PROMPT_EXCLUDED_SECTIONS
+        )
+        if job is None:
+            job_description, jd_report = compactor.compact_job_description(job_description)
+    if job is not None:
+        # Registered summaries are stored already compacted
+        job_description, job_tags = job["summary"], job["tags"]
+        jd_summary = f"registered job {job['job_id']} {job['summary_tokens']} tokens"
+    else:
+        jd_summary = f"job description {jd_report['original_tokens']} -> {jd_report['compacted_tokens']} tokens"
+    print(f"Compacted resume {resume_report['original_tokens']} -> {resume_report['compacted_tokens']} tokens "
+          f"(budget {resume_report['budget']}, excluded sections: {resume_report['excluded_sections'] or 'none'}, "
+          f"dropped sections: {resume_report['dropped_sections'] or 'none'}), "
+          f"{jd_summary}")
+    
+    # Deterministic keyword match against the job's tags and summary
+    with stage("prescore"):
+        prescore = prescorer.score(resume_text, prescorer.index_for(job_tags, job_description))
+    threshold = prescore_threshold if prescore_threshold is not None else prescorer.skip_threshold
+    if threshold is not None and prescore["score"] is not None and prescore["score"] < threshold:
+        prescorer.llm_skipped += 1
+        print(f"Pre-score {prescore['score']}/100 below threshold {threshold}, skipping AI analysis")
+        result = ResumeAnalysisResponse(
+            score=prescore["score"],
+            summary=describe_skip(prescore, threshold),
+            missing_keywords=prescore["missing_keywords"],
+            prescore=prescore["score"],
+        )
+        await record_job_result(job, applicant_id, resume_text, cover_letter, result)
+        return {"result": result}
+    if required_experience_years is not None and resume_parser.below_experience(profile, required_experience_years):
+        resume_parser.llm_skipped += 1
+        print(f"Parsed experience {profile.total_experience_years} years below required "
+              f"{required_experience_years}, skipping AI analysis")
+        # Keyword match scaled by the share of the required experience the resume shows
+        ratio = profile.total_experience_years / required_experience_years
+        result = ResumeAnalysisResponse(
+            score=round((prescore["score"] or 0) * ratio, 1),
+            summary=describe_experience_skip(profile, required_experience_years),
+            missing_keywords=prescore["missing_keywords"],
+            prescore=prescore["score"],
+        )
+        await record_job_result(job, applicant_id, resume_text, cover_letter, result)
+        return {"result": result}
+    
+    # Format cover letter
+    cover_letter_text = cover_letter.strip() if cover_letter else "Not provided"
+    
+    # Serve repeats (client retries, re-scoring, duplicate applications) from cache.
+    # Keyed on the compacted text, i.e. exactly what the model would see.
+    cache_key = make_cache_key(
+        resume_text,
+        job_description,
+        cover_letter_text,
+        sorted(job_tags or []),
+        ",".join(AI_MODELS),
+        RESUME_ANALYSIS_PROMPT_VERSION,
+    )
+    with stage("cache_lookup"):
+        cached = await run_in_threadpool(analysis_cache.get, cache_key)
+    if cached is not None:
+        print(f"Cache hit for resume analysis - Score: {cached['score']}/100")
+        result = ResumeAnalysisResponse(**cached)
+        await record_job_result(job, applicant_id, resume_text, cover_letter, result)
+        return {"result": result}
+    
+    # Format prompt with all data - job context in the system message, applicant in the user message
+    with stage("prompt_build"):
+        system_prompt = resume_analysis_system_template.format(job_description=job_description)
+        final_prompt = resume_analysis_prompt_template.format(
+            resume_text=resume_text,
+            cover_letter=cover_letter_text
+        )
+    return {
+        "result": None,
+        "cache_key": cache_key,
+        "system_prompt": system_prompt,
+        "prompt": final_prompt,
+        "prescore": prescore,
+        "job": job,
+        "applicant_id": applicant_id,
+        "resume_text": resume_text,
+        "cover_letter": cover_letter,
+    }
+
+async def record_job_result(job, applicant_id, resume_text, cover_letter, result):
+    """Stores an applicant's result against the job version it was scored on."""
+    if job is None or applicant_id is None:
+        return
+    await run_in_threadpool(
+        job_registry.record_result, job["job_id"], applicant_id, job["version"], resume_text, cover_letter,
+        result.model_dump(),
+    )
+
+async def complete_resume_analysis(prepared):
+    """
+    Gets the model's verdict for a prepared prompt and records it for the
+    applicant. Concurrent analyses with the same cache key (same compacted
+    resume, job and cover letter) share one model call.
+    """
+    result = await single_flight.run("resume_llm", prepared["cache_key"], lambda: call_resume_model(prepared))
+    await record_job_result(
+        prepared.get("job"), prepared.get("applicant_id"), prepared.get("resume_text"), prepared.get("cover_letter"),
+        result,
+    )
+    return result
+
+async def call_resume_model(prepared):
+    """
+    Sends the prepared prompt to the model, validates the JSON reply and caches it.
+    """
+    print("Sending to AI for analysis...")
+    
+    # Get AI response
+    response_text, usage = await get_ai_response(
+        prepared["prompt"], response_schema=RESUME_ANALYSIS_SCHEMA, system_prompt=prepared["system_prompt"]
+    )
+    
+    async def reask(prompt):
+        # Short follow-up with only the bad reply, not the resume
+        reask_text, _ = await get_ai_response(prompt, response_schema=RESUME_ANALYSIS_SCHEMA)
+        return reask_text
+    
+    # Parse JSON response, repairing it or re-asking before giving up
+    try:
+        with stage("response_parse"):
+            data = await structured_output.parse(response_text, RESUME_ANALYSIS_KEYS, reask, required=["score"])
+    except ValueError as e:
+        print(f"JSON Parse Error: {str(e)}")
+        print(f"Raw AI Response: {response_text[:500]}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"AI response was not valid JSON. Error: {str(e)}"
+        )
+    
+    # Validate and extract data with defaults
+    try:
+        score = float(str(data.get("score", 0)).strip().rstrip("%"))
+    except ValueError:
+        raise HTTPException(status_code=500, detail=f"AI returned a non-numeric score: {data.get('score')!r}")
+    missing_keywords = data.get("missing_keywords", [])
+    summary = data.get("summary", "Analysis completed successfully")
+    
+    # Validate score range
+    if not 0 <= score <= 100:
+        print(f"AI returned invalid score: {score}, clamping to 0-100")
+        score = max(0, min(100, score))
+    
+    print(f"Analysis complete - Score: {score}/100, Missing keywords: {len(missing_keywords)}")
+    
+    print(f"Token usage: {usage}")
+
+    # Add keywords the local index found missing that the model did not mention
+    prescore = prepared["prescore"]
+    missing_keywords = missing_keywords if isinstance(missing_keywords, list) else []
+    missing_keywords = merge_missing_keywords(missing_keywords, prescore["missing_keywords"])
+    
+    result = ResumeAnalysisResponse(
+        score=score,
+        missing_keywords=missing_keywords,
+        summary=summary,
+        prescore=prescore["score"],
+    )
+    await run_in_threadpool(analysis_cache.set, prepared["cache_key"], result.model_dump())
+    return result
+
+async def run_resume_analysis(resume_url, job_description, cover_letter, job_tags=None, prescore_threshold=None,
+                              job_id=None, applicant_id=None, required_experience_years=None):
+    """Full single-resume analysis: prepare, then call the model when still needed."""
+    prepared = await prepare_resume_analysis(
+        resume_url, job_description, cover_letter, job_tags, prescore_threshold, job_id, applicant_id,
+        required_experience_years,
+    )
+    if prepared["result"] is not None:
+        return prepared["result"]
+    return await complete_resume_analysis(prepared)
+
+async def run_resume_reanalysis(job_id, applicant_id, text_hash, cover_letter=None):
+    """
+    LLM re-analysis of a stored applicant after a job edit, from the resume
+    text kept in the job registry (no download, no PDF parse).
+    """
+    resume_text = await run_in_threadpool(job_registry.resume_text, text_hash)
+    if resume_text is None:
+        raise HTTPException(status_code=404, detail=f"Stored resume text for applicant {applicant_id} is gone")
+    job = await load_job_context(job_id)
+    prepared = await prepare_resume_prompt(resume_text, None, cover_letter, job=job, applicant_id=applicant_id)
+    if prepared["result"] is not None:
+        return prepared["result"]
+    return await complete_resume_analysis(prepared)
+
+def validate_batch_request(request):
+    """Rejects empty or oversized batches before any work starts."""
+    if request.job_id is None and not (request.job_description or "").strip():
+        raise HTTPException(status_code=400, detail="Job description cannot be empty")
+    if not request.resumes:
+        raise HTTPException(status_code=400, detail="Batch must contain at least one resume")
+    if len(request.resumes) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch too large - maximum is {BATCH_MAX_ITEMS} resumes")
+
+async def score_batch_item(item, request):
+    """
+    Runs one batch item through both stages under the shared worker slots.
+    Never raises - failures are reported on the returned BatchResumeResult.
+    """
+    try:
+        async with batch_download_slots:
+            prepared = await prepare_resume_analysis(
+                item.resume_url, request.job_description, item.cover_letter,
+                request.job_tags, request.prescore_threshold, request.job_id, item.id,
+                request.required_experience_years,
+            )
+        result = prepared["result"]
+        if result is None:
+            async with batch_llm_slots:
+                result = await complete_resume_analysis(prepared)
+        return BatchResumeResult(id=item.id, resume_url=item.resume_url, result=result)
+    except HTTPException as e:
+        return BatchResumeResult(id=item.id, resume_url=item.resume_url, error=str(e.detail), status_code=e.status_code)
+    except Exception as e:
+        print(f"Unexpected error in batch item: {str(e)}")
+        return BatchResumeResult(id=item.id, resume_url=item.resume_url, error=f"Resume analysis error: {str(e)}", status_code=500)
+
 # API Endpoints
 @app.get("/")
 async def root():
@@ -154,7 +1045,20 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "/evaluate": "POST - Evaluate resume against job description",
-            "/health": "GET - Health check",
+            "/api/generate-job-summary/stream": "POST - Stream a job summary as server-sent events",
+            "/api/jobs/{job_id}": "PUT/GET/DELETE - Register, read or remove a job context for analysis by job_id",
+            "/api/jobs/{job_id}/rescore": "POST - Update stored applicant results after a job edit, re-analyzing only those that moved",
+            "/api/jobs/{job_id}/applicants": "POST - Add resumes to a job's embedding index",
+            "/api/jobs/{job_id}/rank": "POST - Top-K applicants by embedding similarity, optionally AI-analyzing the best",
+            "/api/analyze-resume/upload": "POST - Analyze a resume PDF sent as multipart/form-data, no download hop",
+            "/api/analysis-jobs/{job_id}": "GET - Status and result of a queued analysis (analyze-resume?async=true)",
+            "/api/prescore": "POST - Local keyword scores for many resumes, no AI call",
+            "/api/analyze-resumes/batch": "POST - Score many resumes against one job description",
+            "/api/analyze-resumes/batch/stream": "POST - Batch scoring streamed as NDJSON, one line per finished item",
+            "/health": "GET - Liveness check, answers as soon as the process serves",
+            "/ready": "GET - Readiness check, 503 until background warm-up has finished",
+            "/stats": "GET - Connection pool, cache and queue statistics",
+            "/metrics": "GET - Prometheus metrics",
             "/test-ai": "GET - Test AI model connectivity and functionality"
         }
     }
@@ -163,6 +1067,40 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def readiness_check():
+    """503 until the OpenRouter client, PDF backend and embedding index have loaded."""
+    body = {"status": "ready" if warmup.ready else "warming_up", **warmup.stats()}
+    return JSONResponse(body, status_code=200 if warmup.ready else 503)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: stage latency histograms, token and error counters, cache/queue gauges."""
+    body, content_type = await run_in_threadpool(render_metrics)
+    return Response(content=body, media_type=content_type)
+
+@app.get("/stats")
+async def stats():
+    """Connection pool, cache and queue statistics."""
+    return {
+        "upstream": upstream.stats(),
+        "models": model_router.stats(),
+        "llm_admission": llm_admission.stats(),
+        "structured_output": structured_output.stats(),
+        "result_cache": analysis_cache.stats(),
+        "text_cache": text_cache.stats(),
+        "pdf_extraction": pdf_extractor.stats(),
+        "compaction": compactor.stats(),
+        "prescore": prescorer.stats(),
+        "resume_parser": resume_parser.stats(),
+        "llm_usage": usage_totals.stats(),
+        "job_registry": await run_in_threadpool(job_registry.stats),
+        "embedding_index": embedding_index.stats(),
+        "job_queue": await run_in_threadpool(job_queue.stats),
+        "coalescing": single_flight.stats(),
+        "warmup": warmup.stats(),
+    }
+
 @app.get("/test-ai")
 async def test_ai():
     """
@@ -171,13 +1109,13 @@ async def test_ai():
     """
     try:
         print("Testing AI connection...")
-        print(f"Testing model: {AI_MODEL}")
+        print(f"Testing models: {', '.join(AI_MODELS)}")
         
         # Test prompt
         test_prompt = "Say 'Hello! AI is working correctly.' in technical terms."
         
         # Get AI response
-        response_text, usage = get_ai_response(test_prompt)
+        response_text, usage = await get_ai_response(test_prompt)
         
         print(f"AI test successful - token used - Input: {usage.prompt_tokens}, Output: {usage.completion_tokens}")
         
@@ -210,6 +1148,23 @@ async def test_ai():
             "error_type": type(e).__name__
         }
 
+async def complete_job_summary(final_prompt):
+    """Sends a job summary prompt to the model and returns the cleaned summary."""
+    print(f"Sending to AI (prompt length: {len(final_prompt)} chars)...")
+    
+    # Get AI response
+    response_text, usage = await get_ai_response(final_prompt)
+    
+    print(f"Token Utililized - Input: {usage.prompt_tokens}, Output: {usage.completion_tokens}") 
+    
+    # Clean and validate response
+    summary = response_text.strip()
+    
+    if not summary:
+        print("AI returned empty summary")
+        raise HTTPException(status_code=500, detail="AI generated empty summary")
+    return summary
+
 @app.post("/api/generate-job-summary", response_model=JobSummaryResponse)
 async def generate_job_summary(request: JobSummaryRequest):
     """
@@ -227,39 +1182,15 @@ async def generate_job_summary(request: JobSummaryRequest):
     try:
         print(f"Generating job summary for: {request.job_title}")
         
-        # Validate input
-        if not request.job_title.strip():
-            raise HTTPException(status_code=400, detail="Job title cannot be empty")
-        if not request.job_description.strip():
-            raise HTTPException(status_code=400, detail="Job description cannot be empty")
-        
-        # Format tags for better readability
-        tags_formatted = ", ".join(request.tags) if request.tags else "Not specified"
-        
-        print(f"Job details - Experience: {request.required_experience_years} years, Tags: {tags_formatted}")
+        final_prompt = build_job_summary_prompt(request)
         
-        # Format prompt with all job details
-        final_prompt = job_summary_prompt_template.format(
-            job_title=request.job_title,
-            job_description=request.job_description,
-            required_experience_years=request.required_experience_years,
-            tags=tags_formatted
+        # Identical summaries requested at the same time share one model call
+        summary = await single_flight.run(
+            "job_summary",
+            make_cache_key(collapse_whitespace(final_prompt), ",".join(AI_MODELS)),
+            lambda: complete_job_summary(final_prompt),
         )
         
-        print(f"Sending to AI (prompt length: {len(final_prompt)} chars)...")
-        
-        # Get AI response
-        response_text, usage = get_ai_response(final_prompt)
-        
-        print(f"Token Utililized - Input: {usage.prompt_tokens}, Output: {usage.completion_tokens}") 
-        
-        # Clean and validate response
-        summary = response_text.strip()
-        
-        if not summary:
-            print("AI returned empty summary")
-            raise HTTPException(status_code=500, detail="AI generated empty summary")
-        
         # Log successful generation for monitoring
         print(f"Generated summary for job: {request.job_title}")
         
@@ -273,124 +1204,546 @@ async def generate_job_summary(request: JobSummaryRequest):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Summary generation error: {str(e)}")
 
-@app.post("/api/analyze-resume", response_model=ResumeAnalysisResponse)
-async def analyze_resume(request: ResumeAnalysisRequest):
+@app.post("/api/generate-job-summary/stream")
+async def generate_job_summary_stream(request: JobSummaryRequest):
+    """
+    Streaming variant of /api/generate-job-summary (Server-Sent Events).
+    
+    Emits `data: {"delta": "..."}` events as tokens arrive, then one
+    `event: done` with the full `summary`, or `event: error` with `detail`.
+    Validation errors are still returned as regular 400 responses.
+    """
+    print(f"Streaming job summary for: {request.job_title}")
+    final_prompt = build_job_summary_prompt(request)
+    
+    async def events():
+        parts = []
+        try:
+            async for delta, usage in stream_ai_response(final_prompt):
+                if delta:
+                    parts.append(delta)
+                    yield sse_event({"delta": delta})
+                if usage:
+                    print(f"Token Utililized - Input: {usage.prompt_tokens}, Output: {usage.completion_tokens}")
+            summary = "".join(parts).strip()
+            if not summary:
+                print("AI returned empty summary")
+                yield sse_event({"detail": "AI generated empty summary"}, event="error")
+                return
+            print(f"Generated summary for job: {request.job_title}")
+            yield sse_event({"summary": summary}, event="done")
+        except HTTPException as e:
+            retry_after = (e.headers or {}).get("Retry-After")
+            yield sse_event({"detail": e.detail, "status_code": e.status_code, "retry_after": retry_after}, event="error")
+        except Exception as e:
+            print(f"Error streaming job summary: {type(e).__name__}: {str(e)}")
+            yield sse_event({"detail": f"Summary generation error: {str(e)}"}, event="error")
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.put("/api/jobs/{job_id}", response_model=JobContextResponse)
+async def register_job(job_id: str, request: JobContextRequest):
+    """
+    Register (or update) a job's context once, so analysis requests can send
+    `job_id` instead of the full job description.
+    
+    - **job_description**: The job description or AI-generated summary
+    - **tags**: Optional job tags, used as required keywords for pre-scoring
+    
+    The description is compacted and its keyword set derived here, once.
+    `changed` is false when the stored context was already identical. An
+    edit bumps `version`, and `diff` lists the keywords added and removed;
+    `POST /api/jobs/{job_id}/rescore` then brings existing applicants up to date.
+    """
+    record, changed = await register_job_context(job_id, request.job_description, request.tags)
+    print(f"Job {job_id} {'registered' if changed else 'unchanged'} - {record['summary_tokens']} tokens")
+    diff = None
+    if changed and record["version"] > 1:
+        previous = await run_in_threadpool(job_registry.get_version, job_id, record["version"] - 1)
+        if previous is not None:
+            diff = diff_job_contexts(previous, record)
+    return JobContextResponse(**{k: v for k, v in record.items() if k != "fingerprint"}, changed=changed, diff=diff)
+
+@app.get("/api/jobs/{job_id}", response_model=JobContextResponse)
+async def get_job(job_id: str):
+    """Registered context of a job: compacted summary, tags and keyword set."""
+    record = await load_job_context(job_id)
+    return JobContextResponse(**{k: v for k, v in record.items() if k != "fingerprint"})
+
+@app.delete("/api/jobs/{job_id}", status_code=204)
+async def delete_job(job_id: str):
+    """Forget a job's context and indexed applicants (e.g. when the posting is closed)."""
+    if not await run_in_threadpool(job_registry.delete, job_id):
+        raise HTTPException(status_code=404, detail=f"Job {job_id} is not registered")
+    await run_in_threadpool(embedding_index.remove_job, job_id)
+    return Response(status_code=204)
+
+@app.post("/api/jobs/{job_id}/rescore", response_model=RescoreResponse)
+async def rescore_job(job_id: str, request: RescoreRequest):
+    """
+    Bring stored applicant results up to date after the job was edited.
+
+    - **threshold**: Pre-score points an applicant may move before the LLM re-analyzes
+      them (default RESCORE_THRESHOLD)
+    - **wait**: Re-analyze inline and return the new results, instead of queueing
+    - **callback_url**: Webhook for each queued re-analysis (see `/api/analysis-jobs/{job_id}`);
+      `{applicant_id}` in it is replaced with the applicant's id
+
+    Only applicants scored on an earlier version are touched. Each one is
+    pre-scored locally against the old and the new keyword set. If the score
+    moves by at most `threshold` points, `missing_keywords` is updated in place
+    and the LLM score is kept (`updated`). Otherwise the applicant is
+    re-analyzed from its stored resume text (`queued`, or `reanalyzed` with
+    `wait`). The same happens to everyone when most of the summary was rewritten.
+    """
+    job = await load_job_context(job_id)
+    threshold = request.threshold if request.threshold is not None else RESCORE_THRESHOLD
+    stale = await run_in_threadpool(job_registry.results, job_id, job["version"])
+    new_index = prescorer.index_for(job["tags"], job["summary"])
+
+    versions = {}
+    items = []
+    reanalyze = []
+    for entry in stale:
+        if entry["version"] not in versions:
+            previous = await run_in_threadpool(job_registry.get_version, job_id, entry["version"])
+            versions[entry["version"]] = (previous, diff_job_contexts(previous, job) if previous else None)
+        previous, diff = versions[entry["version"]]
+        result = entry["result"]
+        item = RescoreItem(applicant_id=entry["applicant_id"], status="queued", previous_score=result["score"])
+        items.append(item)
+        if diff is None or diff["summary_change"] > RESCORE_MAX_SUMMARY_CHANGE:
+            reanalyze.append((entry, item))
+            continue
+
+        resume_text = await run_in_threadpool(job_registry.resume_text, entry["text_hash"])
+        if resume_text is None:
+            # No stored text to pre-score; re-analysis reports it per applicant
+            reanalyze.append((entry, item))
+            continue
+        with stage("prescore"):
+            before = prescorer.score(resume_text, prescorer.index_for(previous["tags"], previous["summary"]))
+            after = prescorer.score(resume_text, new_index)
+        item.prescore_delta = round((after["score"] or 0.0) - (before["score"] or 0.0), 1)
+        if abs(item.prescore_delta) > threshold:
+            reanalyze.append((entry, item))
+            continue
+
+        updated = ResumeAnalysisResponse(
+            score=result["score"],
+            summary=result["summary"],
+            missing_keywords=update_missing_keywords(result["missing_keywords"], diff["removed_keywords"], after),
+            prescore=after["score"],
+        )
+        await record_job_result(job, entry["applicant_id"], resume_text, entry["cover_letter"], updated)
+        item.status, item.score, item.summary = "updated", updated.score, updated.summary
+        item.missing_keywords = updated.missing_keywords
+
+    async def reanalyze_one(entry, item):
+        try:
+            async with batch_llm_slots:
+                result = await run_resume_reanalysis(
+                    job_id, entry["applicant_id"], entry["text_hash"], entry["cover_letter"]
+                )
+            item.status, item.score, item.summary = "reanalyzed", result.score, result.summary
+            item.missing_keywords = result.missing_keywords
+        except HTTPException as e:
+            item.status, item.error = "failed", str(e.detail)
+        except Exception as e:
+            print(f"Unexpected error re-analyzing applicant {entry['applicant_id']}: {str(e)}")
+            item.status, item.error = "failed", f"Resume analysis error: {str(e)}"
+
+    if request.wait:
+        await asyncio.gather(*(reanalyze_one(entry, item) for entry, item in reanalyze))
+    else:
+        for entry, item in reanalyze:
+            payload = {
+                "job_id": job_id,
+                "applicant_id": entry["applicant_id"],
+                "text_hash": entry["text_hash"],
+                "cover_letter": entry["cover_letter"],
+            }
+            input_hash = make_cache_key(
+                "resume_reanalysis", job_id, job["fingerprint"], entry["applicant_id"], entry["text_hash"],
+                ",".join(AI_MODELS), RESUME_ANALYSIS_PROMPT_VERSION,
+            )
+            callback_url = request.callback_url
+            if callback_url:
+                callback_url = callback_url.replace("{applicant_id}", quote(entry["applicant_id"], safe=""))
+            item.analysis_job_id = await run_in_threadpool(
+                job_queue.enqueue, "resume_reanalysis", payload, input_hash, callback_url
+            )
+
+    counts = {status: sum(item.status == status for item in items)
+              for status in ("updated", "reanalyzed", "queued", "failed")}
+    print(f"Re-scored job {job_id} v{job['version']}: {len(items)} stale applicants, {counts}")
+    return RescoreResponse(
+        job_id=job_id,
+        version=job["version"],
+        diffs=[diff for _, diff in versions.values() if diff is not None],
+        applicants=items,
+        **counts,
+    )
+
+@app.post("/api/jobs/{job_id}/applicants", response_model=ApplicantIndexResponse)
+async def index_applicants(job_id: str, request: ApplicantIndexRequest):
+    """
+    Add resumes to a registered job's embedding index, for /api/jobs/{job_id}/rank.
+    
+    - **applicants**: List of `{resume_url, cover_letter, id}` items; `id` (default: the URL)
+      identifies the applicant in rankings, and re-sending it replaces the entry
+    
+    Resumes are downloaded and parsed like batch items (sharing the text cache),
+    then embedded on CPU. Unchanged resumes are not re-embedded. Without fastembed
+    installed the encoder is lexical feature hashing, not a semantic model; the
+    active one is `embedding_index.backend` in /stats.
+    """
+    await load_job_context(job_id)
+    if not request.applicants:
+        raise HTTPException(status_code=400, detail="At least one applicant is required")
+    if len(request.applicants) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Too many applicants - maximum is {BATCH_MAX_ITEMS}")
+    
+    async def load(item):
+        try:
+            validate_resume_inputs(item.resume_url, None, job_id)
+            async with batch_download_slots:
+                text = await load_resume_text(upstream.download, item.resume_url, text_cache, pdf_extractor)
+            if not text.strip():
+                raise HTTPException(status_code=400, detail="Could not extract text from resume PDF")
+            return {"id": item.id or item.resume_url, "resume_url": item.resume_url,
+                    "cover_letter": item.cover_letter, "text": text}, None
+        except HTTPException as e:
+            return None, BatchResumeResult(
+                id=item.id, resume_url=item.resume_url, error=str(e.detail), status_code=e.status_code
+            )
+    
+    loaded = await asyncio.gather(*(load(item) for item in request.applicants))
+    items = [item for item, _ in loaded if item is not None]
+    indexed = 0
+    if items:
+        with stage("embedding"):
+            indexed = await run_in_threadpool(embedding_index.add, job_id, items)
+    print(f"Indexed {indexed} resumes for job {job_id} ({len(items) - indexed} unchanged)")
+    return ApplicantIndexResponse(
+        indexed=indexed,
+        unchanged=len(items) - indexed,
+        errors=[error for _, error in loaded if error is not None],
+    )
+
+@app.post("/api/jobs/{job_id}/rank", response_model=RankResponse)
+async def rank_applicants(job_id: str, request: RankRequest):
+    """
+    Rank a job's indexed applicants by cosine similarity to the job.
+    With the default hashing encoder (no fastembed installed) this ranks by
+    keyword overlap, not meaning; see `embedding_index.backend` in /stats.
+    
+    - **top_k**: Number of candidates to return (max RANK_MAX_TOP_K)
+    - **analyze_top**: Run the full AI analysis on this many of the best candidates
+      (max RANK_MAX_ANALYZE); the rest of the pool costs no tokens
+    - **prescore_threshold**: Optional override of PRESCORE_SKIP_THRESHOLD for those analyses
+    """
+    job = await load_job_context(job_id)
+    if not 1 <= request.top_k <= RANK_MAX_TOP_K:
+        raise HTTPException(status_code=400, detail=f"top_k must be between 1 and {RANK_MAX_TOP_K}")
+    if not 0 <= request.analyze_top <= min(request.top_k, RANK_MAX_ANALYZE):
+        raise HTTPException(
+            status_code=400, detail=f"analyze_top must be between 0 and min(top_k, {RANK_MAX_ANALYZE})"
+        )
+    
+    with stage("embedding_rank"):
+        candidates, pool_size = await run_in_threadpool(
+            embedding_index.rank, job_id, " ".join([job["summary"], *job["tags"]]), request.top_k
+        )
+    ranked = [
+        RankedCandidate(id=c["id"], resume_url=c["resume_url"], similarity=c["similarity"]) for c in candidates
+    ]
+    
+    if request.analyze_top:
+        print(f"Analyzing top {request.analyze_top} of {pool_size} applicants for job {job_id}...")
+        analysis = BatchResumeAnalysisRequest(job_id=job_id, resumes=[], prescore_threshold=request.prescore_threshold)
+        items = [
+            BatchResumeItem(id=c["id"], resume_url=c["resume_url"], cover_letter=c["cover_letter"])
+            for c in candidates[:request.analyze_top]
+        ]
+        results = await asyncio.gather(*(score_batch_item(item, analysis) for item in items))
+        for candidate, result in zip(ranked, results):
+            candidate.result = result.result
+            if result.error is not None:
+                candidate.error, candidate.status_code = result.error, result.status_code
+    
+    return RankResponse(job_id=job_id, pool_size=pool_size, candidates=ranked)
+
+@app.post("/api/analyze-resume", response_model=Union[ResumeAnalysisResponse, AnalysisJobResponse])
+async def analyze_resume(
+    request: ResumeAnalysisRequest,
+    response: Response,
+    async_mode: bool = Query(False, alias="async", description="Queue the analysis and return a job ID immediately"),
+):
     """
     Analyze a resume against a job description using AI-powered ATS evaluation.
     
     - **resume_url**: URL of the resume PDF file (must be publicly accessible)
     - **job_description**: The job description or AI-generated summary to match against
+    - **job_id**: Registered job to match against instead (see `/api/jobs/{job_id}`);
+      sent together with job_description it registers or refreshes that job
+    - **applicant_id**: Optional key the result is stored under for re-scoring after
+      job edits (job_id requests only; defaults to resume_url)
     - **cover_letter**: Optional cover letter or additional details from applicant
+    - **callback_url**: Optional webhook that receives the finished job (async mode only)
+    - **job_tags**: Optional job tags, used as required keywords for local pre-scoring
+    - **prescore_threshold**: Optional override of PRESCORE_SKIP_THRESHOLD for this request
+    - **required_experience_years**: Optional; a resume whose experience (computed from its
+      date ranges or stated) is more than EXPERIENCE_TOLERANCE_YEARS short is scored locally
     
     Returns:
     - **score**: Match score (0-100) indicating candidate fit
     - **missing_keywords**: List of required skills/keywords not found in resume
     - **summary**: Brief analysis highlighting strengths and gaps
+    - **prescore**: Local keyword match score (0-100) computed without the LLM
+    
+    With `?async=true` the request is queued instead and answered with 202 and a
+    `job_id`; poll `/api/analysis-jobs/{job_id}` or wait for the webhook.
+    Identical pending or finished requests return the existing job.
     """
     try:
-        # Validate inputs
-        if not request.resume_url.strip():
-            raise HTTPException(status_code=400, detail="Resume URL cannot be empty")
-        if not request.job_description.strip():
-            raise HTTPException(status_code=400, detail="Job description cannot be empty")
-        
-        # Validate URL format
-        if not request.resume_url.startswith(('http://', 'https://')):
-            raise HTTPException(status_code=400, detail="Invalid resume URL format")
-        
-        print(f"Analyzing resume from: {request.resume_url[:50]}...")
+        validate_resume_inputs(request.resume_url, request.job_description, request.job_id)
+        job_context = None
+        if request.job_id is not None:
+            job_context = await load_job_context(request.job_id, request.job_description, request.job_tags)
         
-        # Download resume from URL with error handling
-        try:
-            resume_response = requests.get(
-                request.resume_url, 
-                timeout=15,
-                headers={'User-Agent': 'Mozilla/5.0'}  # Some CDNs require user agent
+        if async_mode:
+            if job_context is not None:
+                # Workers read the registered context; the job text itself is not queued
+                payload = {
+                    "job_description": None, "job_tags": None, "job_id": request.job_id,
+                    "applicant_id": request.applicant_id,
+                }
+            else:
+                payload = {"job_description": request.job_description, "job_tags": request.job_tags}
+            payload.update({
+                "resume_url": request.resume_url,
+                "cover_letter": request.cover_letter,
+                "prescore_threshold": request.prescore_threshold,
+                "required_experience_years": request.required_experience_years,
+            })
+            job_id = await run_in_threadpool(
+                job_queue.enqueue, "resume_analysis", payload, analysis_request_key(request, job_context),
+                request.callback_url,
             )
-            resume_response.raise_for_status()
-        except requests.Timeout:
-            raise HTTPException(status_code=408, detail="Resume download timeout - file may be too large or server slow")
-        except requests.RequestException as e:
-            raise HTTPException(status_code=400, detail=f"Could not download resume: {str(e)}")
-        
-        # Validate content type
-        content_type = resume_response.headers.get('content-type', '')
-        if 'pdf' not in content_type.lower() and not request.resume_url.lower().endswith('.pdf'):
-            print(f"Warning: Content-Type is '{content_type}', proceeding anyway")
-        
-        # Extract text from PDF
-        resume_text = extract_pdf_text(resume_response.content)
-        
-        if not resume_text.strip():
-            raise HTTPException(status_code=400, detail="Could not extract text from resume PDF - file may be empty or corrupted")
+            job = await run_in_threadpool(job_queue.get, job_id)
+            print(f"Queued resume analysis job {job_id} ({job['status']})")
+            response.status_code = 202
+            return AnalysisJobResponse(job_id=job_id, status=job["status"], status_url=f"/api/analysis-jobs/{job_id}")
         
-        print(f"Extracted {len(resume_text)} characters from resume")
-        
-        # # Prepare resume text with smart truncation
-        # max_resume_chars = 3500
-        # if len(resume_text) > max_resume_chars:
-        #     # Keep beginning and end, truncate middle
-        #     truncated_text = resume_text[:max_resume_chars]
-        #     print(f"⚠️  Resume truncated from {len(resume_text)} to {max_resume_chars} chars")
-        # else:
-        #     truncated_text = resume_text
-        
-        # Format cover letter
-        cover_letter_text = request.cover_letter.strip() if request.cover_letter else "Not provided"
-        
-        # Format prompt with all data
-        final_prompt = resume_analysis_prompt_template.format(
-            job_description=request.job_description,
-            resume_text=resume_text,
-            cover_letter=cover_letter_text
+        # Double-clicks and retries of a running analysis wait for it instead of starting another
+        return await single_flight.run(
+            "resume_analysis",
+            analysis_request_key(request, job_context),
+            lambda: run_resume_analysis(
+                request.resume_url,
+                request.job_description,
+                request.cover_letter,
+                request.job_tags,
+                request.prescore_threshold,
+                request.job_id,
+                request.applicant_id,
+                request.required_experience_years,
+            ),
         )
         
-        print("Sending to AI for analysis...")
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Unexpected error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Resume analysis error: {str(e)}")
+
+@app.post("/api/analyze-resume/upload", response_model=ResumeAnalysisResponse)
+async def analyze_resume_upload(request: Request):
+    """
+    Analyze an uploaded resume PDF, for callers that already hold the file.
+    Skips the download round trip of `/api/analyze-resume`.
+    
+    multipart/form-data fields:
+    - **resume**: The resume PDF (at most RESUME_MAX_BYTES)
+    - **job_description**, **job_id**, **applicant_id**, **cover_letter**, **prescore_threshold**,
+      **required_experience_years**: As in `/api/analyze-resume` (applicant_id defaults to the PDF's SHA-256)
+    - **job_tags**: JSON list or comma-separated tags
+    
+    The body is parsed as it streams in and the PDF is hashed on the way,
+    so a resume whose text is already cached is not parsed again.
+    """
+    upload = None
+    try:
+        fields, upload = await receive_resume_upload(request, RESUME_MAX_BYTES, UPLOAD_SPOOL_BYTES)
+        job_description = fields.get("job_description") or None
+        job_id = fields.get("job_id") or None
+        job_tags = parse_form_tags(fields.get("job_tags"))
+        if job_id is None and not (job_description or "").strip():
+            raise HTTPException(status_code=400, detail="Job description cannot be empty")
+        numbers = {}
+        for name in ("prescore_threshold", "required_experience_years"):
+            try:
+                value = fields.get(name, "").strip()
+                numbers[name] = float(value) if value else None
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"{name} must be a number")
         
-        # Get AI response
-        response_text, usage = get_ai_response(final_prompt)
+        job = await load_job_context(job_id, job_description, job_tags) if job_id is not None else None
         
-        # Parse JSON response with better error handling
-        try:
-            clean_json = response_text.replace("```json", "").replace("```", "").strip()
-            # Remove any markdown formatting
-            if clean_json.startswith('```'):
-                clean_json = '\n'.join(clean_json.split('\n')[1:-1])
-            
-            data = json.loads(clean_json)
-        except json.JSONDecodeError as e:
-            print(f"JSON Parse Error: {str(e)}")
-            print(f"Raw AI Response: {response_text[:500]}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"AI response was not valid JSON. Error: {str(e)}"
-            )
+        print(f"Analyzing uploaded resume {upload.filename or '(unnamed)'} ({upload.size} bytes)")
         
-        # Validate and extract data with defaults
-        score = float(data.get("score", 0))
-        missing_keywords = data.get("missing_keywords", [])
-        summary = data.get("summary", "Analysis completed successfully")
+        resume_text = await cached_resume_text(upload.sha256, text_cache)
+        if resume_text is None:
+            file_bytes = await run_in_threadpool(upload.read)
+            resume_text = await parse_resume_text(file_bytes, upload.sha256, text_cache, pdf_extractor)
         
-        # Validate score range
-        if not 0 <= score <= 100:
-            print(f"AI returned invalid score: {score}, clamping to 0-100")
-            score = max(0, min(100, score))
+        if not resume_text.strip():
+            raise HTTPException(status_code=400, detail="Could not extract text from resume PDF - file may be empty or corrupted")
         
-        print(f"Analysis complete - Score: {score}/100, Missing keywords: {len(missing_keywords)}")
+        print(f"Extracted {len(resume_text)} characters from resume")
         
-        print(f"Token usage: {usage}")
-
-        return ResumeAnalysisResponse(
-            score=score,
-            missing_keywords=missing_keywords if isinstance(missing_keywords, list) else [],
-            summary=summary
+        prepared = await prepare_resume_prompt(
+            resume_text, job_description, fields.get("cover_letter"), job_tags, numbers["prescore_threshold"], job,
+            fields.get("applicant_id") or f"sha256:{upload.sha256}", numbers["required_experience_years"],
         )
+        if prepared["result"] is not None:
+            return prepared["result"]
+        return await complete_resume_analysis(prepared)
         
     except HTTPException:
         raise
     except Exception as e:
         print(f"Unexpected error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Resume analysis error: {str(e)}")
+    finally:
+        if upload is not None:
+            upload.close()
+
+@app.get("/api/analysis-jobs/{job_id}", response_model=AnalysisJobStatus)
+async def get_analysis_job(job_id: str):
+    """
+    Status of a queued resume analysis (queued, running, succeeded or failed).
+    `result` is set once the job has succeeded.
+    """
+    job = await run_in_threadpool(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Analysis job not found")
+    return AnalysisJobStatus(**{k: job[k] for k in ("job_id", "status", "attempts", "result", "error")})
+
+@app.post("/api/prescore", response_model=PreScoreResponse)
+async def prescore_resumes(request: PreScoreRequest):
+    """
+    Deterministic keyword scoring of many resumes against one job, no AI call.
+    
+    - **job_description**: Job description or AI-generated summary (skill terms are extracted from it)
+    - **job_tags**: Job tags, weighted as required keywords
+    - **job_id**: Registered job to use instead of job_description and job_tags
+    - **resume_urls**: Resume PDF URLs
+    - **required_experience_years**: Optional; sets `meets_experience` per resume
+    
+    Returns the job's keyword set and, per resume, a BM25-based score (0-100)
+    with matched and missing keywords, and the parsed profile (skills,
+    experience computed from the resume's dates, education). Profiles are
+    cached by resume text, so scoring the same pool against another job
+    parses nothing again.
+    """
+    if request.job_id is None and not (request.job_description or "").strip():
+        raise HTTPException(status_code=400, detail="Job description cannot be empty")
+    if not request.resume_urls:
+        raise HTTPException(status_code=400, detail="At least one resume URL is required")
+    if len(request.resume_urls) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Too many resumes - maximum is {BATCH_MAX_ITEMS}")
+    
+    job_description, job_tags = request.job_description, request.job_tags
+    if request.job_id is not None:
+        job_context = await load_job_context(request.job_id, request.job_description, request.job_tags)
+        job_description, job_tags = job_context["summary"], job_context["tags"]
+    
+    async def load(resume_url):
+        try:
+            validate_resume_inputs(resume_url, job_description)
+            async with batch_download_slots:
+                return await load_resume_text(upstream.download, resume_url, text_cache, pdf_extractor), None
+        except HTTPException as e:
+            return None, str(e.detail)
+    
+    loaded = await asyncio.gather(*(load(url) for url in request.resume_urls))
+    index = prescorer.index_for(job_tags, job_description)
+    texts = [text for text, error in loaded if error is None]
+    scores = iter(prescorer.score_many(texts, index) if texts else [])
+    
+    results = []
+    for resume_url, (text, error) in zip(request.resume_urls, loaded):
+        if error is not None:
+            results.append(PreScoreResult(resume_url=resume_url, error=error))
+            continue
+        with stage("section_parse"):
+            profile = resume_parser.parse(text)
+        results.append(PreScoreResult(
+            resume_url=resume_url,
+            **next(scores),
+            profile=profile.to_dict(),
+            meets_experience=profile.meets_experience(request.required_experience_years, EXPERIENCE_TOLERANCE_YEARS),
+        ))
+    return PreScoreResponse(keywords=index.keywords, results=results)
+
+@app.post("/api/analyze-resumes/batch", response_model=BatchResumeAnalysisResponse)
+async def analyze_resumes_batch(request: BatchResumeAnalysisRequest):
+    """
+    Score many resumes against one job description in a single round trip.
+    
+    - **job_description**: The job description or AI-generated summary to match against
+    - **job_id**: Registered job to match against instead (registered or refreshed when job_description is sent too)
+    - **resumes**: List of `{resume_url, cover_letter, id}` items; `id` is echoed back
+    
+    Downloads and parsing run concurrently (BATCH_DOWNLOAD_CONCURRENCY) and model
+    calls run under their own limit (BATCH_LLM_CONCURRENCY), so the batch takes
+    roughly as long as its slowest item. Each item reports its own result or error.
+    """
+    validate_batch_request(request)
+    if request.job_id is not None:
+        await load_job_context(request.job_id, request.job_description, request.job_tags)
+    
+    print(f"Batch analysis of {len(request.resumes)} resumes...")
+    
+    results = await asyncio.gather(*(score_batch_item(item, request) for item in request.resumes))
+    failed = sum(1 for r in results if r.error is not None)
+    
+    print(f"Batch complete - {len(results) - failed} succeeded, {failed} failed")
+    
+    return BatchResumeAnalysisResponse(results=results, succeeded=len(results) - failed, failed=failed)
+
+@app.post("/api/analyze-resumes/batch/stream")
+async def analyze_resumes_batch_stream(request: BatchResumeAnalysisRequest):
+    """
+    Streaming variant of /api/analyze-resumes/batch (NDJSON).
+    
+    Writes one BatchResumeResult JSON object per line as soon as that item
+    finishes, in completion order - use `id` to match results to inputs.
+    """
+    validate_batch_request(request)
+    if request.job_id is not None:
+        await load_job_context(request.job_id, request.job_description, request.job_tags)
+    
+    print(f"Streaming batch analysis of {len(request.resumes)} resumes...")
+    
+    async def lines():
+        tasks = [asyncio.create_task(score_batch_item(item, request)) for item in request.resumes]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                yield result.model_dump_json() + "\n"
+        finally:
+            # Client went away - stop the remaining work
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 # @app.post("/evaluate", response_model=ResumeEvaluationResponse)
 # async def evaluate_resume(
@@ -0,0 +1,245 @@
+"""
+Concurrency benchmark for the FastAPI service.
+
+Starts a mock OpenAI-compatible upstream with a fixed response latency (it
+also serves a small resume PDF) and the real service on local ports, then
+fires N concurrent requests at each endpoint while polling /health.
+
+With a non-blocking request path the wall time stays close to a single
+request's latency and /health keeps answering in milliseconds. A blocking
+path would take roughly N times the latency and stall /health meanwhile.
+
+Usage:
+    python benchmarks/bench_concurrency.py --requests 20 --latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+
+def make_pdf(lines):
+    """Builds a minimal single-page PDF with one text line per entry."""
+    return make_multipage_pdf([lines])
+
+
+def make_multipage_pdf(pages):
+    """Builds a minimal PDF with one page per list of text lines."""
+    def escape(text):
+        return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    page_numbers = [4 + 2 * index for index in range(len(pages))]
+    kids = " ".join(f"{number} 0 R" for number in page_numbers)
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for number, lines in zip(page_numbers, pages):
+        stream = "BT /F1 11 Tf 14 TL 72 740 Td " + " ".join(f"({escape(line)}) Tj T*" for line in lines) + " ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {number + 1} 0 R "
+            "/Resources << /Font << /F1 3 0 R >> >> >>"
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    out = "%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n"
+    xref_at = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_at}\n%%EOF\n"
+    return out.encode("latin-1")
+
+
+def build_mock_upstream(latency):
+    """Mock OpenRouter chat completions API plus a static resume file."""
+    mock = FastAPI()
+    resume_pdf = make_pdf([
+        "Jane Doe - Senior Python Engineer",
+        "Skills: Python, FastAPI, PostgreSQL, Docker, AWS",
+        "Experience: 6 years building backend services",
+    ])
+
+    @mock.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        content = '{"score": 72, "missing_keywords": ["Kubernetes"], "summary": "Solid backend profile."}'
+        usage = {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120}
+        if body.get("stream"):
+            return StreamingResponse(stream_chunks(content, usage), media_type="text/event-stream")
+        await asyncio.sleep(latency)
+        return {
+            "id": "mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "mock",
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+            }],
+            "usage": usage,
+        }
+
+    async def stream_chunks(content, usage):
+        # First token after a tenth of the latency, the rest spread over the remainder.
+        words = content.split(" ")
+        await asyncio.sleep(latency / 10)
+        for index, word in enumerate(words):
+            chunk = {
+                "id": "mock",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": "mock",
+                "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            if index < len(words) - 1:
+                await asyncio.sleep(latency * 0.9 / len(words))
+        final = {"id": "mock", "object": "chat.completion.chunk", "created": int(time.time()),
+                 "model": "mock", "choices": [], "usage": usage}
+        yield f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n"
+
+    @mock.get("/resume.pdf")
+    async def resume(request: Request):
+        await asyncio.sleep(latency / 5)
+        etag = '"bench-resume-v1"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(content=resume_pdf, media_type="application/pdf", headers={"ETag": etag})
+
+    @mock.get("/resumes/{number}.pdf")
+    async def numbered_resume(number: int):
+        await asyncio.sleep(latency / 5)
+        pdf = make_pdf([f"Candidate {number} - Python Engineer", f"Experience: {number % 10} years"])
+        return Response(content=pdf, media_type="application/pdf")
+
+    return mock
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(asgi_app, port):
+    server = uvicorn.Server(uvicorn.Config(asgi_app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+async def poll_health(client, stop, samples):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/health")
+        samples.append(time.perf_counter() - started)
+        await asyncio.sleep(0.02)
+
+
+async def run_scenario(client, name, count, latency, send):
+    stop = asyncio.Event()
+    health_samples = []
+    health_task = asyncio.create_task(poll_health(client, stop, health_samples))
+    started = time.perf_counter()
+    responses = await asyncio.gather(*(send() for _ in range(count)))
+    wall = time.perf_counter() - started
+    stop.set()
+    await health_task
+
+    failures = sum(1 for r in responses if r.status_code != 200)
+    serial = count * latency
+    print(f"{name}: {count} requests in {wall:.2f}s "
+          f"(serial estimate {serial:.2f}s, overlap x{serial / wall:.1f}, failures {failures}) "
+          f"| /health max {max(health_samples, default=0) * 1000:.1f}ms over {len(health_samples)} probes")
+
+
+async def measure_time_to_first_byte(client, path, payload):
+    started = time.perf_counter()
+    first_byte = None
+    async with client.stream("POST", path, json=payload) as response:
+        async for _ in response.aiter_bytes():
+            if first_byte is None:
+                first_byte = time.perf_counter() - started
+    total = time.perf_counter() - started
+    print(f"{path}: first byte after {first_byte * 1000:.0f}ms, complete after {total * 1000:.0f}ms")
+
+
+async def main(args):
+    upstream_port, service_port = free_port(), free_port()
+    os.environ["OPENROUTER_API_KEY"] = "bench"
+    os.environ["OPENROUTER_BASE_URL"] = f"http://127.0.0.1:{upstream_port}/v1"
+    os.environ.setdefault("BATCH_DOWNLOAD_CONCURRENCY", str(args.requests))
+    os.environ.setdefault("BATCH_LLM_CONCURRENCY", str(args.requests))
+    # Measure overlap, not the client-side rate limiter
+    os.environ.setdefault("LLM_RPM", "0")
+    os.environ.setdefault("LLM_TPM", "0")
+    os.environ.setdefault("LLM_MAX_CONCURRENCY", str(args.requests * 2))
+
+    import api
+
+    start_server(build_mock_upstream(args.latency), upstream_port)
+    start_server(api.app, service_port)
+
+    summary_payload = {
+        "job_title": "Backend Engineer",
+        "job_description": "Build Python APIs.",
+        "required_experience_years": 3,
+        "tags": ["Python", "FastAPI"],
+    }
+    analysis_payload = {
+        "resume_url": f"http://127.0.0.1:{upstream_port}/resume.pdf",
+        "job_description": "Senior Python engineer with FastAPI and Kubernetes.",
+    }
+
+    limits = httpx.Limits(max_connections=args.requests + 5)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{service_port}", timeout=60, limits=limits) as client:
+        await run_scenario(client, "generate-job-summary", args.requests, args.latency,
+                           lambda: client.post("/api/generate-job-summary", json=summary_payload))
+        # Each analysis pays the download delay plus the LLM latency.
+        await run_scenario(client, "analyze-resume", args.requests, args.latency * 1.2,
+                           lambda: client.post("/api/analyze-resume", json=analysis_payload))
+
+        await measure_time_to_first_byte(client, "/api/generate-job-summary/stream", summary_payload)
+
+        # One batch of distinct resumes should take about as long as its slowest item.
+        batch_payload = {
+            "job_description": analysis_payload["job_description"],
+            "resumes": [{"resume_url": f"http://127.0.0.1:{upstream_port}/resumes/{n}.pdf", "id": str(n)}
+                        for n in range(args.requests)],
+        }
+        started = time.perf_counter()
+        batch = (await client.post("/api/analyze-resumes/batch", json=batch_payload)).json()
+        wall = time.perf_counter() - started
+        print(f"analyze-resumes/batch: {args.requests} items in {wall:.2f}s "
+              f"(single item ~{args.latency * 1.2:.2f}s, succeeded {batch['succeeded']}, failed {batch['failed']})")
+
+        # A different job description so the streamed batch misses the result cache.
+        batch_payload["job_description"] += " Remote-friendly."
+        await measure_time_to_first_byte(client, "/api/analyze-resumes/batch/stream", batch_payload)
+
+        print(f"upstream pools: {(await client.get('/stats')).json()['upstream']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20, help="concurrent requests per scenario")
+    parser.add_argument("--latency", type=float, default=0.5, help="mock LLM latency in seconds")
+    asyncio.run(main(parser.parse_args()))
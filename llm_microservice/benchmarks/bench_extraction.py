@@ -0,0 +1,115 @@
+"""
+PDF extraction benchmark.
+
+Extracts every PDF in a corpus through the service's PdfExtractor and reports
+pages per second and peak RSS for each configuration: in-thread extraction
+and process-pool extraction, for each installed backend. Without --corpus a
+synthetic corpus of resume-like PDFs (1 to 60 pages) is generated.
+
+Peak RSS is the high-water mark of this process and, separately, of the
+largest pool worker (Linux reports ru_maxrss in kilobytes).
+
+Usage:
+    python benchmarks/bench_extraction.py --corpus ./sample_pdfs --rounds 3
+"""
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import time
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+from bench_concurrency import make_multipage_pdf  # noqa: E402
+from pdf_engine import PdfExtractor, count_pages, pymupdf_available  # noqa: E402
+
+PAGE_LINES = [
+    "Jane Doe - Senior Python Engineer - jane@example.com",
+    "Experience: Acme Corp, Backend Engineer, 2019 - 2024",
+    "Built FastAPI services handling 2k requests per second on PostgreSQL and Redis",
+    "Led the migration of batch jobs from cron to Airflow on Kubernetes",
+    "Skills: Python, FastAPI, Django, PostgreSQL, Docker, AWS, Terraform",
+    "Education: B.Sc. Computer Science, State University, 2018",
+] * 6
+
+
+def synthetic_corpus():
+    sizes = [1, 1, 2, 2, 2, 3, 4, 8, 20, 60]
+    return [(f"synthetic-{n}p-{i}.pdf", make_multipage_pdf([PAGE_LINES] * n)) for i, n in enumerate(sizes)]
+
+
+def load_corpus(directory):
+    corpus = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(".pdf"):
+            with open(os.path.join(directory, name), "rb") as f:
+                corpus.append((name, f.read()))
+    return corpus
+
+
+def peak_rss_mb(who):
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+async def run_config(corpus, backend, workers, rounds, max_pages):
+    extractor = PdfExtractor(
+        backend=backend,
+        max_bytes=None,
+        max_pages=max_pages,
+        time_budget=600,
+        parallel_min_pages=8,
+        workers=workers,
+    )
+    # Warm the pool so process start-up is not counted as extraction time
+    if workers > 1:
+        await extractor.extract(corpus[-1][1])
+    extractor.pages = 0
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for _, pdf in corpus:
+            await extractor.extract(pdf)
+    elapsed = time.perf_counter() - started
+    stats = extractor.stats()
+    # Wait for the workers to exit so their peak RSS shows up in RUSAGE_CHILDREN
+    extractor.close(wait=True)
+    return {
+        "backend": extractor.backend,
+        "workers": workers,
+        "pages": stats["pages"],
+        "seconds": elapsed,
+        "pages_per_second": stats["pages"] / elapsed if elapsed else 0.0,
+    }
+
+
+async def main(args):
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    if not corpus:
+        sys.exit(f"No PDFs found in {args.corpus}")
+    total_pages = sum(count_pages(pdf, "pypdf") for _, pdf in corpus)
+    total_mb = sum(len(pdf) for _, pdf in corpus) / 1024 / 1024
+    print(f"Corpus: {len(corpus)} PDFs, {total_pages} pages, {total_mb:.1f} MB, {args.rounds} rounds")
+    print(f"CPUs: {os.cpu_count()}")
+
+    backends = ["pypdf"] + (["pymupdf"] if pymupdf_available() else [])
+    worker_counts = [1] + ([args.workers] if args.workers > 1 else [])
+    print(f"{'backend':<10} {'workers':>7} {'pages':>7} {'seconds':>8} {'pages/s':>9} {'rss MB':>8} {'worker rss MB':>14}")
+    for backend in backends:
+        for workers in worker_counts:
+            result = await run_config(corpus, backend, workers, args.rounds, args.max_pages)
+            print(
+                f"{result['backend']:<10} {result['workers']:>7} {result['pages']:>7} {result['seconds']:>8.2f} "
+                f"{result['pages_per_second']:>9.1f} {peak_rss_mb(resource.RUSAGE_SELF):>8.1f} "
+                f"{peak_rss_mb(resource.RUSAGE_CHILDREN):>14.1f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="directory of sample PDFs (default: generated corpus)")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1),
+                        help="process pool size for the parallel configuration")
+    parser.add_argument("--max-pages", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
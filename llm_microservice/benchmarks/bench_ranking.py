@@ -0,0 +1,79 @@
+"""
+Embedding index benchmark.
+
+Indexes a synthetic applicant pool (random skill mixes drawn from the
+pre-scorer's vocabulary) for one job, or spread over several jobs, then
+times /rank-style top-K queries against it. Reports encoding throughput,
+query p50/p95 and the size of the memory-mapped matrix.
+
+Usage:
+    python benchmarks/bench_ranking.py --resumes 20000 --jobs 1 --queries 200
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+from embeddings import EmbeddingIndex  # noqa: E402
+from prescore import SKILL_VOCABULARY  # noqa: E402
+
+SKILLS = sorted(SKILL_VOCABULARY)
+FILLER = ("built", "led", "designed", "maintained", "services", "team", "customers", "platform", "reports")
+
+
+def synthetic_resume(rng):
+    skills = rng.sample(SKILLS, rng.randint(5, 25))
+    filler = rng.choices(FILLER, k=rng.randint(50, 300))
+    return f"Skills: {', '.join(skills)}\nExperience: {' '.join(filler)}"
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    directory = tempfile.mkdtemp(prefix="bench_ranking_")
+    try:
+        index = EmbeddingIndex(directory, backend=args.backend, dim=args.dim)
+        started = time.perf_counter()
+        for start in range(0, args.resumes, 1000):
+            items = [
+                {"id": f"a{n}", "resume_url": f"https://example.com/{n}.pdf", "text": synthetic_resume(rng)}
+                for n in range(start, min(start + 1000, args.resumes))
+            ]
+            index.add(f"job-{start // 1000 % args.jobs}", items)
+        elapsed = time.perf_counter() - started
+        print(f"encoder {index.encoder.name}: indexed {args.resumes} resumes in {elapsed:.1f}s "
+              f"({args.resumes / elapsed:.0f}/s), matrix {os.path.getsize(os.path.join(directory, 'vectors.npy')) / 1e6:.1f} MB")
+
+        latencies = []
+        for _ in range(args.queries):
+            job_text = "Engineer with " + ", ".join(rng.sample(SKILLS, 8))
+            started = time.perf_counter()
+            _, pool = index.rank(f"job-{rng.randrange(args.jobs)}", job_text, args.top_k)
+            latencies.append(time.perf_counter() - started)
+        print(f"rank top {args.top_k} of ~{pool} per job: p50 {percentile(latencies, 0.5) * 1000:.2f}ms  "
+              f"p95 {percentile(latencies, 0.95) * 1000:.2f}ms")
+        index.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resumes", type=int, default=20000)
+    parser.add_argument("--jobs", type=int, default=1, help="spread the pool over this many jobs")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=50)
+    parser.add_argument("--backend", default="auto", help="auto, fastembed or hashing")
+    parser.add_argument("--dim", type=int, default=512, help="hashing encoder dimensions")
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
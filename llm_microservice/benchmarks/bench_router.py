@@ -0,0 +1,124 @@
+"""
+Model router benchmark.
+
+Starts a mock OpenAI-compatible server whose models behave differently
+(a fast model with a slow tail, a steady one, a flaky one and a rate
+limited one) and sends the same load through the service's ModelRouter
+with different pools and settings. Reports success rate and p50/p95/p99
+latency per scenario, so the effect of failover and hedging on tail
+latency is visible.
+
+Usage:
+    python benchmarks/bench_router.py --requests 300 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+import openai
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+from bench_concurrency import free_port, start_server  # noqa: E402
+from router import ModelRouter  # noqa: E402
+
+# model -> (base latency, tail latency, tail probability, error rate, rate limited)
+MOCK_MODELS = {
+    "mock/fast-tail": (0.05, 1.0, 0.1, 0.0, False),
+    "mock/steady": (0.15, 0.15, 0.0, 0.0, False),
+    "mock/flaky": (0.05, 0.05, 0.0, 0.3, False),
+    "mock/limited": (0.05, 0.05, 0.0, 0.0, True),
+}
+
+
+def build_mock_models():
+    mock = FastAPI()
+
+    @mock.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        base, tail, tail_probability, error_rate, limited = MOCK_MODELS[body["model"]]
+        if limited:
+            return JSONResponse({"error": {"message": "rate limited"}}, status_code=429, headers={"Retry-After": "30"})
+        await asyncio.sleep(tail if random.random() < tail_probability else base)
+        if random.random() < error_rate:
+            return JSONResponse({"error": {"message": "upstream overloaded"}}, status_code=502)
+        return {
+            "id": "mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 1, "total_tokens": 11},
+        }
+
+    return mock
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else float("nan")
+
+
+async def run_scenario(client, name, router, requests, concurrency):
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+    failures = 0
+
+    async def request(model):
+        return await client.chat.completions.create(
+            model=model, messages=[{"role": "user", "content": "ping"}],
+        )
+
+    async def one():
+        nonlocal failures
+        async with slots:
+            started = time.perf_counter()
+            try:
+                await router.call(request)
+                latencies.append(time.perf_counter() - started)
+            except Exception:
+                failures += 1
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    stats = router.stats()
+    print(
+        f"{name:<34} ok {len(latencies):>4}/{requests:<4} "
+        f"p50 {percentile(latencies, 0.5) * 1000:>6.0f}ms  p95 {percentile(latencies, 0.95) * 1000:>6.0f}ms  "
+        f"p99 {percentile(latencies, 0.99) * 1000:>6.0f}ms  failovers {stats['failovers']:>3}  hedges {stats['hedges']:>3}"
+    )
+
+
+async def main(args):
+    port = free_port()
+    start_server(build_mock_models(), port)
+    client = openai.AsyncOpenAI(base_url=f"http://127.0.0.1:{port}/v1", api_key="mock", max_retries=0)
+
+    hedging = {"hedge": True, "hedge_min_delay": 0.05, "hedge_max_ratio": args.hedge_ratio}
+    scenarios = [
+        ("fast-tail only", ModelRouter(["mock/fast-tail"])),
+        ("fast-tail + steady, no hedging", ModelRouter(["mock/fast-tail", "mock/steady"], explore_ratio=0)),
+        ("fast-tail + steady, hedging", ModelRouter(["mock/fast-tail", "mock/steady"], explore_ratio=0, **hedging)),
+        ("flaky only", ModelRouter(["mock/flaky"])),
+        ("flaky + steady, failover", ModelRouter(["mock/flaky", "mock/steady"])),
+        ("rate limited + steady, failover", ModelRouter(["mock/limited", "mock/steady"])),
+    ]
+    print(f"{args.requests} requests per scenario, {args.concurrency} concurrent")
+    for name, router in scenarios:
+        await run_scenario(client, name, router, args.requests, args.concurrency)
+    await client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--hedge-ratio", type=float, default=0.15,
+                        help="maximum share of requests that may be hedged")
+    asyncio.run(main(parser.parse_args()))
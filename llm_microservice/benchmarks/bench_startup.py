@@ -0,0 +1,172 @@
+"""
+Startup benchmark: import time, time to /health and time to /ready.
+
+Each run starts a fresh interpreter, so nothing is shared between runs but
+the OS file cache:
+
+    import   `import api` in a bare interpreter, and which of the modules
+             meant to load lazily (DEFERRED_MODULES) it pulled in anyway
+    health   uvicorn subprocess start until /health first answers 200
+    ready    the same process until /ready answers 200 (warm-up finished)
+
+Medians over --runs are checked against the budgets; the script exits
+non-zero when one is exceeded or a deferred module is imported eagerly, so
+it can run in CI as an import-time regression guard. --top lists the
+slowest imports (self time, from `python -X importtime`).
+
+Usage:
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --import-budget 1.0 --health-budget 2.0 --output startup.json
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+from bench_concurrency import free_port  # noqa: E402
+
+# Loaded by the background warm-up or on first use, never by `import api`
+DEFERRED_MODULES = ("openai", "pypdf", "pymupdf", "fastembed", "tiktoken", "streamlit")
+IMPORT_PROBE = (
+    "import json, sys, time\n"
+    "started = time.perf_counter()\n"
+    "import api\n"
+    "seconds = time.perf_counter() - started\n"
+    "print(json.dumps({'seconds': seconds, 'loaded': [m for m in %r if m in sys.modules]}))\n"
+) % (DEFERRED_MODULES,)
+
+
+def service_env(workdir):
+    return {
+        **os.environ,
+        "OPENROUTER_API_KEY": os.environ.get("OPENROUTER_API_KEY") or "bench",
+        "JOB_QUEUE_DB": os.path.join(workdir, "job_queue.db"),
+        "JOB_REGISTRY_DB": os.path.join(workdir, "job_registry.db"),
+        "EMBEDDING_INDEX_DIR": os.path.join(workdir, "embedding_index"),
+        "RESULT_CACHE_DB": "",
+        "TEXT_CACHE_DB": "",
+    }
+
+
+def measure_import(env):
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE], cwd=SERVICE_DIR, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(env, top):
+    """(module, self seconds) of the `top` slowest imports under `import api`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import api"], cwd=SERVICE_DIR, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, module = line[len("import time:"):].split("|")
+        timings.append((module.strip(), int(self_us) / 1e6))
+    return sorted(timings, key=lambda item: item[1], reverse=True)[:top]
+
+
+def measure_startup(env, log_path, timeout=120.0):
+    """Seconds from launching uvicorn until /health and /ready first answer 200."""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    with open(log_path, "a") as log:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "api:app", "--host", "127.0.0.1", "--port", str(port),
+             "--log-level", "warning"],
+            cwd=SERVICE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+    timings = {}
+    try:
+        with httpx.Client(timeout=1) as client:
+            for name in ("health", "ready"):
+                while name not in timings:
+                    if process.poll() is not None or time.perf_counter() - started > timeout:
+                        with open(log_path) as f:
+                            raise RuntimeError(f"Service never reported /{name}:\n{f.read()[-2000:]}")
+                    try:
+                        if client.get(f"{base_url}/{name}").status_code == 200:
+                            timings[name] = time.perf_counter() - started
+                    except httpx.HTTPError:
+                        pass
+                    time.sleep(0.005)
+            timings["warmup"] = client.get(f"{base_url}/ready").json()
+    finally:
+        process.terminate()
+        process.wait()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget", type=float, default=1.5, help="seconds for `import api` (median)")
+    parser.add_argument("--health-budget", type=float, default=3.0, help="seconds until /health answers (median)")
+    parser.add_argument("--ready-budget", type=float, default=15.0, help="seconds until /ready answers (median)")
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list (0 to skip)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    try:
+        env = service_env(workdir)
+        imports = [measure_import(env) for _ in range(args.runs)]
+        startups = [measure_startup(env, os.path.join(workdir, "service.log")) for _ in range(args.runs)]
+        slowest = slowest_imports(env, args.top) if args.top else []
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {
+        "import_seconds": statistics.median(run["seconds"] for run in imports),
+        "health_seconds": statistics.median(run["health"] for run in startups),
+        "ready_seconds": statistics.median(run["ready"] for run in startups),
+        "eager_deferred_modules": sorted({m for run in imports for m in run["loaded"]}),
+        "warmup_steps": {name: step["seconds"] for name, step in startups[-1]["warmup"]["steps"].items()},
+        "slowest_imports": [{"module": module, "self_seconds": round(seconds, 4)} for module, seconds in slowest],
+    }
+    budgets = {"import_seconds": args.import_budget, "health_seconds": args.health_budget,
+               "ready_seconds": args.ready_budget}
+
+    print(f"Median of {args.runs} runs:")
+    failures = []
+    for key, budget in budgets.items():
+        over = results[key] > budget
+        print(f"  {key:<15} {results[key]:7.3f}s  (budget {budget:.2f}s){'  OVER BUDGET' if over else ''}")
+        if over:
+            failures.append(key)
+    print("  warm-up steps   " + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in results["warmup_steps"].items()))
+    if results["eager_deferred_modules"]:
+        print(f"  `import api` loaded deferred modules: {', '.join(results['eager_deferred_modules'])}")
+        failures.append("eager_deferred_modules")
+    if slowest:
+        print("Slowest imports (self time):")
+        for module, seconds in slowest:
+            print(f"  {seconds * 1000:8.1f} ms  {module}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"budgets": budgets, "runs": args.runs, **results}, f, indent=2)
+        print(f"Wrote {args.output}")
+    if failures:
+        print(f"Startup regressed: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""
+Load-test suite for the service, without real OpenRouter tokens.
+
+Starts the mock model server (mock_llm.py) and the synthetic resume server
+(resume_server.py) in-process, runs the real service as a uvicorn
+subprocess against them, and drives each scenario with a fixed number of
+concurrent clients:
+
+    summary         POST /api/generate-job-summary
+    summary-stream  POST /api/generate-job-summary/stream (also time to first byte)
+    analyze-cold    POST /api/analyze-resume, every resume new to the service
+    analyze-hot     the same requests again (result and text caches warm)
+    batch           POST /api/analyze-resumes/batch with --batch-size resumes each
+
+Each scenario reports RPS, p50/p95/p99 latency, failures and the service
+process's RSS. --output writes the results as JSON; --baseline compares
+against an earlier file and exits non-zero when p95 or RPS regressed by more
+than --tolerance.
+
+Usage:
+    python benchmarks/bench_suite.py --requests 200 --concurrency 20 --output bench.json
+    python benchmarks/bench_suite.py --baseline bench.json --tolerance 0.15
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+from bench_concurrency import free_port, start_server  # noqa: E402
+from mock_llm import build_mock_llm  # noqa: E402
+from resume_server import build_resume_server, generate_corpus  # noqa: E402
+
+SCENARIOS = ("summary", "summary-stream", "analyze-cold", "analyze-hot", "batch")
+JOB_DESCRIPTION = (
+    "Senior backend engineer. Python, FastAPI, PostgreSQL, Docker and Kubernetes on AWS. "
+    "Five years building and operating production APIs, CI/CD, on-call ownership."
+)
+SUMMARY_PAYLOAD = {
+    "job_title": "Backend Engineer",
+    "job_description": JOB_DESCRIPTION,
+    "required_experience_years": 5,
+    "tags": ["Python", "FastAPI", "Kubernetes"],
+}
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else None
+
+
+def rss_mb(pid, field="VmRSS"):
+    """Resident (VmRSS) or peak resident (VmHWM) memory of a process; Linux only."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+def start_service(port, env, log_path):
+    log = open(log_path, "w")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=SERVICE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.kill()
+    with open(log_path) as f:
+        raise RuntimeError(f"Service did not start:\n{f.read()[-2000:]}")
+
+
+async def run_load(name, pid, total, concurrency, send, items_per_request=1):
+    """
+    Closed loop: `concurrency` clients send requests back to back until
+    `total` have been sent. send(i) returns (status_code, extra) where extra
+    is an optional dict of per-request measurements.
+    """
+    latencies = []
+    statuses = Counter()
+    extras = {}
+    next_index = iter(range(total))
+    peak_rss = 0.0
+    done = asyncio.Event()
+
+    async def client():
+        for index in next_index:
+            started = time.perf_counter()
+            try:
+                status, extra = await send(index)
+            except httpx.HTTPError as e:
+                status, extra = type(e).__name__, None
+            latencies.append(time.perf_counter() - started)
+            statuses[str(status)] += 1
+            for key, value in (extra or {}).items():
+                extras.setdefault(key, []).append(value)
+
+    async def sample_memory():
+        nonlocal peak_rss
+        while not done.is_set():
+            peak_rss = max(peak_rss, rss_mb(pid) or 0.0)
+            await asyncio.sleep(0.05)
+
+    sampler = asyncio.create_task(sample_memory())
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    done.set()
+    await sampler
+
+    def ms(value):
+        return round(value * 1000, 1) if value is not None else None
+
+    result = {
+        "scenario": name,
+        "requests": total,
+        "concurrency": concurrency,
+        "failures": total - statuses.get("200", 0),
+        "statuses": dict(statuses),
+        "wall_seconds": round(wall, 3),
+        "rps": round(total / wall, 2),
+        "items_per_second": round(total * items_per_request / wall, 2),
+        "p50_ms": ms(percentile(latencies, 0.5)),
+        "p95_ms": ms(percentile(latencies, 0.95)),
+        "p99_ms": ms(percentile(latencies, 0.99)),
+        "rss_peak_mb": round(peak_rss, 1),
+        "rss_end_mb": round(rss_mb(pid) or 0.0, 1),
+    }
+    for key, values in extras.items():
+        result[f"{key}_p50_ms"] = ms(percentile(values, 0.5))
+        result[f"{key}_p95_ms"] = ms(percentile(values, 0.95))
+    return result
+
+
+def print_result(result):
+    print(
+        f"{result['scenario']:<15} {result['requests']:>5} req  {result['rps']:>8.2f} rps  "
+        f"p50 {result['p50_ms']:>8.1f}ms  p95 {result['p95_ms']:>8.1f}ms  p99 {result['p99_ms']:>8.1f}ms  "
+        f"fail {result['failures']:>4}  rss peak {result['rss_peak_mb']:>6.1f}MB"
+        + (f"  ttfb p50 {result['ttfb_p50_ms']:.1f}ms" if "ttfb_p50_ms" in result else ""),
+        flush=True,
+    )
+
+
+def compare(results, baseline, tolerance):
+    """Lines describing regressions against a baseline results file."""
+    previous = {r["scenario"]: r for r in baseline["scenarios"]}
+    regressions = []
+    for result in results:
+        before = previous.get(result["scenario"])
+        if before is None:
+            continue
+        if before["p95_ms"] and result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{result['scenario']}: p95 {before['p95_ms']}ms -> {result['p95_ms']}ms")
+        if result["rps"] < before["rps"] * (1 - tolerance):
+            regressions.append(f"{result['scenario']}: rps {before['rps']} -> {result['rps']}")
+        if result["failures"] > before["failures"]:
+            regressions.append(f"{result['scenario']}: failures {before['failures']} -> {result['failures']}")
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SERVICE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args):
+    workdir = tempfile.mkdtemp(prefix="bench_suite_")
+    corpus = os.path.join(workdir, "resumes")
+    count = max(args.requests, args.batches * args.batch_size)
+    names = generate_corpus(corpus, count)
+
+    llm_port, resume_port, service_port = free_port(), free_port(), free_port()
+    start_server(
+        build_mock_llm(args.latency, args.tokens_per_second, args.error_rate, args.rate_limit_rate, seed=1),
+        llm_port,
+    )
+    start_server(build_resume_server(corpus, args.download_latency), resume_port)
+    resume_url = f"http://127.0.0.1:{resume_port}/resumes/{{}}".format
+
+    env = {
+        **os.environ,
+        "OPENROUTER_API_KEY": "bench",
+        "OPENROUTER_BASE_URL": f"http://127.0.0.1:{llm_port}/v1",
+        "JOB_QUEUE_DB": os.path.join(workdir, "job_queue.db"),
+        "JOB_REGISTRY_DB": os.path.join(workdir, "job_registry.db"),
+        "EMBEDDING_INDEX_DIR": os.path.join(workdir, "embedding_index"),
+        "RESULT_CACHE_DB": "",
+        "TEXT_CACHE_DB": "",
+        # Measure the service, not the client-side rate limiter
+        "LLM_RPM": "0",
+        "LLM_TPM": "0",
+        "LLM_MAX_CONCURRENCY": str(args.concurrency * args.batch_size),
+        "LLM_QUEUE_SIZE": str(args.concurrency * args.batch_size),
+    }
+    service = start_service(service_port, env, os.path.join(workdir, "service.log"))
+    scenarios = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    results = []
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency + 5)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{service_port}", timeout=120, limits=limits) as client:
+
+            async def summary(index):
+                response = await client.post("/api/generate-job-summary", json=SUMMARY_PAYLOAD)
+                return response.status_code, None
+
+            async def summary_stream(index):
+                started = time.perf_counter()
+                first_byte = None
+                async with client.stream("POST", "/api/generate-job-summary/stream", json=SUMMARY_PAYLOAD) as r:
+                    async for _ in r.aiter_bytes():
+                        if first_byte is None:
+                            first_byte = time.perf_counter() - started
+                return r.status_code, {"ttfb": first_byte}
+
+            async def analyze(index):
+                response = await client.post("/api/analyze-resume", json={
+                    "resume_url": resume_url(names[index % len(names)]),
+                    "job_description": JOB_DESCRIPTION,
+                    "job_tags": SUMMARY_PAYLOAD["tags"],
+                })
+                return response.status_code, None
+
+            async def batch(index):
+                start = index * args.batch_size
+                response = await client.post("/api/analyze-resumes/batch", json={
+                    # Its own job description, so batches never hit the single-analysis cache
+                    "job_description": JOB_DESCRIPTION + " Batch screening.",
+                    "resumes": [{"resume_url": resume_url(names[n % len(names)]), "id": str(n)}
+                                for n in range(start, start + args.batch_size)],
+                })
+                return response.status_code, None
+
+            plan = {
+                "summary": (summary, args.requests, 1),
+                "summary-stream": (summary_stream, args.requests, 1),
+                "analyze-cold": (analyze, args.requests, 1),
+                "analyze-hot": (analyze, args.requests, 1),
+                "batch": (batch, args.batches, args.batch_size),
+            }
+            print(f"mock LLM latency {args.latency}s at {args.tokens_per_second} tokens/s, "
+                  f"error rate {args.error_rate}, {args.concurrency} concurrent clients")
+            for name in scenarios:
+                send, total, items = plan[name]
+                if name == "analyze-hot" and "analyze-cold" not in scenarios:
+                    await run_load("warmup", service.pid, total, args.concurrency, send)
+                result = await run_load(name, service.pid, total, args.concurrency, send, items)
+                results.append(result)
+                print_result(result)
+            service_stats = (await client.get("/stats")).json()
+            mock_stats = httpx.get(f"http://127.0.0.1:{llm_port}/mock/stats").json()
+            service_peak_rss = rss_mb(service.pid, "VmHWM")
+    finally:
+        service.terminate()
+        service.wait(timeout=10)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": vars(args),
+        },
+        "scenarios": results,
+        "service": {
+            "rss_peak_mb": service_peak_rss,
+            "result_cache": service_stats.get("result_cache"),
+            "text_cache": service_stats.get("text_cache"),
+            "llm_usage": service_stats.get("llm_usage"),
+        },
+        "mock_llm": mock_stats,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10, help="concurrent clients")
+    parser.add_argument("--batches", type=int, default=5, help="requests in the batch scenario")
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--scenarios", help=f"comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--latency", type=float, default=0.2, help="mock LLM time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="mock LLM generation speed")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of mock LLM calls failing with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of mock LLM calls answered 429")
+    parser.add_argument("--download-latency", type=float, default=0.02, help="resume server delay (s)")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="earlier --output file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed p95/RPS regression")
+    asyncio.run(main(parser.parse_args()))
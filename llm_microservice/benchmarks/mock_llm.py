@@ -0,0 +1,153 @@
+"""
+OpenAI-compatible mock model server for benchmarks and local development.
+
+Answers /v1/chat/completions (plain and streamed) after a configurable time
+to first token, then generates the reply at a configurable tokens-per-second
+rate. Resume analysis prompts get a plausible JSON verdict, everything else
+a short summary. Errors and 429s can be injected at given rates. A system
+message seen before is reported as cached prompt tokens, the way providers
+with prompt-prefix caching do.
+
+Usage (point OPENROUTER_BASE_URL at http://127.0.0.1:9000/v1):
+    python benchmarks/mock_llm.py --port 9000 --latency 0.3 --tokens-per-second 80 --error-rate 0.02
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+from collections import Counter
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+SUMMARY_REPLY = (
+    "The role centres on designing, building and operating backend services. Candidates need strong "
+    "Python and API design skills, production experience with relational databases and containers, and "
+    "familiarity with cloud deployment and CI/CD. The position calls for several years of hands-on "
+    "engineering, clear written communication and ownership of services from design to on-call."
+)
+ANALYSIS_KEYWORDS = ["kubernetes", "terraform", "graphql", "kafka", "aws", "redis"]
+
+
+def message_text(message):
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content)
+    return content
+
+
+def estimate_tokens(text):
+    return max(len(text) // 4, 1)
+
+
+def analysis_reply(text):
+    """Deterministic per prompt, so the same resume always gets the same verdict."""
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    missing = [keyword for bit, keyword in enumerate(ANALYSIS_KEYWORDS) if digest[1] >> bit & 1][:3]
+    return json.dumps({
+        "score": 40 + digest[0] % 55,
+        "missing_keywords": missing,
+        "summary": "Relevant backend experience with most required skills; gaps in the listed keywords.",
+    })
+
+
+def build_mock_llm(latency=0.3, tokens_per_second=80.0, error_rate=0.0, rate_limit_rate=0.0, seed=None):
+    """
+    latency is the time to first token in seconds. Injected errors are
+    answered after half the latency with 500; rate limits at once with 429
+    and Retry-After: 1. Counters are served on GET /mock/stats.
+    """
+    rng = random.Random(seed)
+    counters = Counter()
+    seen_prefixes = set()
+    mock = FastAPI()
+
+    @mock.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        counters["requests"] += 1
+        roll = rng.random()
+        if roll < rate_limit_rate:
+            counters["rate_limited"] += 1
+            return JSONResponse({"error": {"message": "rate limited (injected)"}}, status_code=429,
+                                headers={"Retry-After": "1"})
+        if roll < rate_limit_rate + error_rate:
+            counters["errors"] += 1
+            await asyncio.sleep(latency / 2)
+            return JSONResponse({"error": {"message": "upstream error (injected)"}}, status_code=500)
+
+        messages = body.get("messages", [])
+        texts = [message_text(m) for m in messages]
+        system = texts[0] if messages and messages[0].get("role") == "system" else ""
+        prompt = "\n".join(texts)
+        if "Resume Text:" in prompt:
+            reply = analysis_reply(prompt)
+        else:
+            reply = SUMMARY_REPLY
+        prefix = hashlib.sha256(system.encode("utf-8")).hexdigest()
+        cached = estimate_tokens(system) if system and prefix in seen_prefixes else 0
+        seen_prefixes.add(prefix)
+        usage = {
+            "prompt_tokens": estimate_tokens(prompt),
+            "completion_tokens": estimate_tokens(reply),
+            "total_tokens": estimate_tokens(prompt) + estimate_tokens(reply),
+            "prompt_tokens_details": {"cached_tokens": cached},
+        }
+        counters["prompt_tokens"] += usage["prompt_tokens"]
+        counters["cached_prompt_tokens"] += cached
+        counters["completion_tokens"] += usage["completion_tokens"]
+
+        if body.get("stream"):
+            return StreamingResponse(stream_chunks(body["model"], reply, usage), media_type="text/event-stream")
+        await asyncio.sleep(latency + usage["completion_tokens"] / tokens_per_second)
+        return {
+            "id": "mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": reply}}],
+            "usage": usage,
+        }
+
+    async def stream_chunks(model, reply, usage):
+        await asyncio.sleep(latency)
+        words = reply.split(" ")
+        for index, word in enumerate(words):
+            chunk = {
+                "id": "mock",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": word if index == 0 else " " + word},
+                             "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(estimate_tokens(word + " ") / tokens_per_second)
+        final = {"id": "mock", "object": "chat.completion.chunk", "created": int(time.time()),
+                 "model": model, "choices": [], "usage": usage}
+        yield f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n"
+
+    @mock.get("/mock/stats")
+    async def mock_stats():
+        return dict(counters)
+
+    return mock
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of calls answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of calls answered with 429")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    uvicorn.run(
+        build_mock_llm(args.latency, args.tokens_per_second, args.error_rate, args.rate_limit_rate, args.seed),
+        host="127.0.0.1", port=args.port, log_level="warning",
+    )
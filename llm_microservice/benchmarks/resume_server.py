@@ -0,0 +1,101 @@
+"""
+Static server for a corpus of synthetic resume PDFs.
+
+Generates resume-0000.pdf ... with random skill mixes (from the
+pre-scorer's vocabulary), experience lines and 1-3 pages, and serves them
+with ETag / Last-Modified so conditional re-downloads answer 304 like a
+real blob store.
+
+Usage:
+    python benchmarks/resume_server.py --corpus /tmp/resumes --count 500 --port 9001
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+
+from fastapi import FastAPI
+from fastapi.staticfiles import StaticFiles
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+from bench_concurrency import make_multipage_pdf  # noqa: E402
+from prescore import SKILL_VOCABULARY  # noqa: E402
+
+SKILLS = sorted(SKILL_VOCABULARY)
+ROLES = ("Backend Engineer", "Data Engineer", "Frontend Developer", "DevOps Engineer", "Product Designer")
+DUTIES = (
+    "Built and operated services handling {n}k requests per minute",
+    "Led a team of {n} engineers through a platform migration",
+    "Cut infrastructure cost by {n}0% by consolidating clusters",
+    "Designed data pipelines feeding {n} downstream reports",
+    "Owned on-call and incident reviews for {n} production services",
+)
+
+
+def resume_name(number):
+    return f"resume-{number:04d}.pdf"
+
+
+def synthetic_resume(number, rng, max_pages=3):
+    """Text pages for one candidate."""
+    role = rng.choice(ROLES)
+    pages = [[
+        f"Candidate {number} - {role}",
+        f"candidate{number}@example.com | +1 555 {number:04d}",
+        "Skills",
+        ", ".join(rng.sample(SKILLS, rng.randint(6, 18))),
+        "Experience",
+    ]]
+    for _ in range(rng.randint(1, max_pages)):
+        if len(pages[-1]) > 30:
+            pages.append([])
+        for _ in range(rng.randint(6, 14)):
+            pages[-1].append(rng.choice(DUTIES).format(n=rng.randint(2, 9)))
+    pages[-1] += ["Education", f"BSc Computer Science, {rng.randint(2005, 2022)}"]
+    return pages
+
+
+def generate_corpus(directory, count, seed=7, max_pages=3):
+    """Writes `count` PDFs into directory (existing files are kept). Returns the file names."""
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    names = []
+    for number in range(count):
+        pages = synthetic_resume(number, rng, max_pages)
+        path = os.path.join(directory, resume_name(number))
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(make_multipage_pdf(pages))
+        names.append(resume_name(number))
+    return names
+
+
+def build_resume_server(directory, latency=0.0):
+    """Serves the corpus under /resumes/, optionally delaying every response by `latency` seconds."""
+    server = FastAPI()
+    files = StaticFiles(directory=directory)
+
+    async def delayed(scope, receive, send):
+        if latency:
+            await asyncio.sleep(latency)
+        await files(scope, receive, send)
+
+    server.mount("/resumes", delayed)
+    return server
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", required=True, help="directory for the generated PDFs")
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    args = parser.parse_args()
+    generate_corpus(args.corpus, args.count)
+    print(f"Serving {args.count} resumes at http://127.0.0.1:{args.port}/resumes/{resume_name(0)} ...")
+    uvicorn.run(build_resume_server(args.corpus, args.latency), host="127.0.0.1", port=args.port, log_level="warning")
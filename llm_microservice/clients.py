@@ -0,0 +1,139 @@
+"""
+Application-scoped upstream HTTP clients.
+
+One pooled client talks to OpenRouter and one downloads resumes, so repeat
+calls reuse keep-alive connections instead of paying TCP and TLS setup on
+every request. Created and closed by the FastAPI lifespan handler in api.py.
+The OpenAI SDK takes a good part of a second to import, so it is imported
+with the OpenRouter client, by the warm-up in api.py or on first use.
+"""
+import os
+
+import httpx
+
+# Pool configuration
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+def http2_available():
+    """HTTP/2 needs the optional `h2` package (installed by httpx[http2])."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class PoolStats:
+    """
+    Connection reuse counters for one client, fed by httpcore trace events.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.connections_opened = 0
+        self.tls_handshakes = 0
+
+    async def on_request(self, request):
+        self.requests += 1
+        request.extensions["trace"] = self.trace
+
+    async def trace(self, event_name, info):
+        if event_name == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+        elif event_name == "connection.start_tls.complete":
+            self.tls_handshakes += 1
+
+    def snapshot(self):
+        reused = max(self.requests - self.connections_opened, 0)
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "tls_handshakes": self.tls_handshakes,
+            "reuse_ratio": round(reused / self.requests, 3) if self.requests else 0.0,
+        }
+
+
+class UpstreamClients:
+    """
+    Holds the shared OpenRouter and resume-download clients.
+
+    Clients are created lazily on first use, so helper scripts that never run
+    the lifespan handler still get a working pool. start() creates the
+    download client; the OpenRouter client is left to the warm-up.
+    """
+
+    def __init__(self, api_key, base_url, download_timeout, max_retries=2):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.download_timeout = download_timeout
+        self.max_retries = max_retries
+        self.http2 = HTTP2_ENABLED and http2_available()
+        self.ai_stats = PoolStats()
+        self.download_stats = PoolStats()
+        self._ai = None
+        self._download = None
+
+    def _limits(self):
+        return httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        )
+
+    def _hooks(self, stats):
+        return {"request": [stats.on_request]}
+
+    @property
+    def ai(self):
+        if self._ai is None:
+            import openai
+
+            http_client = openai.DefaultAsyncHttpxClient(
+                limits=self._limits(),
+                http2=self.http2,
+                event_hooks=self._hooks(self.ai_stats),
+            )
+            self._ai = openai.AsyncOpenAI(
+                base_url=self.base_url,
+                api_key=self.api_key,
+                http_client=http_client,
+                max_retries=self.max_retries,
+            )
+        return self._ai
+
+    @property
+    def download(self):
+        if self._download is None:
+            self._download = httpx.AsyncClient(
+                timeout=self.download_timeout,
+                follow_redirects=True,
+                headers={'User-Agent': 'Mozilla/5.0'},  # Some CDNs require user agent
+                limits=self._limits(),
+                http2=self.http2,
+                event_hooks=self._hooks(self.download_stats),
+            )
+        return self._download
+
+    async def start(self):
+        self.download
+        print(f"Upstream clients ready (HTTP/2: {self.http2}, "
+              f"max connections: {HTTP_MAX_CONNECTIONS}, keep-alive: {HTTP_MAX_KEEPALIVE_CONNECTIONS})")
+
+    async def aclose(self):
+        if self._ai is not None:
+            await self._ai.close()
+            self._ai = None
+        if self._download is not None:
+            await self._download.aclose()
+            self._download = None
+
+    def stats(self):
+        return {
+            "http2": self.http2,
+            "openrouter": self.ai_stats.snapshot(),
+            "resume_download": self.download_stats.snapshot(),
+        }
@@ -0,0 +1,62 @@
+"""
+Single-flight coalescing of identical in-flight work.
+
+Double-clicks, client retries and parallel applications with the same
+resume arrive at the same moment, before the result cache could answer
+them. The first request for a key runs the computation in its own task;
+requests for the same key that arrive while it runs wait on that task and
+get its result (or its error) instead of starting another download and
+model call. The key is forgotten as soon as the task finishes, so later
+requests go through the caches as usual.
+
+The shared task is shielded from its callers: a client that disconnects
+stops waiting, but the computation goes on for the others (and still
+fills the cache).
+"""
+import asyncio
+from collections import Counter
+
+from metrics import stage
+
+
+class SingleFlight:
+    """In-flight computations by (kind, key), with per-kind call and saved-call counters."""
+
+    def __init__(self):
+        self._flights = {}
+        self.calls = Counter()
+        self.coalesced = Counter()
+
+    async def run(self, kind, key, compute):
+        """Returns await compute(), shared with concurrent callers of the same kind and key."""
+        flight_key = (kind, key)
+        task = self._flights.get(flight_key)
+        if task is not None:
+            self.coalesced[kind] += 1
+            with stage("coalesced_wait"):
+                return await asyncio.shield(task)
+        self.calls[kind] += 1
+        task = asyncio.ensure_future(compute())
+        self._flights[flight_key] = task
+        task.add_done_callback(lambda done: self._finished(flight_key, done))
+        return await asyncio.shield(task)
+
+    def _finished(self, flight_key, task):
+        if self._flights.get(flight_key) is task:
+            del self._flights[flight_key]
+        # Retrieve the error so it is not logged as unhandled when every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self):
+        return {
+            "in_flight": len(self._flights),
+            **{
+                kind: {
+                    "calls": self.calls[kind],
+                    "coalesced": self.coalesced[kind],
+                    "saved_ratio": round(self.coalesced[kind] / (self.calls[kind] + self.coalesced[kind]), 3),
+                }
+                for kind in sorted(self.calls)
+            },
+        }
@@ -0,0 +1,281 @@
+"""
+Token-budget-aware compaction of resume and job description text.
+
+PDF extraction output is noisy: runs of whitespace, page headers and footers
+repeated on every page, duplicated lines. Compaction removes that noise and,
+if the text is still over the model's token budget, keeps resume sections by
+priority (skills and experience before hobbies and references).
+"""
+import re
+import threading
+from collections import Counter
+
+from pdf_engine import PAGE_BREAK
+
+# Section headings, most important first. Text before the first heading
+# (name, contact line, headline) is always kept.
+SECTION_PRIORITY = [
+    ("skills", ("skills", "technical skills", "core competencies", "technologies", "tech stack")),
+    ("experience", ("experience", "work experience", "professional experience", "employment", "work history")),
+    ("projects", ("projects", "personal projects", "key projects")),
+    ("education", ("education", "academic background", "qualifications")),
+    ("certifications", ("certifications", "certificates", "licenses")),
+    ("summary", ("summary", "profile", "professional summary", "objective", "about me")),
+    ("achievements", ("achievements", "awards", "honors", "accomplishments")),
+    ("publications", ("publications", "research")),
+    ("languages", ("languages",)),
+    ("volunteering", ("volunteer", "volunteering", "volunteer experience")),
+    ("interests", ("interests", "hobbies", "activities")),
+    ("references", ("references",)),
+]
+HEADING_TO_SECTION = {alias: name for name, aliases in SECTION_PRIORITY for alias in aliases}
+SECTION_RANK = {name: rank for rank, (name, _) in enumerate(SECTION_PRIORITY)}
+
+PAGE_NUMBER = re.compile(r"^(page\s*)?\d{1,3}(\s*(of|/)\s*\d{1,3})?$", re.IGNORECASE)
+INLINE_SPACE = re.compile(r"[ \t\u00a0\u200b]+")
+MIN_DEDUP_LENGTH = 4
+MIN_PARTIAL_LINE_TOKENS = 16
+
+
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+_tokenizer_loaded = False
+
+
+def load_tokenizer():
+    """
+    Loads tiktoken's cl100k_base encoding (which may download it) once,
+    never at import. The service's background warm-up calls it so requests
+    rarely wait for it. Without tiktoken, or when the encoding cannot be
+    loaded, counts are estimated at ~4 characters per token.
+    """
+    global _tokenizer, _tokenizer_loaded
+    with _tokenizer_lock:
+        if _tokenizer_loaded:
+            return _tokenizer is not None
+        try:
+            import tiktoken
+            _tokenizer = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            print(f"tiktoken unavailable, estimating tokens at ~4 characters each: {str(e)}")
+        _tokenizer_loaded = True
+    return _tokenizer is not None
+
+
+def count_tokens(text):
+    """
+    cl100k_base count, or the estimate without tiktoken. The first call waits
+    for load_tokenizer(), so a process never mixes the two and compacts the
+    same text the same way before and after warm-up.
+    """
+    if not _tokenizer_loaded:
+        load_tokenizer()
+    if _tokenizer is not None:
+        return len(_tokenizer.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def normalize_whitespace(text):
+    """Collapses inline whitespace and strips each line. Page breaks are kept."""
+    pages = []
+    for page in text.split(PAGE_BREAK):
+        lines = [INLINE_SPACE.sub(" ", line).strip() for line in page.splitlines()]
+        pages.append(lines)
+    return pages
+
+
+def strip_repeated_page_lines(pages, edge_lines=3):
+    """
+    Removes page numbers and lines that repeat at the top or bottom of at
+    least half of the pages (running headers and footers).
+    Returns (pages, removed_count).
+    """
+    removed = 0
+    repeated = set()
+    if len(pages) >= 2:
+        edges = Counter()
+        for lines in pages:
+            content = [line for line in lines if line]
+            edges.update(set(content[:edge_lines] + content[-edge_lines:]))
+        threshold = max(2, (len(pages) + 1) // 2)
+        repeated = {line for line, seen in edges.items() if seen >= threshold}
+
+    cleaned = []
+    for lines in pages:
+        kept = []
+        for line in lines:
+            if line and (line in repeated or PAGE_NUMBER.match(line)):
+                removed += 1
+                continue
+            kept.append(line)
+        cleaned.append(kept)
+    return cleaned, removed
+
+
+def dedupe_lines(lines):
+    """Drops repeated lines (case-insensitive) and blank runs. Returns (lines, removed_count)."""
+    seen = set()
+    kept = []
+    removed = 0
+    for line in lines:
+        if not line:
+            if kept and kept[-1]:
+                kept.append(line)
+            continue
+        key = line.lower()
+        if len(key) >= MIN_DEDUP_LENGTH and key in seen:
+            removed += 1
+            continue
+        seen.add(key)
+        kept.append(line)
+    while kept and not kept[-1]:
+        kept.pop()
+    return kept, removed
+
+
+def split_sections(lines):
+    """Groups lines into (section_name, lines) blocks using known headings."""
+    sections = [("header", [])]
+    for line in lines:
+        heading = line.lower().rstrip(":").strip()
+        if heading in HEADING_TO_SECTION:
+            sections.append((HEADING_TO_SECTION[heading], [line]))
+        else:
+            sections[-1][1].append(line)
+    return [(name, block) for name, block in sections if block]
+
+
+def truncate_lines(lines, budget):
+    """Takes whole lines while they fit, then cuts the next line short. Returns (lines, used_tokens)."""
+    kept = []
+    used = 0
+    for line in lines:
+        line_cost = count_tokens(line) + 1
+        if used + line_cost <= budget:
+            kept.append(line)
+            used += line_cost
+            continue
+        remaining = budget - used
+        if remaining > MIN_PARTIAL_LINE_TOKENS:
+            cut = line[:remaining * 4].rsplit(" ", 1)[0]
+            kept.append(cut)
+            used += count_tokens(cut) + 1
+        break
+    return kept, used
+
+
+def fit_to_budget(sections, budget):
+    """
+    Keeps every whole section that fits, in priority order, then fills what
+    is left with the start of the most important section that did not fit.
+    Original order is preserved. Returns (lines, dropped_section_names).
+    """
+    order = sorted(range(len(sections)), key=lambda i: -1 if sections[i][0] == "header"
+                   else SECTION_RANK.get(sections[i][0], len(SECTION_RANK)))
+    kept = {}
+    remaining = budget
+    skipped = []
+    for index in order:
+        cost = count_tokens("\n".join(sections[index][1])) + 1
+        if cost <= remaining:
+            kept[index] = sections[index][1]
+            remaining -= cost
+        else:
+            skipped.append(index)
+
+    dropped = []
+    for position, index in enumerate(skipped):
+        name, block = sections[index]
+        if position == 0:
+            partial, _ = truncate_lines(block, remaining)
+            # A heading on its own is not worth keeping
+            if len(partial) > 1 or (partial and name == "header"):
+                kept[index] = partial
+                dropped.append(f"{name} (truncated)")
+                continue
+        dropped.append(name)
+    lines = [line for index in sorted(kept) for line in kept[index]]
+    return lines, dropped
+
+
+class Compactor:
+    """
+    Applies the compaction stages with per-model token budgets and keeps
+    running before/after token totals for /stats.
+    """
+
+    def __init__(self, resume_budgets, default_resume_budget, job_description_budget):
+        self.resume_budgets = resume_budgets
+        self.default_resume_budget = default_resume_budget
+        self.job_description_budget = job_description_budget
+        self.documents = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    def resume_budget(self, model):
+        return self.resume_budgets.get(model, self.default_resume_budget)
+
+    def _record(self, report):
+        self.documents += 1
+        self.tokens_before += report["original_tokens"]
+        self.tokens_after += report["compacted_tokens"]
+
+    def compact_resume(self, text, model, exclude_sections=()):
+        """
+        Returns (compacted_text, report). Sections named in exclude_sections
+        are left out whatever the budget.
+        """
+        budget = self.resume_budget(model)
+        original_tokens = count_tokens(text)
+        pages, header_lines = strip_repeated_page_lines(normalize_whitespace(text))
+        lines, duplicate_lines = dedupe_lines([line for page in pages for line in page])
+        excluded = []
+        if exclude_sections:
+            sections = split_sections(lines)
+            excluded = [name for name, _ in sections if name in exclude_sections]
+            if excluded:
+                lines = [line for name, block in sections if name not in exclude_sections for line in block]
+        dropped = []
+        if count_tokens("\n".join(lines)) > budget:
+            lines, dropped = fit_to_budget(split_sections(lines), budget)
+        compacted = "\n".join(lines)
+        report = {
+            "original_tokens": original_tokens,
+            "compacted_tokens": count_tokens(compacted),
+            "budget": budget,
+            "removed_header_lines": header_lines,
+            "removed_duplicate_lines": duplicate_lines,
+            "excluded_sections": excluded,
+            "dropped_sections": dropped,
+        }
+        self._record(report)
+        return compacted, report
+
+    def compact_job_description(self, text):
+        """Whitespace and duplicate cleanup, then a line-boundary cut at the budget."""
+        original_tokens = count_tokens(text)
+        lines, duplicate_lines = dedupe_lines([line for page in normalize_whitespace(text) for line in page])
+        truncated = False
+        if count_tokens("\n".join(lines)) > self.job_description_budget:
+            lines, _ = fit_to_budget([("header", lines)], self.job_description_budget)
+            truncated = True
+        compacted = "\n".join(lines)
+        report = {
+            "original_tokens": original_tokens,
+            "compacted_tokens": count_tokens(compacted),
+            "budget": self.job_description_budget,
+            "removed_duplicate_lines": duplicate_lines,
+            "truncated": truncated,
+        }
+        self._record(report)
+        return compacted, report
+
+    def stats(self):
+        saved = self.tokens_before - self.tokens_after
+        return {
+            "documents": self.documents,
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "tokens_saved": saved,
+            "saved_ratio": round(saved / self.tokens_before, 3) if self.tokens_before else 0.0,
+        }
@@ -0,0 +1,386 @@
+"""
+CPU embedding index for ranking a job's applicant pool.
+
+Resumes and jobs are embedded with a local model: fastembed's ONNX models
+when that package is installed (requirements-embeddings.txt), otherwise a
+signed feature-hashing encoder over the same normalized, synonym-folded
+terms the pre-scorer uses. The hashing encoder is the default install's
+backend and is lexical: it measures keyword overlap, not meaning. Vectors
+are L2-normalized rows of a memory-mapped float32 matrix, so cosine
+similarity against a job is a single matrix-vector product and the top K
+come from an argpartition. Ranking tens of thousands of resumes takes
+milliseconds, and only the best candidates need to go to the LLM.
+"""
+import hashlib
+import importlib.util
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None
+
+from cache import LRUCache, make_cache_key
+from prescore import normalize_text
+
+DEFAULT_FASTEMBED_MODEL = "BAAI/bge-small-en-v1.5"
+DEFAULT_HASHING_DIM = 512
+# Below this share of the pool a job's rows are gathered before scoring,
+# above it the whole matrix is scored and the job's rows picked afterwards
+GATHER_RATIO = 0.25
+
+
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+@lru_cache(maxsize=200_000)
+def _bucket(feature, dim):
+    value = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+    return value % dim, 1.0 if value >> 63 else -1.0
+
+
+class HashingEncoder:
+    """
+    Terms and adjacent term pairs hashed into `dim` signed buckets with
+    sublinear term frequency. Lexical rather than semantic, but needs no
+    model files and encodes a resume in well under a millisecond.
+    """
+
+    backend = "hashing"
+
+    def __init__(self, dim=DEFAULT_HASHING_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text):
+        terms = normalize_text(text).split()
+        return terms + [f"{a} {b}" for a, b in zip(terms, terms[1:])]
+
+    def encode(self, texts):
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, count in Counter(self._features(text)).items():
+                index, sign = _bucket(feature, self.dim)
+                matrix[row, index] += sign * (1.0 + math.log(count))
+        return normalize_rows(matrix)
+
+
+class FastEmbedEncoder:
+    """Sentence embeddings from a small ONNX model on CPU (downloaded on first use)."""
+
+    backend = "fastembed"
+
+    def __init__(self, model_name=DEFAULT_FASTEMBED_MODEL):
+        from fastembed import TextEmbedding
+
+        self.model = TextEmbedding(model_name)
+        self.name = model_name
+        self.dim = len(next(iter(self.model.embed(["probe"]))))
+
+    def encode(self, texts):
+        return normalize_rows(np.array(list(self.model.embed(list(texts))), dtype=np.float32))
+
+
+def fastembed_available():
+    return importlib.util.find_spec("fastembed") is not None
+
+
+def load_encoder(backend="auto", model=DEFAULT_FASTEMBED_MODEL, dim=DEFAULT_HASHING_DIM):
+    """backend is auto, fastembed or hashing. auto uses fastembed when it is installed."""
+    if backend == "fastembed" or (backend == "auto" and fastembed_available()):
+        try:
+            return FastEmbedEncoder(model)
+        except Exception as e:
+            if backend == "fastembed":
+                raise
+            print(f"Could not load embedding model {model}, using hashing encoder: {str(e)}")
+    return HashingEncoder(dim)
+
+
+class EmbeddingIndex:
+    """
+    Resume vectors for every job's applicants in one memory-mapped matrix
+    (`vectors.npy`), with the row -> (job, applicant) map in SQLite
+    (`items.db`). Rows of removed applicants are reused. The encoder is
+    loaded on first use; if it differs from the one that built the files,
+    the index starts over.
+
+    Worker processes may share the directory: writes hold an flock on
+    `index.lock`, and each process reloads its row maps (and the matrix,
+    which another writer may have grown) once items.db shows a commit from
+    another connection.
+    """
+
+    def __init__(self, directory, backend="auto", model=DEFAULT_FASTEMBED_MODEL, dim=DEFAULT_HASHING_DIM,
+                 initial_capacity=1024, job_vector_cache=256):
+        self.directory = directory
+        self.backend = backend
+        self.model = model
+        self.dim = dim
+        self.initial_capacity = initial_capacity
+        self.encoder = None
+        self.job_vectors = LRUCache(job_vector_cache, ttl=float("inf"))
+        self.size = 0
+        self.encoded = 0
+        self.unchanged = 0
+        self.queries = 0
+        self.query_seconds = 0.0
+        self._vectors = None
+        self._conn = None
+        self._items = {}
+        self._rows = {}
+        self._job_rows = {}
+        self._job_arrays = {}
+        self._free = []
+        self._lock = threading.Lock()
+        self._lock_file = None
+        self._data_version = None
+        self.reloads = 0
+
+    # Storage
+
+    def _open(self):
+        """Loads the encoder and the files. Called with the lock held."""
+        if self.encoder is not None:
+            return
+        encoder = load_encoder(self.backend, self.model, self.dim)
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock_file = open(os.path.join(self.directory, "index.lock"), "a")
+        conn = sqlite3.connect(os.path.join(self.directory, "items.db"), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        with self._exclusive():
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS items ("
+                "row INTEGER PRIMARY KEY, job_id TEXT NOT NULL, item_id TEXT NOT NULL, resume_url TEXT NOT NULL, "
+                "cover_letter TEXT, content_hash TEXT NOT NULL, UNIQUE (job_id, item_id))"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            row = conn.execute("SELECT value FROM meta WHERE key = 'encoder'").fetchone()
+            signature = json.dumps({"name": encoder.name, "dim": encoder.dim})
+            path = os.path.join(self.directory, "vectors.npy")
+            if row is None or row[0] != signature or not os.path.exists(path):
+                if row is not None:
+                    print(f"Embedding encoder changed to {encoder.name}, rebuilding the index")
+                conn.execute("DELETE FROM items")
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('encoder', ?)", (signature,))
+                conn.commit()
+                np.lib.format.open_memmap(
+                    path, mode="w+", dtype=np.float32, shape=(self.initial_capacity, encoder.dim)
+                ).flush()
+            conn.commit()
+
+        self._conn = conn
+        self._load()
+        self.encoder = encoder
+        print(f"Embedding index ready ({encoder.name}, {len(self._items)} resumes)")
+
+    def _load(self):
+        """(Re)reads the row map and maps the matrix. Called with the lock held."""
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        self._vectors = np.load(os.path.join(self.directory, "vectors.npy"), mmap_mode="r+")
+        self._items, self._rows, self._job_rows, self._job_arrays = {}, {}, {}, {}
+        for row_id, job_id, item_id, resume_url, cover_letter, content_hash in self._conn.execute(
+            "SELECT row, job_id, item_id, resume_url, cover_letter, content_hash FROM items"
+        ):
+            self._remember(row_id, job_id, item_id, resume_url, cover_letter, content_hash)
+        self.size = max(self._items, default=-1) + 1
+        self._free = sorted(set(range(self.size)) - set(self._items), reverse=True)
+
+    def _refresh(self):
+        """Reloads if another process committed to items.db since the last load. Called with the lock held."""
+        if self._conn.execute("PRAGMA data_version").fetchone()[0] != self._data_version:
+            self._load()
+            self.reloads += 1
+
+    @contextmanager
+    def _exclusive(self):
+        """Cross-process write lock on the index directory."""
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _remember(self, row, job_id, item_id, resume_url, cover_letter, content_hash):
+        self._items[row] = {
+            "job_id": job_id,
+            "id": item_id,
+            "resume_url": resume_url,
+            "cover_letter": cover_letter,
+            "content_hash": content_hash,
+        }
+        self._rows[(job_id, item_id)] = row
+        self._job_rows.setdefault(job_id, set()).add(row)
+        self._job_arrays.pop(job_id, None)
+
+    def _forget(self, row):
+        item = self._items.pop(row)
+        del self._rows[(item["job_id"], item["id"])]
+        rows = self._job_rows[item["job_id"]]
+        rows.discard(row)
+        if not rows:
+            del self._job_rows[item["job_id"]]
+        self._job_arrays.pop(item["job_id"], None)
+        self._free.append(row)
+
+    def _allocate(self):
+        if self._free:
+            return self._free.pop()
+        if self.size == self._vectors.shape[0]:
+            self._grow(self.size * 2)
+        self.size += 1
+        return self.size - 1
+
+    def _grow(self, capacity):
+        """Doubles the matrix file: copy into a larger one, then swap it in."""
+        path = os.path.join(self.directory, "vectors.npy")
+        grown = np.lib.format.open_memmap(
+            path + ".tmp", mode="w+", dtype=np.float32, shape=(capacity, self._vectors.shape[1])
+        )
+        grown[:self.size] = self._vectors[:self.size]
+        grown.flush()
+        del grown
+        self._vectors.flush()
+        self._vectors = None
+        os.replace(path + ".tmp", path)
+        self._vectors = np.load(path, mmap_mode="r+")
+
+    # Operations
+
+    def warm(self):
+        """Loads the encoder and the files ahead of the first request."""
+        with self._lock:
+            self._open()
+
+    def add(self, job_id, items):
+        """
+        Indexes applicants of a job. items are dicts with id, resume_url,
+        cover_letter and text. Texts that did not change are not re-encoded.
+        Returns the number of (re-)encoded resumes.
+        """
+        with self._lock:
+            self._open()
+            self._refresh()
+        pending = []
+        for item in items:
+            content_hash = make_cache_key(item["text"])
+            with self._lock:
+                row = self._rows.get((job_id, item["id"]))
+                current = self._items.get(row) if row is not None else None
+            if current is not None and current["content_hash"] == content_hash:
+                self.unchanged += 1
+                continue
+            pending.append((item, content_hash))
+        if not pending:
+            return 0
+
+        vectors = self.encoder.encode([item["text"] for item, _ in pending])
+        with self._lock, self._exclusive():
+            self._refresh()
+            for (item, content_hash), vector in zip(pending, vectors):
+                row = self._rows.get((job_id, item["id"]))
+                if row is None:
+                    row = self._allocate()
+                self._vectors[row] = vector
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO items (row, job_id, item_id, resume_url, cover_letter, content_hash) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (row, job_id, item["id"], item["resume_url"], item.get("cover_letter"), content_hash),
+                )
+                self._remember(row, job_id, item["id"], item["resume_url"], item.get("cover_letter"), content_hash)
+            self._vectors.flush()
+            self._conn.commit()
+        self.encoded += len(pending)
+        return len(pending)
+
+    def remove_job(self, job_id):
+        """Drops every applicant of a job. Returns how many were indexed."""
+        with self._lock:
+            self._open()
+        with self._lock, self._exclusive():
+            self._refresh()
+            rows = list(self._job_rows.get(job_id, ()))
+            for row in rows:
+                self._forget(row)
+            self._conn.execute("DELETE FROM items WHERE job_id = ?", (job_id,))
+            self._conn.commit()
+        return len(rows)
+
+    def job_vector(self, job_text):
+        key = make_cache_key(self.encoder.name, job_text)
+        vector = self.job_vectors.get(key)
+        if vector is None:
+            vector = self.encoder.encode([job_text])[0]
+            self.job_vectors.set(key, vector)
+        return vector
+
+    def rank(self, job_id, job_text, top_k=20):
+        """
+        Top-K applicants of a job by cosine similarity to its text. Returns
+        (candidates, pool_size); candidates are dicts with id, resume_url,
+        cover_letter and similarity, best first.
+        """
+        started = time.perf_counter()
+        with self._lock:
+            self._open()
+        query = self.job_vector(job_text)
+        with self._lock:
+            self._refresh()
+            rows = self._job_arrays.get(job_id)
+            if rows is None:
+                rows = np.fromiter(sorted(self._job_rows.get(job_id, ())), dtype=np.int64)
+                self._job_arrays[job_id] = rows
+            if not len(rows):
+                return [], 0
+            if len(rows) < GATHER_RATIO * self.size:
+                scores = self._vectors[rows] @ query
+            else:
+                scores = (self._vectors[:self.size] @ query)[rows]
+            k = min(top_k, len(rows))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            candidates = [
+                {**self._items[int(rows[i])], "similarity": round(float(scores[i]), 4)} for i in top
+            ]
+        self.queries += 1
+        self.query_seconds += time.perf_counter() - started
+        return candidates, len(rows)
+
+    def close(self):
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+            if self._conn is not None:
+                self._conn.close()
+            if self._lock_file is not None:
+                self._lock_file.close()
+
+    def stats(self):
+        return {
+            "backend": self.encoder.backend if self.encoder is not None else None,
+            "encoder": self.encoder.name if self.encoder is not None else None,
+            "resumes": len(self._items),
+            "jobs": len(self._job_rows),
+            "capacity": self._vectors.shape[0] if self._vectors is not None else 0,
+            "encoded": self.encoded,
+            "unchanged": self.unchanged,
+            "reloads": self.reloads,
+            "queries": self.queries,
+            "average_query_ms": round(self.query_seconds / self.queries * 1000, 2) if self.queries else 0.0,
+        }
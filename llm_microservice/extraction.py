@@ -0,0 +1,270 @@
+"""
+Resume download and text extraction with caching.
+
+Extracted text is cached by the SHA-256 of the PDF bytes, and the origin's
+ETag / Last-Modified validators are remembered per URL. A resume that was
+already seen is revalidated with a conditional GET (no body on 304) and
+never parsed twice, however many jobs it is scored against.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+import zlib
+
+import httpx
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from cache import LRUCache
+from metrics import record_upstream_error, stage
+from pdf_engine import MAGIC_SEARCH_BYTES, looks_like_pdf
+
+
+class TextStore:
+    """
+    zlib-compressed extracted text in SQLite, keyed by PDF SHA-256, plus the
+    last seen validators for each resume URL. Least recently used texts are
+    evicted once the compressed total exceeds max_bytes.
+    """
+
+    def __init__(self, path, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS texts ("
+            "sha256 TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS validators ("
+            "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, sha256 TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_text(self, sha256):
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM texts WHERE sha256 = ?", (sha256,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE texts SET accessed_at = ? WHERE sha256 = ?", (time.time(), sha256))
+            self._conn.commit()
+        return zlib.decompress(row[0]).decode("utf-8")
+
+    def set_text(self, sha256, text):
+        data = zlib.compress(text.encode("utf-8"), 6)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO texts (sha256, data, size, accessed_at) VALUES (?, ?, ?, ?)",
+                (sha256, data, len(data), time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM texts").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT sha256, size FROM texts ORDER BY accessed_at").fetchall()
+        for sha256, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM texts WHERE sha256 = ?", (sha256,))
+            total -= size
+
+    def get_validators(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, sha256 FROM validators WHERE url = ?", (url,)
+            ).fetchone()
+        return dict(zip(("etag", "last_modified", "sha256"), row)) if row else None
+
+    def set_validators(self, url, validators):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO validators (url, etag, last_modified, sha256) VALUES (?, ?, ?, ?)",
+                (url, validators["etag"], validators["last_modified"], validators["sha256"]),
+            )
+            self._conn.commit()
+
+    def stored_bytes(self):
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM texts").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ResumeTextCache:
+    """
+    In-memory LRU for texts and URL validators, backed by an optional
+    on-disk TextStore (when db_path is set).
+    """
+
+    def __init__(self, max_entries=512, db_path=None, max_bytes=256 * 1024 * 1024):
+        self.texts = LRUCache(max_entries, ttl=float("inf"))
+        self.validators = LRUCache(max_entries * 4, ttl=float("inf"))
+        self.store = TextStore(db_path, max_bytes) if db_path else None
+        self.not_modified = 0
+        self.hash_hits = 0
+        self.parses = 0
+
+    def get_text(self, sha256):
+        text = self.texts.get(sha256)
+        if text is None and self.store is not None:
+            text = self.store.get_text(sha256)
+            if text is not None:
+                self.texts.set(sha256, text)
+        return text
+
+    def set_text(self, sha256, text):
+        self.texts.set(sha256, text)
+        if self.store is not None:
+            self.store.set_text(sha256, text)
+
+    def get_validators(self, url):
+        validators = self.validators.get(url)
+        if validators is None and self.store is not None:
+            validators = self.store.get_validators(url)
+            if validators is not None:
+                self.validators.set(url, validators)
+        return validators
+
+    def set_validators(self, url, validators):
+        self.validators.set(url, validators)
+        if self.store is not None:
+            self.store.set_validators(url, validators)
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+
+    def stats(self):
+        return {
+            "not_modified": self.not_modified,
+            "hash_hits": self.hash_hits,
+            "parses": self.parses,
+            "memory_entries": len(self.texts),
+            "disk_bytes": self.store.stored_bytes() if self.store is not None else None,
+        }
+
+
+async def fetch_resume(client, resume_url, headers=None, max_bytes=None):
+    """
+    Streams the resume over the shared keep-alive pool, giving up as soon as
+    the body exceeds max_bytes or does not start like a PDF.
+    Returns (response, body); body is empty on 304.
+    """
+    try:
+        with stage("download"):
+            async with client.stream("GET", resume_url, headers=headers) as resume_response:
+                if resume_response.status_code == 304:
+                    return resume_response, b""
+                resume_response.raise_for_status()
+
+                declared = resume_response.headers.get("content-length")
+                if max_bytes and declared and declared.isdigit() and int(declared) > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"Resume exceeds {max_bytes} bytes")
+
+                body = bytearray()
+                checked_magic = False
+                async for chunk in resume_response.aiter_bytes():
+                    body += chunk
+                    if max_bytes and len(body) > max_bytes:
+                        raise HTTPException(status_code=413, detail=f"Resume exceeds {max_bytes} bytes")
+                    if not checked_magic and len(body) >= MAGIC_SEARCH_BYTES:
+                        checked_magic = True
+                        if not looks_like_pdf(bytes(body[:MAGIC_SEARCH_BYTES])):
+                            raise HTTPException(status_code=415, detail="Resume is not a PDF file")
+                return resume_response, bytes(body)
+    except httpx.TimeoutException:
+        record_upstream_error("resume_download", "timeout")
+        raise HTTPException(status_code=408, detail="Resume download timeout - file may be too large or server slow")
+    except httpx.HTTPStatusError as e:
+        record_upstream_error("resume_download", f"http_{e.response.status_code}")
+        raise HTTPException(status_code=400, detail=f"Could not download resume: {str(e)}")
+    except httpx.HTTPError as e:
+        record_upstream_error("resume_download", type(e).__name__)
+        raise HTTPException(status_code=400, detail=f"Could not download resume: {str(e)}")
+
+
+async def download_resume(client, resume_url, text_cache, max_bytes=None):
+    """
+    Download half of load_resume_text. Returns (cached_text, None) when the
+    origin answers 304 for a resume whose text is cached, else (None, file_bytes).
+    """
+    validators = await run_in_threadpool(text_cache.get_validators, resume_url)
+    cached_text = None
+    conditional = {}
+    if validators is not None:
+        cached_text = await run_in_threadpool(text_cache.get_text, validators["sha256"])
+        if cached_text is not None:
+            if validators["etag"]:
+                conditional["If-None-Match"] = validators["etag"]
+            if validators["last_modified"]:
+                conditional["If-Modified-Since"] = validators["last_modified"]
+
+    resume_response, file_bytes = await fetch_resume(
+        client, resume_url, headers=conditional or None, max_bytes=max_bytes
+    )
+
+    if resume_response.status_code == 304 and cached_text is not None:
+        text_cache.not_modified += 1
+        print("Resume not modified since last download, reusing extracted text")
+        return cached_text, None
+
+    # Validate content type
+    content_type = resume_response.headers.get('content-type', '')
+    if 'pdf' not in content_type.lower() and not resume_url.lower().endswith('.pdf'):
+        print(f"Warning: Content-Type is '{content_type}', proceeding anyway")
+
+    etag = resume_response.headers.get("etag")
+    last_modified = resume_response.headers.get("last-modified")
+    if etag or last_modified:
+        await run_in_threadpool(text_cache.set_validators, resume_url, {
+            "etag": etag,
+            "last_modified": last_modified,
+            "sha256": hashlib.sha256(file_bytes).hexdigest(),
+        })
+    return None, file_bytes
+
+
+async def cached_resume_text(sha256, text_cache):
+    """Extracted text for PDF bytes with this SHA-256, if they were parsed before."""
+    text = await run_in_threadpool(text_cache.get_text, sha256)
+    if text is not None:
+        text_cache.hash_hits += 1
+    return text
+
+
+async def parse_resume_text(file_bytes, sha256, text_cache, extractor):
+    """Extracts the text and caches it under the bytes' SHA-256."""
+    # Extract text from PDF (off the event loop - parsing is CPU-bound)
+    with stage("pdf_parse"):
+        text = await extractor.extract(file_bytes)
+    text_cache.parses += 1
+    if text.strip():
+        await run_in_threadpool(text_cache.set_text, sha256, text)
+    return text
+
+
+async def extract_resume_text(file_bytes, text_cache, extractor):
+    """Parse half of load_resume_text: identical bytes are only parsed once."""
+    sha256 = hashlib.sha256(file_bytes).hexdigest()
+    text = await cached_resume_text(sha256, text_cache)
+    if text is not None:
+        return text
+    return await parse_resume_text(file_bytes, sha256, text_cache, extractor)
+
+
+async def load_resume_text(client, resume_url, text_cache, extractor):
+    """
+    Returns the extracted text for a resume URL, skipping the download when
+    the origin answers 304 and skipping the parse when the bytes are known.
+    """
+    cached_text, file_bytes = await download_resume(client, resume_url, text_cache, extractor.max_bytes)
+    if cached_text is not None:
+        return cached_text
+    return await extract_resume_text(file_bytes, text_cache, extractor)
@@ -0,0 +1,292 @@
+"""
+Registered job contexts for resume analysis.
+
+A job's compacted summary, tags and derived keyword set are stored once
+under its job ID, so analysis requests can reference the job instead of
+resending (and re-compacting) its description for every applicant. The
+summary is stored exactly as it goes into the prompt, which keeps the
+prompt prefix byte-identical across applicants and lets provider prompt
+caching apply.
+
+Every change of a job's context gets a new version, and the last few
+versions are kept so an edit can be diffed against what earlier analyses
+were scored on. The outcome of each analysis made against a registered job
+is stored with the version it used and the applicant's compacted resume
+text, so an edit can be applied to existing applicants incrementally
+instead of re-running every one of them through the LLM.
+
+Several worker processes can share one database file. Each keeps its own
+LRU of job records; a remembered record is used only while the stored
+version and fingerprint still match it, so an edit made through one worker
+is seen by all of them. Versions are assigned inside the write
+transaction, so concurrent edits never reuse one.
+"""
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+from cache import LRUCache, make_cache_key
+from prescore import normalize_text
+
+KEPT_VERSIONS = 10
+
+
+def job_fingerprint(summary, tags):
+    return make_cache_key(summary, sorted(tags or []))
+
+
+def diff_job_contexts(old, new):
+    """
+    What changed between two versions of a job: keywords added and removed,
+    and summary_change, the share of summary terms not in both (0 = same
+    terms, 1 = nothing in common).
+    """
+    old_terms = set(normalize_text(old["summary"]).split())
+    new_terms = set(normalize_text(new["summary"]).split())
+    union = old_terms | new_terms
+    return {
+        "from_version": old["version"],
+        "to_version": new["version"],
+        "added_keywords": [k for k in new["keywords"] if k not in set(old["keywords"])],
+        "removed_keywords": [k for k in old["keywords"] if k not in set(new["keywords"])],
+        "summary_change": round(1 - len(old_terms & new_terms) / len(union), 3) if union else 0.0,
+    }
+
+
+class JobRegistry:
+    """
+    Job contexts in a SQLite table with an in-memory LRU in front. Records
+    are plain dicts: job_id, summary, tags, keywords, summary_tokens,
+    fingerprint, version and updated_at.
+    """
+
+    def __init__(self, db_path, max_entries=1024):
+        self.memory = LRUCache(max_entries, ttl=float("inf"))
+        self.lookups = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self.updates = 0
+        self.unchanged = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "job_id TEXT PRIMARY KEY, summary TEXT NOT NULL, tags TEXT NOT NULL, keywords TEXT NOT NULL, "
+            "summary_tokens INTEGER NOT NULL, fingerprint TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        if "version" not in {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_versions ("
+            "job_id TEXT NOT NULL, version INTEGER NOT NULL, summary TEXT NOT NULL, tags TEXT NOT NULL, "
+            "keywords TEXT NOT NULL, fingerprint TEXT NOT NULL, created_at REAL NOT NULL, "
+            "PRIMARY KEY (job_id, version))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_results ("
+            "job_id TEXT NOT NULL, applicant_id TEXT NOT NULL, version INTEGER NOT NULL, "
+            "text_hash TEXT NOT NULL, cover_letter TEXT, result TEXT NOT NULL, updated_at REAL NOT NULL, "
+            "PRIMARY KEY (job_id, applicant_id))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS resume_texts (text_hash TEXT PRIMARY KEY, data BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _select(self, job_id):
+        row = self._conn.execute(
+            "SELECT job_id, summary, tags, keywords, summary_tokens, fingerprint, updated_at, version "
+            "FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row[0],
+            "summary": row[1],
+            "tags": json.loads(row[2]),
+            "keywords": json.loads(row[3]),
+            "summary_tokens": row[4],
+            "fingerprint": row[5],
+            "updated_at": row[6],
+            "version": row[7],
+        }
+
+    def get(self, job_id):
+        """
+        The job's current context. A remembered record is checked against the
+        stored version and fingerprint (one primary-key lookup), so edits made
+        by other workers are seen without dropping other jobs from memory.
+        """
+        self.lookups += 1
+        record = self.memory.get(job_id)
+        with self._lock:
+            if record is not None:
+                current = self._conn.execute(
+                    "SELECT version, fingerprint FROM jobs WHERE job_id = ?", (job_id,)
+                ).fetchone()
+                if current == (record["version"], record["fingerprint"]):
+                    self.memory_hits += 1
+                    return record
+                self.memory.pop(job_id)
+                self.invalidations += 1
+            record = self._select(job_id)
+        if record is None:
+            self.misses += 1
+            return None
+        self.memory.set(job_id, record)
+        return record
+
+    def get_version(self, job_id, version):
+        """An earlier context of a job (summary, tags, keywords), or None once pruned."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, tags, keywords, fingerprint FROM job_versions WHERE job_id = ? AND version = ?",
+                (job_id, version),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": job_id,
+            "version": version,
+            "summary": row[0],
+            "tags": json.loads(row[1]),
+            "keywords": json.loads(row[2]),
+            "fingerprint": row[3],
+        }
+
+    def put(self, job_id, summary, tags, keywords, summary_tokens):
+        """
+        Stores the job's context. Returns (record, changed); an identical
+        summary and tag set leaves the stored record untouched.
+        """
+        fingerprint = job_fingerprint(summary, tags)
+        tags = list(tags or [])
+        tags_json, keywords_json = json.dumps(tags), json.dumps(list(keywords))
+        with self._lock:
+            # The current version is read inside the write transaction, so
+            # concurrent edits (threads or workers) get consecutive versions
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                current = self._select(job_id)
+                if current is not None and current["fingerprint"] == fingerprint:
+                    self._conn.rollback()
+                    self.memory.set(job_id, current)
+                    self.unchanged += 1
+                    return current, False
+                record = {
+                    "job_id": job_id,
+                    "summary": summary,
+                    "tags": tags,
+                    "keywords": list(keywords),
+                    "summary_tokens": summary_tokens,
+                    "fingerprint": fingerprint,
+                    "updated_at": time.time(),
+                    "version": current["version"] + 1 if current is not None else 1,
+                }
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO jobs "
+                    "(job_id, summary, tags, keywords, summary_tokens, fingerprint, updated_at, version) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, summary, tags_json, keywords_json, summary_tokens, fingerprint, record["updated_at"],
+                     record["version"]),
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO job_versions "
+                    "(job_id, version, summary, tags, keywords, fingerprint, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, record["version"], summary, tags_json, keywords_json, fingerprint, record["updated_at"]),
+                )
+                self._conn.execute(
+                    "DELETE FROM job_versions WHERE job_id = ? AND version <= ?",
+                    (job_id, record["version"] - KEPT_VERSIONS),
+                )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        self.memory.set(job_id, record)
+        self.updates += 1
+        return record, True
+
+    def delete(self, job_id):
+        """Returns True when the job was registered. Its versions and stored results go too."""
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,)).rowcount
+            self._conn.execute("DELETE FROM job_versions WHERE job_id = ?", (job_id,))
+            self._conn.execute("DELETE FROM job_results WHERE job_id = ?", (job_id,))
+            self._conn.execute(
+                "DELETE FROM resume_texts WHERE text_hash NOT IN (SELECT text_hash FROM job_results)"
+            )
+            self._conn.commit()
+        self.memory.pop(job_id)
+        return deleted > 0
+
+    # Per-applicant results
+
+    def record_result(self, job_id, applicant_id, version, resume_text, cover_letter, result):
+        """
+        Stores an applicant's latest result for a job, with the job version
+        it was scored on and the (compacted) resume text it was scored from.
+        """
+        text_hash = make_cache_key(resume_text)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO resume_texts (text_hash, data) VALUES (?, ?)",
+                (text_hash, zlib.compress(resume_text.encode("utf-8"), 6)),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO job_results "
+                "(job_id, applicant_id, version, text_hash, cover_letter, result, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, applicant_id, version, text_hash, cover_letter, json.dumps(result), time.time()),
+            )
+            self._conn.commit()
+
+    def results(self, job_id, before_version=None):
+        """Stored results for a job's applicants, optionally only those scored before a version."""
+        query = "SELECT applicant_id, version, text_hash, cover_letter, result, updated_at FROM job_results " \
+                "WHERE job_id = ?"
+        params = [job_id]
+        if before_version is not None:
+            query += " AND version < ?"
+            params.append(before_version)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY applicant_id", params).fetchall()
+        return [
+            {
+                "applicant_id": row[0],
+                "version": row[1],
+                "text_hash": row[2],
+                "cover_letter": row[3],
+                "result": json.loads(row[4]),
+                "updated_at": row[5],
+            }
+            for row in rows
+        ]
+
+    def resume_text(self, text_hash):
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM resume_texts WHERE text_hash = ?", (text_hash,)).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row else None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self):
+        return {
+            "jobs": len(self),
+            "lookups": self.lookups,
+            "memory_hits": self.memory_hits,
+            "misses": self.misses,
+            "updates": self.updates,
+            "unchanged": self.unchanged,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,278 @@
+"""
+Durable background job queue for resume analysis.
+
+Jobs live in a SQLite table so they survive restarts. Workers claim a job
+with a lease; if a worker dies mid-job the lease expires and another worker
+picks it up again (at-least-once). Failures are retried with exponential
+backoff, identical inputs are deduplicated by hash, and finished jobs can be
+polled or pushed to a webhook.
+"""
+import asyncio
+import json
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from metrics import record_upstream_error
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+WEBHOOK_ATTEMPTS = 3
+
+
+class JobQueue:
+    """
+    SQLite-backed queue plus an in-process worker pool.
+
+    Handlers are registered in start(): a mapping from job kind to an async
+    callable taking the job payload as keyword arguments and returning a
+    pydantic model or a JSON-ready dict.
+    """
+
+    def __init__(self, db_path, workers=4, max_attempts=5, backoff_base=2.0,
+                 lease_seconds=300, dedup_ttl=86400, poll_interval=1.0):
+        self.handlers = {}
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.lease_seconds = lease_seconds
+        self.dedup_ttl = dedup_ttl
+        self.poll_interval = poll_interval
+        self.webhook_client = None
+        self.processed = 0
+        self.retried = 0
+        self.deduplicated = 0
+        self._lock = threading.Lock()
+        self._wakeup = None
+        self._tasks = []
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, input_hash TEXT NOT NULL, payload TEXT NOT NULL, "
+            "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, next_run_at REAL NOT NULL, "
+            "lease_expires_at REAL, result TEXT, error TEXT, callback_url TEXT, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_input_hash ON jobs (input_hash)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, next_run_at)")
+
+    # Storage
+
+    def enqueue(self, kind, payload, input_hash, callback_url=None):
+        """
+        Adds a job, or returns the existing one for the same input hash.
+        A previously failed duplicate is reset and retried instead.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, status FROM jobs WHERE input_hash = ? AND created_at >= ? "
+                    "ORDER BY created_at DESC LIMIT 1",
+                    (input_hash, now - self.dedup_ttl),
+                ).fetchone()
+                if row and row[1] != FAILED:
+                    self.deduplicated += 1
+                    job_id = row[0]
+                elif row:
+                    job_id = row[0]
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, attempts = 0, next_run_at = ?, error = NULL, "
+                        "callback_url = COALESCE(?, callback_url), updated_at = ? WHERE id = ?",
+                        (QUEUED, now, callback_url, now, job_id),
+                    )
+                else:
+                    job_id = uuid.uuid4().hex
+                    self._conn.execute(
+                        "INSERT INTO jobs (id, kind, input_hash, payload, status, next_run_at, callback_url, "
+                        "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (job_id, kind, input_hash, json.dumps(payload), QUEUED, now, callback_url, now, now),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, kind, status, attempts, result, error, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row[0],
+            "kind": row[1],
+            "status": row[2],
+            "attempts": row[3],
+            "result": json.loads(row[4]) if row[4] else None,
+            "error": row[5],
+            "created_at": row[6],
+            "updated_at": row[7],
+        }
+
+    def claim(self):
+        """Leases the next runnable job (queued and due, or running with an expired lease)."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, kind, payload, attempts, callback_url FROM jobs "
+                    "WHERE (status = ? AND next_run_at <= ?) OR (status = ? AND lease_expires_at < ?) "
+                    "ORDER BY next_run_at LIMIT 1",
+                    (QUEUED, now, RUNNING, now),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_expires_at = ?, updated_at = ? "
+                        "WHERE id = ?",
+                        (RUNNING, now + self.lease_seconds, now, row[0]),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "kind": row[1],
+            "payload": json.loads(row[2]),
+            "attempts": row[3] + 1,
+            "callback_url": row[4],
+        }
+
+    def complete(self, job_id, result):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_expires_at = NULL, updated_at = ? "
+                "WHERE id = ?",
+                (SUCCEEDED, json.dumps(result), time.time(), job_id),
+            )
+
+    def fail(self, job_id, attempts, error, retryable):
+        """Schedules a retry with exponential backoff, or marks the job failed for good."""
+        now = time.time()
+        with self._lock:
+            if retryable and attempts < self.max_attempts:
+                delay = self.backoff_base ** attempts + random.uniform(0, 1)
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, next_run_at = ?, error = ?, lease_expires_at = NULL, updated_at = ? "
+                    "WHERE id = ?",
+                    (QUEUED, now + delay, error, now, job_id),
+                )
+                return True
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_expires_at = NULL, updated_at = ? WHERE id = ?",
+                (FAILED, error, now, job_id),
+            )
+            return False
+
+    def counts(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # Workers
+
+    async def start(self, handlers, webhook_client=None):
+        self.handlers = handlers
+        self.webhook_client = webhook_client
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+        print(f"Job queue started with {self.workers} workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self, number):
+        while True:
+            try:
+                job = await run_in_threadpool(self.claim)
+            except Exception as e:
+                print(f"Job queue worker {number} could not claim a job: {str(e)}")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job):
+        handler = self.handlers.get(job["kind"])
+        try:
+            if handler is None:
+                raise HTTPException(status_code=400, detail=f"Unknown job kind: {job['kind']}")
+            result = await handler(**job["payload"])
+            if hasattr(result, "model_dump"):
+                result = result.model_dump()
+        except asyncio.CancelledError:
+            # Shutting down - the lease expires and another worker retries the job
+            raise
+        except Exception as e:
+            # Client errors (bad URL, unreadable PDF) will not succeed on retry; timeouts and rate limits may
+            retryable = not (isinstance(e, HTTPException) and 400 <= e.status_code < 500 and e.status_code not in (408, 429))
+            error = str(e.detail) if isinstance(e, HTTPException) else f"{type(e).__name__}: {str(e)}"
+            will_retry = await run_in_threadpool(self.fail, job["id"], job["attempts"], error, retryable)
+            if will_retry:
+                self.retried += 1
+                print(f"Job {job['id']} failed (attempt {job['attempts']}), retrying: {error}")
+            else:
+                print(f"Job {job['id']} failed permanently: {error}")
+                await self._notify(job, {"job_id": job["id"], "status": FAILED, "result": None, "error": error})
+            return
+        await run_in_threadpool(self.complete, job["id"], result)
+        self.processed += 1
+        await self._notify(job, {"job_id": job["id"], "status": SUCCEEDED, "result": result, "error": None})
+
+    async def _notify(self, job, body):
+        """Best-effort webhook delivery with a few quick retries."""
+        if not job["callback_url"] or self.webhook_client is None:
+            return
+        for attempt in range(WEBHOOK_ATTEMPTS):
+            try:
+                response = await self.webhook_client.post(job["callback_url"], json=body)
+                response.raise_for_status()
+                return
+            except Exception as e:
+                record_upstream_error("webhook", type(e).__name__)
+                print(f"Webhook for job {job['id']} failed (attempt {attempt + 1}): {str(e)}")
+                await asyncio.sleep(self.backoff_base ** attempt)
+
+    def stats(self):
+        return {
+            **self.counts(),
+            "workers": self.workers,
+            "processed": self.processed,
+            "retried": self.retried,
+            "deduplicated": self.deduplicated,
+        }
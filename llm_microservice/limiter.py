@@ -0,0 +1,437 @@
+"""
+Client-side rate limiting and admission control for model calls.
+
+Two token buckets hold the service under the provider's requests-per-minute
+and tokens-per-minute limits, and a concurrency cap bounds in-flight calls.
+Calls that cannot start at once wait in a bounded queue ordered by endpoint
+priority (resume scoring ahead of job summaries), with waiting time slowly
+raising a call's priority so nothing starves. When the queue is full or the
+expected wait is too long the call is refused at once with 429/503 and a
+Retry-After, instead of timing out later.
+
+With a bucket store the RPM/TPM budgets are shared by every worker process
+that opens it, so N workers together stay under one provider limit. The
+concurrency cap and the wait queue stay per process.
+"""
+import asyncio
+import itertools
+import math
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException
+
+from metrics import current_endpoint, stage
+
+# Seconds before retrying a shared bucket whose store another process is writing
+STORE_BUSY_RETRY = 0.005
+
+
+class TokenBucket:
+    """Refills continuously at per_minute / 60 per second up to `capacity`. per_minute=0 disables it."""
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    @property
+    def enabled(self):
+        return self.rate > 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` tokens are available (amount is capped at capacity)."""
+        if not self.enabled:
+            return 0.0
+        self._refill()
+        missing = min(amount, self.capacity) - self.tokens
+        return max(missing / self.rate, 0.0)
+
+    def take(self, amount):
+        if self.enabled:
+            self._refill()
+            self.tokens -= amount
+
+    def adjust(self, amount):
+        """Charges (or refunds) the difference between an estimate and actual use. May go negative."""
+        if self.enabled:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class SqliteBucketStore:
+    """
+    Token bucket levels in a SQLite table (WAL), refilled, checked and
+    charged in one IMMEDIATE transaction so concurrent processes never
+    double-spend. The calls run on the event loop, so they never wait for
+    the write lock: when another process holds it they return None and the
+    caller retries a moment later. Any object with the same
+    level()/try_take()/update() methods can stand in for it.
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        # Setup may wait for the other workers; bucket calls must not
+        self._conn.execute("PRAGMA busy_timeout=0")
+
+    @staticmethod
+    def _refilled(row, rate, capacity, now):
+        if row is None:
+            return capacity
+        tokens, updated_at = row
+        return min(capacity, tokens + max(now - updated_at, 0.0) * rate)
+
+    @staticmethod
+    def _is_busy(error):
+        return "locked" in str(error) or "busy" in str(error)
+
+    def _begin(self):
+        """Takes the write lock if it is free. False when another connection holds it."""
+        try:
+            self._conn.execute("BEGIN IMMEDIATE")
+            return True
+        except sqlite3.OperationalError as e:
+            if self._is_busy(e):
+                return False
+            raise
+
+    def level(self, name, rate, capacity):
+        """
+        Current tokens in the bucket, without changing it. WAL reads rarely
+        wait for writers, but when one would, this returns None instead.
+        """
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._conn.execute("SELECT tokens, updated_at FROM buckets WHERE name = ?", (name,)).fetchone()
+        except sqlite3.OperationalError as e:
+            if self._is_busy(e):
+                return None
+            raise
+        return self._refilled(row, rate, capacity, now)
+
+    def try_take(self, charges):
+        """
+        charges is a list of (name, rate, capacity, amount, carried). Refills
+        each bucket and removes `carried` (usage settled while the lock was
+        busy). Then, only if every bucket holds min(amount, capacity), removes
+        the amounts too. Returns 0.0 when taken, the seconds until it could be
+        when not, or None when the lock was busy and nothing was written.
+        """
+        with self._lock:
+            if not self._begin():
+                return None
+            try:
+                now = time.time()
+                levels = []
+                for name, rate, capacity, amount, carried in charges:
+                    row = self._conn.execute("SELECT tokens, updated_at FROM buckets WHERE name = ?", (name,)).fetchone()
+                    levels.append(min(capacity, self._refilled(row, rate, capacity, now) - carried))
+                wait = max(
+                    max((min(amount, capacity) - tokens) / rate, 0.0)
+                    for (_, rate, capacity, amount, _), tokens in zip(charges, levels)
+                )
+                for (name, _, _, amount, _), tokens in zip(charges, levels):
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+                        (name, tokens - amount if wait == 0 else tokens, now),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    def update(self, name, rate, capacity, amount):
+        """
+        Refills the bucket, removes `amount` (negative refunds, capped at
+        capacity). Returns the new level, or None when the lock was busy.
+        """
+        with self._lock:
+            if not self._begin():
+                return None
+            try:
+                now = time.time()
+                row = self._conn.execute("SELECT tokens, updated_at FROM buckets WHERE name = ?", (name,)).fetchone()
+                tokens = min(capacity, self._refilled(row, rate, capacity, now) - amount)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO buckets (name, tokens, updated_at) VALUES (?, ?, ?)", (name, tokens, now)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return tokens
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SharedTokenBucket:
+    """
+    TokenBucket whose level lives in a bucket store shared between
+    processes. Calls are granted with take_shared(), which checks and
+    charges all buckets of a call at once; usage that could not be written
+    because the store was busy is carried into the next write.
+    """
+
+    def __init__(self, store, name, per_minute, capacity=None):
+        self.store = store
+        self.name = name
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.carried = 0.0
+        # Last level read from the store, for when it is busy
+        self._level = self.capacity
+        self._level_at = time.time()
+
+    @property
+    def enabled(self):
+        return self.rate > 0
+
+    def _remember(self, level):
+        self._level, self._level_at = level, time.time()
+
+    @property
+    def tokens(self):
+        """The stored level, or the last one read (refilled since) while the store is busy."""
+        level = self.store.level(self.name, self.rate, self.capacity)
+        if level is None:
+            level = min(self.capacity, self._level + (time.time() - self._level_at) * self.rate)
+        else:
+            self._remember(level)
+        return level - self.carried
+
+    def wait_time(self, amount):
+        """Estimate only - other processes may charge the bucket before take_shared() runs."""
+        if not self.enabled:
+            return 0.0
+        missing = min(amount, self.capacity) - self.tokens
+        return max(missing / self.rate, 0.0)
+
+    def adjust(self, amount):
+        if self.enabled:
+            level = self.store.update(self.name, self.rate, self.capacity, self.carried + amount)
+            if level is None:
+                self.carried += amount
+            else:
+                self._remember(level)
+                self.carried = 0.0
+
+
+def take_shared(store, takes):
+    """
+    Charges (bucket, amount) pairs of shared buckets in one transaction, or
+    none of them. Returns 0.0 when charged, else the seconds to wait before
+    trying again.
+    """
+    takes = [(bucket, amount) for bucket, amount in takes if bucket.enabled]
+    if not takes:
+        return 0.0
+    wait = store.try_take([(b.name, b.rate, b.capacity, amount, b.carried) for b, amount in takes])
+    if wait is None:
+        return STORE_BUSY_RETRY
+    for bucket, _ in takes:
+        bucket.carried = 0.0
+    return wait
+
+
+class Waiter:
+    __slots__ = ("priority", "tokens", "enqueued_at", "order", "future")
+
+    def __init__(self, priority, tokens, order):
+        self.priority = priority
+        self.tokens = tokens
+        self.enqueued_at = time.monotonic()
+        self.order = order
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class AdmissionController:
+    """
+    Grants model-call slots within the RPM/TPM budgets and concurrency cap.
+    Use `async with admission.slot(estimated_tokens) as grant:` and report
+    the provider's usage with grant.settle(usage). bucket_store shares the
+    RPM/TPM buckets across processes (see SqliteBucketStore).
+    """
+
+    def __init__(self, requests_per_minute=60, tokens_per_minute=100_000, max_concurrency=16,
+                 max_queue=100, max_wait=10.0, priorities=None, default_priority=1, aging_seconds=10.0,
+                 bucket_store=None):
+        if bucket_store is not None:
+            self.requests = SharedTokenBucket(bucket_store, "requests", requests_per_minute)
+            self.tokens = SharedTokenBucket(bucket_store, "tokens", tokens_per_minute)
+        else:
+            self.requests = TokenBucket(requests_per_minute)
+            self.tokens = TokenBucket(tokens_per_minute)
+        self.bucket_store = bucket_store
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.priorities = priorities or {}
+        self.default_priority = default_priority
+        self.aging_seconds = aging_seconds
+        self.in_flight = 0
+        self._queue = []
+        self._order = itertools.count()
+        self._timer = None
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_rate_limited = 0
+        self.rejected_queue_full = 0
+        self.timed_out = 0
+        self.total_wait = 0.0
+
+    def priority_for(self, endpoint):
+        return self.priorities.get(endpoint, self.default_priority)
+
+    def _effective_priority(self, waiter, now):
+        return waiter.priority - (now - waiter.enqueued_at) / self.aging_seconds, waiter.order
+
+    def _wait_for(self, tokens):
+        return max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+
+    def _estimate_wait(self, tokens):
+        """Rough wait for a new call: everything queued ahead goes first."""
+        ahead_requests = len(self._queue) + 1
+        ahead_tokens = sum(w.tokens for w in self._queue) + tokens
+        waits = [self._wait_for(tokens)]
+        if self.requests.enabled:
+            waits.append((ahead_requests - self.requests.tokens) / self.requests.rate)
+        if self.tokens.enabled:
+            waits.append((ahead_tokens - self.tokens.tokens) / self.tokens.rate)
+        return max(max(waits), 0.0)
+
+    def _reject(self, status_code, detail, retry_after):
+        raise HTTPException(
+            status_code=status_code,
+            detail=detail,
+            headers={"Retry-After": str(max(math.ceil(retry_after), 1))},
+        )
+
+    def _try_grant(self, tokens):
+        """Charges the buckets for one call if they allow it. Returns 0.0 when granted, else the seconds to wait."""
+        if self.bucket_store is not None:
+            wait = take_shared(self.bucket_store, [(self.requests, 1), (self.tokens, tokens)])
+        else:
+            wait = self._wait_for(tokens)
+            if wait == 0:
+                self.requests.take(1)
+                self.tokens.take(tokens)
+        if wait == 0:
+            self.in_flight += 1
+            self.admitted += 1
+        return wait
+
+    def _dispatch(self):
+        """Starts queued calls in priority order while budget and concurrency allow."""
+        self._timer = None
+        while self._queue and self.in_flight < self.max_concurrency:
+            now = time.monotonic()
+            self._queue = [w for w in self._queue if not w.future.done()]
+            if not self._queue:
+                return
+            head = min(self._queue, key=lambda w: self._effective_priority(w, now))
+            wait = self._try_grant(head.tokens)
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            self._queue.remove(head)
+            head.future.set_result(None)
+
+    async def acquire(self, tokens, priority):
+        if not self._queue and self.in_flight < self.max_concurrency and self._try_grant(tokens) == 0:
+            return
+        if len(self._queue) >= self.max_queue:
+            self.rejected_queue_full += 1
+            self._reject(503, "Model call queue is full, try again later", self._estimate_wait(tokens))
+        expected = self._estimate_wait(tokens)
+        if expected > self.max_wait:
+            self.rejected_rate_limited += 1
+            self._reject(429, f"Model rate limit reached, expected wait {expected:.0f}s", expected)
+
+        waiter = Waiter(priority, tokens, next(self._order))
+        self._queue.append(waiter)
+        self.queued += 1
+        if self._timer is None:
+            self._dispatch()
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                return  # granted just as the timeout fired
+            self.timed_out += 1
+            waiter.future.cancel()
+            self._reject(503, "Timed out waiting for model capacity", self._estimate_wait(tokens))
+        except asyncio.CancelledError:
+            # Caller went away; give the slot back if it was granted meanwhile
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release()
+            waiter.future.cancel()
+            raise
+        finally:
+            self.total_wait += time.monotonic() - started
+
+    def release(self):
+        self.in_flight -= 1
+        if self._queue and self._timer is None:
+            self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens):
+        """Admits one model call for the current endpoint's priority."""
+        with stage("llm_queue"):
+            await self.acquire(estimated_tokens, self.priority_for(current_endpoint()))
+        grant = Grant(self, estimated_tokens)
+        try:
+            yield grant
+        finally:
+            self.release()
+
+    def stats(self):
+        return {
+            "in_flight": self.in_flight,
+            "queue_length": len(self._queue),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected_rate_limited": self.rejected_rate_limited,
+            "rejected_queue_full": self.rejected_queue_full,
+            "timed_out": self.timed_out,
+            "average_wait_ms": round(self.total_wait / self.queued * 1000, 1) if self.queued else 0.0,
+            "requests_available": round(self.requests.tokens, 1) if self.requests.enabled else None,
+            "tokens_available": round(self.tokens.tokens) if self.tokens.enabled else None,
+            "shared_buckets": self.bucket_store is not None,
+        }
+
+    def close(self):
+        if self.bucket_store is not None:
+            self.bucket_store.close()
+
+
+class Grant:
+    """One admitted call. settle() corrects the token bucket once usage is known."""
+
+    def __init__(self, controller, estimated_tokens):
+        self.controller = controller
+        self.estimated_tokens = estimated_tokens
+
+    def settle(self, usage):
+        if usage is not None and usage.total_tokens:
+            self.controller.tokens.adjust(usage.total_tokens - self.estimated_tokens)
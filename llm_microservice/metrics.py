@@ -0,0 +1,253 @@
+"""
+Prometheus metrics and per-request stage timings.
+
+Code wraps each pipeline step in `with stage("download"):`. The duration is
+observed in a histogram labelled with the route it ran under, and added to
+the request's `Server-Timing` response header so one slow request can be
+broken down in the browser's network panel. Work done outside a request
+(queue workers) is labelled "background".
+
+Counters and sizes the service already tracks for /stats (caches, pools,
+queue) are exported as gauges, read at scrape time.
+"""
+import contextvars
+import re
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from starlette.datastructures import MutableHeaders
+
+PREFIX = "velocity"
+BACKGROUND = "background"
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+REQUEST_SECONDS = Histogram(
+    f"{PREFIX}_request_duration_seconds",
+    "Time until the response headers were sent, by route",
+    ["endpoint", "method", "status"],
+    buckets=STAGE_BUCKETS,
+)
+STAGE_SECONDS = Histogram(
+    f"{PREFIX}_stage_duration_seconds",
+    "Time spent in each pipeline stage, by route",
+    ["endpoint", "stage"],
+    buckets=STAGE_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    f"{PREFIX}_llm_tokens_total",
+    "Tokens reported by the model provider",
+    ["endpoint", "model", "kind"],
+)
+LLM_REQUESTS = Counter(
+    f"{PREFIX}_llm_requests_total",
+    "Model calls by outcome (success or an error reason)",
+    ["model", "outcome"],
+)
+LLM_LATENCY = Histogram(
+    f"{PREFIX}_llm_latency_seconds",
+    "Latency of successful model calls",
+    ["model"],
+    buckets=STAGE_BUCKETS,
+)
+STRUCTURED_OUTPUT = Counter(
+    f"{PREFIX}_structured_output_total",
+    "Parsed model replies by outcome (valid, repaired, reasked, failed)",
+    ["outcome"],
+)
+UPSTREAM_ERRORS = Counter(
+    f"{PREFIX}_upstream_errors_total",
+    "Failed calls to upstream services",
+    ["upstream", "reason"],
+)
+
+_current = contextvars.ContextVar("request_timing", default=None)
+
+
+class RequestTiming:
+    """Stage durations of one request. Shared by every task and thread the request spawns."""
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    @property
+    def endpoint(self):
+        # Route template, not the raw path, to keep label cardinality bounded
+        route = self.scope.get("route")
+        return getattr(route, "path", "unmatched")
+
+    def add(self, name, seconds):
+        total, count = self.stages.get(name, (0.0, 0))
+        self.stages[name] = (total + seconds, count + 1)
+
+    def header(self):
+        parts = []
+        for name, (total, count) in self.stages.items():
+            part = f"{name};dur={total * 1000:.1f}"
+            if count > 1:
+                part += f';desc="{count} calls"'
+            parts.append(part)
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+def current_endpoint():
+    timing = _current.get()
+    return timing.endpoint if timing is not None else BACKGROUND
+
+
+def record_stage(name, seconds):
+    timing = _current.get()
+    STAGE_SECONDS.labels(current_endpoint(), name).observe(seconds)
+    if timing is not None:
+        timing.add(name, seconds)
+
+
+@contextmanager
+def stage(name):
+    """Times the enclosed block as one pipeline stage (failures included)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+def cached_prompt_tokens(usage):
+    """Prompt tokens the provider served from its prompt cache (0 when not reported)."""
+    details = getattr(usage, "prompt_tokens_details", None)
+    return getattr(details, "cached_tokens", None) or 0
+
+
+class UsageTotals:
+    """Running token totals for /stats, including prompt-cache reuse."""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_prompt_tokens = 0
+
+    def add(self, usage):
+        self.calls += 1
+        self.prompt_tokens += usage.prompt_tokens or 0
+        self.completion_tokens += usage.completion_tokens or 0
+        self.cached_prompt_tokens += cached_prompt_tokens(usage)
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_prompt_tokens": self.cached_prompt_tokens,
+            "cached_prompt_ratio": (
+                round(self.cached_prompt_tokens / self.prompt_tokens, 3) if self.prompt_tokens else 0.0
+            ),
+        }
+
+
+usage_totals = UsageTotals()
+
+
+def record_tokens(model, usage):
+    if usage is None:
+        return
+    endpoint = current_endpoint()
+    LLM_TOKENS.labels(endpoint, model, "prompt").inc(usage.prompt_tokens or 0)
+    LLM_TOKENS.labels(endpoint, model, "completion").inc(usage.completion_tokens or 0)
+    # Subset of the prompt tokens, billed at the provider's cached-input rate
+    LLM_TOKENS.labels(endpoint, model, "cached_prompt").inc(cached_prompt_tokens(usage))
+    usage_totals.add(usage)
+
+
+def record_llm_request(model, outcome, seconds=None):
+    LLM_REQUESTS.labels(model, outcome).inc()
+    if seconds is not None:
+        LLM_LATENCY.labels(model).observe(seconds)
+
+
+def record_structured_output(outcome):
+    STRUCTURED_OUTPUT.labels(outcome).inc()
+
+
+def record_upstream_error(upstream, reason):
+    UPSTREAM_ERRORS.labels(upstream, reason).inc()
+
+
+class TimingMiddleware:
+    """
+    Pure ASGI middleware (streaming responses pass straight through). Adds
+    the Server-Timing header and observes the request duration histogram.
+    Streaming responses only report the stages finished before the headers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timing = RequestTiming(scope)
+        token = _current.set(timing)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", timing.header())
+                headers.append("Timing-Allow-Origin", "*")
+                REQUEST_SECONDS.labels(timing.endpoint, scope["method"], str(status)).observe(
+                    time.perf_counter() - timing.started
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+
+
+class StatsCollector:
+    """Exports numeric values of stats() dicts as gauges, e.g. velocity_result_cache_hits."""
+
+    def __init__(self):
+        self.sources = {}
+
+    def add(self, name, stats):
+        self.sources[name] = stats
+
+    def collect(self):
+        for source, stats in self.sources.items():
+            try:
+                values = stats()
+            except Exception as e:
+                print(f"Could not collect {source} stats: {str(e)}")
+                continue
+            for key, value in _flatten(values):
+                name = re.sub(r"[^a-zA-Z0-9_]", "_", f"{PREFIX}_{source}_{key}")
+                gauge = GaugeMetricFamily(name, f"{source} {key} (see /stats)")
+                gauge.add_metric([], float(value))
+                yield gauge
+
+
+def _flatten(values, prefix=""):
+    for key, value in values.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}_")
+        elif isinstance(value, (int, float)):
+            yield f"{prefix}{key}", value
+
+
+stats_collector = StatsCollector()
+REGISTRY.register(stats_collector)
+
+
+def render_metrics():
+    """Prometheus text exposition. Reads the stats sources, some of which query SQLite."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
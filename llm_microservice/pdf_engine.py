@@ -0,0 +1,225 @@
+"""
+PDF text extraction engine.
+
+Small documents are parsed in a thread. Documents with many pages are split
+into page ranges and parsed in a process pool, so one large PDF neither
+holds the GIL for seconds nor blocks other requests' parsing. Every document
+gets a page cap and a wall-clock time budget; pages not reached in time are
+skipped. PyMuPDF is used when installed (much faster than pypdf), pypdf
+otherwise; either is imported on first use.
+"""
+import asyncio
+import importlib.util
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+# Separates pages in extracted text so later stages can spot running headers
+PAGE_BREAK = "\f"
+
+PDF_MAGIC = b"%PDF-"
+# The PDF spec allows junk before the header; readers accept it within the first 1 KB
+MAGIC_SEARCH_BYTES = 1024
+
+
+def looks_like_pdf(head):
+    return PDF_MAGIC in head[:MAGIC_SEARCH_BYTES]
+
+
+def pymupdf_available():
+    return importlib.util.find_spec("pymupdf") is not None
+
+
+def resolve_backend(name):
+    """'auto' picks PyMuPDF when installed, else pypdf."""
+    if name == "auto":
+        return "pymupdf" if pymupdf_available() else "pypdf"
+    if name == "pymupdf" and not pymupdf_available():
+        print("PDF_BACKEND=pymupdf but PyMuPDF is not installed, falling back to pypdf")
+        return "pypdf"
+    return name
+
+
+def _open(file_bytes, backend):
+    if backend == "pymupdf":
+        import pymupdf
+        document = pymupdf.open(stream=file_bytes, filetype="pdf")
+        return len(document), lambda index: document[index].get_text()
+    from pypdf import PdfReader
+
+    reader = PdfReader(io.BytesIO(file_bytes))
+    return len(reader.pages), lambda index: reader.pages[index].extract_text() or ""
+
+
+def count_pages(file_bytes, backend):
+    return _open(file_bytes, backend)[0]
+
+
+def extract_page_range(file_bytes, start, stop, backend, deadline):
+    """
+    Extracts pages [start, stop) until the deadline (a time.time() value).
+    Top-level so it can run in worker processes. Returns (texts, timed_out).
+    """
+    _, page_text = _open(file_bytes, backend)
+    texts = []
+    for index in range(start, stop):
+        if time.time() > deadline:
+            return texts, True
+        texts.append(page_text(index))
+    return texts, False
+
+
+def extract_pdf_text(file_bytes, backend="pypdf"):
+    """
+    Extracts text from PDF file bytes with no limits.
+    CPU-bound - call through run_in_threadpool from async handlers.
+    """
+    try:
+        page_count, page_text = _open(file_bytes, backend)
+        return PAGE_BREAK.join(page_text(index) for index in range(page_count))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"PDF extraction error: {str(e)}")
+
+
+class PdfExtractor:
+    """
+    Limits and execution strategy for PDF parsing. The process pool is
+    created on first use and shut down by close().
+    """
+
+    def __init__(self, backend="auto", max_bytes=10 * 1024 * 1024, max_pages=50, time_budget=10.0,
+                 parallel_min_pages=8, workers=None):
+        self.backend = resolve_backend(backend)
+        self.max_bytes = max_bytes
+        self.max_pages = max_pages
+        self.time_budget = time_budget
+        self.parallel_min_pages = parallel_min_pages
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self._pool = None
+        self.documents = 0
+        self.pages = 0
+        self.parallel_documents = 0
+        self.truncated_documents = 0
+        self.budget_exceeded = 0
+        self.pool_recycles = 0
+
+    def warm(self):
+        """Imports the parsing backend ahead of the first document."""
+        importlib.import_module(self.backend)
+
+    def _get_pool(self):
+        if self._pool is None:
+            # spawn, not fork: the server process runs threads and an event loop
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    async def extract(self, file_bytes):
+        """Validates and extracts a PDF within the configured limits, returning page-separated text."""
+        if not looks_like_pdf(file_bytes):
+            raise HTTPException(status_code=415, detail="Resume is not a PDF file")
+        deadline = time.time() + self.time_budget
+        try:
+            page_count = await run_in_threadpool(count_pages, file_bytes, self.backend)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"PDF extraction error: {str(e)}")
+
+        pages = min(page_count, self.max_pages)
+        if pages < page_count:
+            self.truncated_documents += 1
+            print(f"Resume has {page_count} pages, extracting the first {pages}")
+
+        try:
+            texts = None
+            if pages >= self.parallel_min_pages and self.workers > 1:
+                try:
+                    texts, timed_out = await self._extract_parallel(file_bytes, pages, deadline)
+                except BrokenProcessPool:
+                    # A worker died (out of memory, killed); start a fresh pool next time
+                    print("PDF worker pool broke, extracting in-process")
+                    self.close()
+            if texts is None:
+                texts, timed_out = await run_in_threadpool(
+                    extract_page_range, file_bytes, 0, pages, self.backend, deadline
+                )
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"PDF extraction error: {str(e)}")
+
+        if timed_out:
+            self.budget_exceeded += 1
+            print(f"PDF time budget of {self.time_budget}s exceeded, using partial text")
+        self.documents += 1
+        self.pages += sum(1 for text in texts if text is not None)
+        return PAGE_BREAK.join(text for text in texts if text is not None)
+
+    async def _extract_parallel(self, file_bytes, pages, deadline):
+        """
+        Splits the pages into one contiguous range per worker. Workers check
+        the deadline between pages; one still running after the grace period
+        is stuck inside a page and cannot be cancelled, so the pool is recycled.
+        """
+        self.parallel_documents += 1
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        chunk = -(-pages // self.workers)
+        ranges = [(start, min(start + chunk, pages)) for start in range(0, pages, chunk)]
+        futures = [
+            loop.run_in_executor(pool, extract_page_range, file_bytes, start, stop, self.backend, deadline)
+            for start, stop in ranges
+        ]
+        # Grace period past the deadline for a worker stuck inside a single page
+        done, pending = await asyncio.wait(futures, timeout=max(deadline - time.time(), 0) + 1.0)
+        for future in pending:
+            future.cancel()
+        if pending:
+            self._recycle_pool(pool)
+
+        errors = [future.exception() for future in done if future.exception() is not None]
+        if errors:
+            raise errors[0]
+
+        texts = []
+        timed_out = bool(pending)
+        for (start, stop), future in zip(ranges, futures):
+            if future in done:
+                chunk_texts, chunk_timed_out = future.result()
+                timed_out = timed_out or chunk_timed_out
+                texts.extend(chunk_texts + [None] * (stop - start - len(chunk_texts)))
+            else:
+                texts.extend([None] * (stop - start))
+        return texts, timed_out
+
+    def _recycle_pool(self, pool):
+        """Kills the workers of an overrunning pool; the next document starts a fresh one."""
+        self.pool_recycles += 1
+        print("PDF worker overran its time budget, recycling the pool")
+        processes = list((getattr(pool, "_processes", None) or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+        if self._pool is pool:
+            self._pool = None
+
+    def close(self, wait=False):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
+
+    def stats(self):
+        return {
+            "backend": self.backend,
+            "documents": self.documents,
+            "pages": self.pages,
+            "parallel_documents": self.parallel_documents,
+            "truncated_documents": self.truncated_documents,
+            "budget_exceeded": self.budget_exceeded,
+            "pool_recycles": self.pool_recycles,
+        }
@@ -0,0 +1,242 @@
+"""
+Deterministic local pre-scoring of resumes against a job.
+
+Each job gets a keyword index built from its tags and summary (with synonym
+folding, so "k8s" matches "Kubernetes"). Resumes are scored with a normalized
+BM25 over those keywords, which also yields missing_keywords without an LLM
+call. Candidates scoring below a configurable threshold can skip the LLM.
+
+BM25's corpus statistics are fixed rather than collected from traffic: IDF
+comes from a table of how many resumes typically list a keyword, and length
+normalization from a typical resume length. A score therefore depends only
+on the resume and the job.
+"""
+import math
+import re
+
+import numpy as np
+
+from cache import LRUCache, make_cache_key
+
+# Alternate spellings folded onto one canonical keyword
+SYNONYMS = {
+    "js": "javascript",
+    "ecmascript": "javascript",
+    "ts": "typescript",
+    "node": "node.js",
+    "nodejs": "node.js",
+    "react.js": "react",
+    "reactjs": "react",
+    "vue.js": "vue",
+    "vuejs": "vue",
+    "next.js": "nextjs",
+    "postgres": "postgresql",
+    "psql": "postgresql",
+    "mongo": "mongodb",
+    "k8s": "kubernetes",
+    "amazon web services": "aws",
+    "google cloud platform": "gcp",
+    "google cloud": "gcp",
+    "microsoft azure": "azure",
+    "ml": "machine learning",
+    "dl": "deep learning",
+    "ai": "artificial intelligence",
+    "nlp": "natural language processing",
+    "ci/cd": "ci cd",
+    "cicd": "ci cd",
+    "continuous integration": "ci cd",
+    "golang": "go",
+    "c sharp": "c#",
+    "csharp": "c#",
+    "cpp": "c++",
+    "py": "python",
+    "sklearn": "scikit-learn",
+    "tf": "tensorflow",
+    "rest api": "rest",
+    "restful": "rest",
+    "gql": "graphql",
+    "tailwindcss": "tailwind",
+    "oop": "object oriented programming",
+    "object-oriented programming": "object oriented programming",
+    "ux": "user experience",
+    "ui": "user interface",
+}
+
+# Terms picked out of free-text job summaries in addition to the job's tags
+SKILL_VOCABULARY = {
+    "python", "java", "javascript", "typescript", "rust", "c++", "c#", "ruby", "php", "kotlin",
+    "swift", "scala", "sql", "html", "css", "bash",
+    "react", "vue", "angular", "svelte", "nextjs", "node.js", "express", "django", "flask", "fastapi",
+    "spring", "rails", "laravel", "tailwind", "graphql", "rest", "grpc",
+    "postgresql", "mysql", "sqlite", "mongodb", "redis", "elasticsearch", "kafka", "rabbitmq",
+    "cassandra", "dynamodb", "snowflake", "bigquery", "spark", "hadoop", "airflow", "dbt",
+    "aws", "gcp", "azure", "docker", "kubernetes", "terraform", "ansible", "jenkins", "ci cd",
+    "git", "linux", "microservices", "serverless", "devops",
+    "machine learning", "deep learning", "artificial intelligence", "natural language processing",
+    "computer vision", "tensorflow", "pytorch", "scikit-learn", "pandas", "numpy", "llm",
+    "data analysis", "data engineering", "statistics", "tableau", "power bi", "excel",
+    "figma", "user experience", "user interface", "agile", "scrum", "jira",
+    "object oriented programming", "system design", "distributed systems", "testing", "security",
+    "seo", "salesforce", "crm", "marketing", "sales", "finance", "accounting", "leadership",
+    "communication", "project management", "product management",
+}
+
+TOKEN = re.compile(r"[a-z0-9][a-z0-9+#./-]*[a-z0-9+#]|[a-z0-9]")
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+TAG_WEIGHT = 2.0
+SUMMARY_WEIGHT = 1.0
+# Fixed BM25 length normalization (terms in a typical resume)
+AVERAGE_RESUME_TERMS = 450
+# Fixed BM25 document frequencies: the share of resumes that list a keyword.
+# Generic skills most candidates mention say less about fit than specific
+# ones; keywords not listed here use DEFAULT_KEYWORD_SHARE.
+DEFAULT_KEYWORD_SHARE = 0.1
+KEYWORD_SHARES = {
+    "communication": 0.6, "leadership": 0.4, "git": 0.45, "sql": 0.4, "excel": 0.4,
+    "agile": 0.35, "html": 0.35, "css": 0.35, "javascript": 0.35, "python": 0.3, "testing": 0.3,
+    "java": 0.25, "linux": 0.25, "project management": 0.25, "scrum": 0.25, "rest": 0.25, "jira": 0.2,
+}
+
+
+def normalize_text(text):
+    """Lowercases and folds synonyms so keywords can be matched on word boundaries."""
+    text = " " + " ".join(TOKEN.findall(text.lower())) + " "
+    for alias in sorted(SYNONYMS, key=len, reverse=True):
+        if f" {alias} " in text:
+            text = text.replace(f" {alias} ", f" {SYNONYMS[alias]} ")
+    return text
+
+
+def canonical_keyword(term):
+    return normalize_text(term).strip()
+
+
+def keyword_idf(keyword):
+    """BM25 IDF, ln(1 + (N - n + 0.5) / (n + 0.5)), with n / N taken from KEYWORD_SHARES."""
+    share = KEYWORD_SHARES.get(keyword, DEFAULT_KEYWORD_SHARE)
+    return math.log(1 + (1 - share) / share)
+
+
+class JobKeywordIndex:
+    """
+    Canonical keywords for one job. Each weighs its IDF, times TAG_WEIGHT
+    for the job's tags.
+    """
+
+    def __init__(self, tags, summary):
+        weights = {}
+        for term in tags or []:
+            keyword = canonical_keyword(term)
+            if keyword:
+                weights[keyword] = TAG_WEIGHT
+        normalized = normalize_text(summary or "")
+        for keyword in SKILL_VOCABULARY:
+            if keyword not in weights and f" {keyword} " in normalized:
+                weights[keyword] = SUMMARY_WEIGHT
+        self.keywords = sorted(weights)
+        self.weights = np.array([weights[k] * keyword_idf(k) for k in self.keywords], dtype=np.float64)
+        self._patterns = [f" {keyword} " for keyword in self.keywords]
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def term_counts(self, normalized_text):
+        """Occurrences of each keyword in already-normalized text."""
+        return np.array([normalized_text.count(p) for p in self._patterns], dtype=np.float64)
+
+
+class PreScorer:
+    """
+    Scores resumes against job keyword indexes. Keyword weights come from
+    the job and the fixed IDF table, and resume length is normalized against
+    a fixed average, so the same text and job always get the same score, in
+    every worker and on every retry.
+    """
+
+    def __init__(self, skip_threshold=None, max_indexes=256):
+        self.skip_threshold = skip_threshold
+        self.indexes = LRUCache(max_indexes, ttl=float("inf"))
+        self.scored = 0
+        self.llm_skipped = 0
+
+    def index_for(self, tags, summary):
+        key = make_cache_key(sorted(tags or []), summary)
+        index = self.indexes.get(key)
+        if index is None:
+            index = JobKeywordIndex(tags, summary)
+            self.indexes.set(key, index)
+        return index
+
+    def score_many(self, resume_texts, index):
+        """
+        Vectorized BM25 of many resumes against one job, as a share of the
+        best possible score. Returns one dict per resume: score (0-100),
+        matched_keywords and missing_keywords.
+        """
+        if not len(index):
+            return [{"score": None, "matched_keywords": [], "missing_keywords": []} for _ in resume_texts]
+        normalized = [normalize_text(text) for text in resume_texts]
+        counts = np.vstack([index.term_counts(text) for text in normalized])
+        lengths = np.array([text.count(" ") - 1 for text in normalized], dtype=np.float64)
+
+        # BM25 term saturation, capped at the value of one mention in an
+        # average-length resume so extra repetitions cannot inflate the score
+        saturation = counts * (K1 + 1) / (counts + K1 * (1 - B + B * lengths[:, None] / AVERAGE_RESUME_TERMS))
+        scores = 100.0 * (np.minimum(saturation, 1.0) @ index.weights) / index.weights.sum()
+        self.scored += len(resume_texts)
+
+        results = []
+        for row, score in zip(counts, scores):
+            present = row > 0
+            results.append({
+                "score": round(float(score), 1),
+                "matched_keywords": [k for k, hit in zip(index.keywords, present) if hit],
+                "missing_keywords": [k for k, hit in zip(index.keywords, present) if not hit],
+            })
+        return results
+
+    def score(self, resume_text, index):
+        return self.score_many([resume_text], index)[0]
+
+    def stats(self):
+        return {
+            "scored": self.scored,
+            "llm_skipped": self.llm_skipped,
+            "skip_threshold": self.skip_threshold,
+            "job_indexes": len(self.indexes),
+        }
+
+
+def merge_missing_keywords(llm_keywords, local_keywords):
+    """LLM keywords first, then local ones it did not already mention."""
+    seen = {canonical_keyword(k) for k in llm_keywords}
+    merged = list(llm_keywords)
+    for keyword in local_keywords:
+        if keyword not in seen:
+            merged.append(keyword)
+            seen.add(keyword)
+    return merged
+
+
+def update_missing_keywords(previous_keywords, removed_keywords, prescore):
+    """
+    Missing keywords after a job edit, without the LLM: earlier ones stay
+    unless the job dropped them or the resume matches them under the new
+    keyword set, then the newly missing local keywords are added.
+    """
+    dropped = {canonical_keyword(k) for k in removed_keywords} | set(prescore["matched_keywords"])
+    kept = [k for k in previous_keywords if canonical_keyword(k) not in dropped]
+    return merge_missing_keywords(kept, prescore["missing_keywords"])
+
+
+def describe_skip(prescore, threshold):
+    matched = len(prescore["matched_keywords"])
+    total = matched + len(prescore["missing_keywords"])
+    return (
+        f"Scored locally without AI review: matched {matched} of {total} job keywords, "
+        f"below the pre-screen threshold of {threshold:g}."
+    )
+
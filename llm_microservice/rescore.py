@@ -0,0 +1,294 @@
+"""
+Bulk offline re-scoring of historical applicants.
+
+Reads records from a JSONL or CSV file. Each has a resume (`resume_url`, or
+a local `resume_path`) and the job to score it against (`job_description`
+plus optional `job_tags`, or the `job_id` of a registered job), and
+optionally `id` and `cover_letter`. Records go through the same analysis
+pipeline as /api/analyze-resume, with downloads, PDF parsing and model calls
+in separate worker pools joined by bounded queues.
+
+Results are appended to a JSONL file that is also the checkpoint: a
+restarted run skips every record already written there (failed ones too,
+unless --retry-failed; the last line for an id wins). Progress, throughput
+and token spend are printed as the run goes.
+
+Usage:
+    python rescore.py applicants.csv results.jsonl
+    python rescore.py applicants.jsonl results.jsonl --model openai/gpt-4o-mini --llm-workers 8
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+
+from fastapi import HTTPException
+
+OK = "ok"
+ERROR = "error"
+
+
+def parse_tags(value):
+    """JSON list, or a comma-separated string (CSV cells)."""
+    if value is None or isinstance(value, list):
+        return value
+    value = value.strip()
+    if value.startswith("["):
+        return json.loads(value)
+    return [tag.strip() for tag in value.split(",") if tag.strip()] or None
+
+
+def read_records(path):
+    """Records from a .csv or .jsonl file; `id` defaults to the line/row number."""
+    records = []
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            rows = ((number, row) for number, row in enumerate(csv.DictReader(f), start=1))
+        else:
+            rows = ((number, json.loads(line)) for number, line in enumerate(f, start=1) if line.strip())
+        for number, row in rows:
+            row = {key: value for key, value in row.items() if value not in (None, "")}
+            row["id"] = str(row.get("id") or f"row-{number}")
+            row["job_tags"] = parse_tags(row.get("job_tags"))
+            if "job_id" in row:
+                row["job_id"] = str(row["job_id"])
+            records.append(row)
+    return records
+
+
+def load_checkpoint(path, retry_failed=False):
+    """
+    Ids already in the output file. A line cut off by a crash is truncated
+    away so appending continues on a clean line.
+    """
+    if not os.path.exists(path):
+        return set()
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+            data = data[:data.rfind(b"\n") + 1]
+    status = {}
+    for line in data.decode("utf-8").splitlines():
+        if line.strip():
+            entry = json.loads(line)
+            status[entry["id"]] = entry["status"]
+    return {key for key, value in status.items() if value == OK or not retry_failed}
+
+
+def read_local_resume(path, max_bytes, looks_like_pdf):
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=400, detail=f"Resume file not found: {path}")
+    if os.path.getsize(path) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Resume exceeds {max_bytes} bytes")
+    with open(path, "rb") as f:
+        data = f.read()
+    if not looks_like_pdf(data):
+        raise HTTPException(status_code=415, detail="Resume is not a PDF file")
+    return data
+
+
+class Progress:
+    """Counts and token spend for the periodic report."""
+
+    def __init__(self, total, usage_totals):
+        self.total = total
+        self.usage_totals = usage_totals
+        self.started = time.perf_counter()
+        self.ok = 0
+        self.failed = 0
+        self.failed_by_stage = {}
+        self.tokens_at_start = dict(usage_totals.stats())
+
+    def tokens(self):
+        now = self.usage_totals.stats()
+        return {key: now[key] - self.tokens_at_start[key]
+                for key in ("calls", "prompt_tokens", "completion_tokens", "cached_prompt_tokens")}
+
+    def report(self, queues=None, final=False):
+        elapsed = time.perf_counter() - self.started
+        done = self.ok + self.failed
+        tokens = self.tokens()
+        line = (
+            f"{'Finished' if final else 'Progress'}: {done}/{self.total} "
+            f"({self.ok} ok, {self.failed} failed) in {elapsed:.0f}s, "
+            f"{done / elapsed if elapsed else 0:.2f} records/s | "
+            f"{tokens['calls']} model calls, tokens prompt {tokens['prompt_tokens']} "
+            f"(cached {tokens['cached_prompt_tokens']}) completion {tokens['completion_tokens']}"
+        )
+        if queues:
+            line += " | queued " + ", ".join(f"{name} {queue.qsize()}" for name, queue in queues.items())
+        if final and self.failed_by_stage:
+            line += f" | failures by stage: {self.failed_by_stage}"
+        print(line, flush=True)
+
+
+class ResultWriter:
+    """Appends one JSON line per finished record, flushed so a crash loses nothing written."""
+
+    def __init__(self, path, progress):
+        self.file = open(path, "a", encoding="utf-8")
+        self.progress = progress
+
+    def write(self, record, started, result=None, error=None, stage=None):
+        entry = {
+            "id": record["id"],
+            "resume": record.get("resume_url") or record.get("resume_path"),
+            "job_id": record.get("job_id"),
+            "status": OK if error is None else ERROR,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        if error is None:
+            entry["result"] = result.model_dump()
+            self.progress.ok += 1
+        else:
+            entry["stage"] = stage
+            entry["status_code"] = getattr(error, "status_code", 500)
+            entry["error"] = str(getattr(error, "detail", error))
+            self.progress.failed += 1
+            self.progress.failed_by_stage[stage] = self.progress.failed_by_stage.get(stage, 0) + 1
+        self.file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+async def run(args):
+    # Imported after the environment overrides in main() so api picks them up
+    import api
+    from extraction import download_resume, extract_resume_text
+    from metrics import usage_totals
+    from pdf_engine import looks_like_pdf
+
+    records = read_records(args.input)
+    done = load_checkpoint(args.output, args.retry_failed)
+    pending = [record for record in records if record["id"] not in done]
+    print(f"{len(records)} records, {len(records) - len(pending)} already in {args.output}, {len(pending)} to score")
+    if not pending:
+        return
+
+    progress = Progress(len(pending), usage_totals)
+    writer = ResultWriter(args.output, progress)
+    downloads = asyncio.Queue(maxsize=args.download_workers * 2)
+    parses = asyncio.Queue(maxsize=args.parse_workers * 2)
+    analyses = asyncio.Queue(maxsize=args.llm_workers * 2)
+
+    async def download_worker():
+        while (record := await downloads.get()) is not None:
+            started = time.perf_counter()
+            try:
+                job = None
+                if record.get("job_id"):
+                    job = await api.load_job_context(
+                        record["job_id"], record.get("job_description"), record.get("job_tags")
+                    )
+                elif not record.get("job_description", "").strip():
+                    raise HTTPException(status_code=400, detail="Record has neither job_description nor job_id")
+                if record.get("resume_path"):
+                    cached_text = None
+                    file_bytes = await asyncio.to_thread(
+                        read_local_resume, record["resume_path"], api.pdf_extractor.max_bytes, looks_like_pdf
+                    )
+                else:
+                    if not record.get("resume_url", "").startswith(("http://", "https://")):
+                        raise HTTPException(
+                            status_code=400, detail="Record needs a resume_path or an http(s) resume_url"
+                        )
+                    cached_text, file_bytes = await download_resume(
+                        api.upstream.download, record["resume_url"], api.text_cache, api.pdf_extractor.max_bytes
+                    )
+            except Exception as e:
+                writer.write(record, started, error=e, stage="download")
+                continue
+            await parses.put((record, job, cached_text, file_bytes, started))
+
+    async def parse_worker():
+        while (item := await parses.get()) is not None:
+            record, job, text, file_bytes, started = item
+            try:
+                if text is None:
+                    text = await extract_resume_text(file_bytes, api.text_cache, api.pdf_extractor)
+                if not text.strip():
+                    raise HTTPException(status_code=400, detail="Could not extract text from resume PDF")
+            except Exception as e:
+                writer.write(record, started, error=e, stage="parse")
+                continue
+            await analyses.put((record, job, text, started))
+
+    async def llm_worker():
+        while (item := await analyses.get()) is not None:
+            record, job, text, started = item
+            try:
+                prepared = await api.prepare_resume_prompt(
+                    text, record.get("job_description"), record.get("cover_letter"),
+                    record.get("job_tags"), args.prescore_threshold, job,
+                )
+                result = prepared["result"]
+                if result is None:
+                    result = await api.complete_resume_analysis(prepared)
+            except Exception as e:
+                writer.write(record, started, error=e, stage="llm")
+                continue
+            writer.write(record, started, result=result)
+
+    async def pool(worker, count, next_queue=None, next_count=0):
+        await asyncio.gather(*(worker() for _ in range(count)))
+        for _ in range(next_count):
+            await next_queue.put(None)
+
+    async def feed():
+        for record in pending:
+            await downloads.put(record)
+        for _ in range(args.download_workers):
+            await downloads.put(None)
+
+    async def report():
+        queues = {"download": downloads, "parse": parses, "llm": analyses}
+        while True:
+            await asyncio.sleep(args.report_every)
+            progress.report(queues)
+
+    await api.upstream.start()
+    api.open_job_stores()
+    reporter = asyncio.create_task(report())
+    try:
+        await asyncio.gather(
+            feed(),
+            pool(download_worker, args.download_workers, parses, args.parse_workers),
+            pool(parse_worker, args.parse_workers, analyses, args.llm_workers),
+            pool(llm_worker, args.llm_workers),
+        )
+    finally:
+        reporter.cancel()
+        progress.report(final=True)
+        writer.close()
+        await api.upstream.aclose()
+        api.close_job_stores()
+        api.pdf_extractor.close()
+        api.text_cache.close()
+        api.analysis_cache.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="records as .jsonl or .csv")
+    parser.add_argument("output", help="results .jsonl (appended to, and used as the checkpoint)")
+    parser.add_argument("--model", help="comma-separated model pool, overrides AI_MODELS")
+    parser.add_argument("--download-workers", type=int, default=8)
+    parser.add_argument("--parse-workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--llm-workers", type=int, default=4)
+    parser.add_argument("--prescore-threshold", type=float, default=None,
+                        help="answer records below this local pre-score without the LLM")
+    parser.add_argument("--retry-failed", action="store_true", help="re-score records that failed in an earlier run")
+    parser.add_argument("--report-every", type=float, default=10.0, help="seconds between progress lines")
+    args = parser.parse_args()
+    if args.model:
+        os.environ["AI_MODELS"] = args.model
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Resume section parsing into a compact per-resume profile.
+
+Extracted text is cleaned the way compaction cleans it (running headers,
+page numbers and duplicate lines removed), split into typed sections, and
+reduced to the facts other stages want without re-reading the text:
+normalized skills, total experience computed from the date ranges in the
+experience section, the experience the candidate states, and education.
+
+A profile depends only on the text, so it is cached by the text's content
+hash and one parse serves every job the candidate applies to. Profiles use
+__slots__ and tuples, so a cache of thousands of them stays small.
+"""
+import re
+import time
+
+from cache import LRUCache, make_cache_key
+from compaction import count_tokens, dedupe_lines, normalize_whitespace, split_sections, strip_repeated_page_lines
+from prescore import SKILL_VOCABULARY, canonical_keyword, normalize_text
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+_DATE = (
+    r"(?:(?P<{p}month>jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?,?\s*|(?P<{p}number>\d{{1,2}})[/.-])?"
+    r"(?P<{p}year>(?:19|20)\d{{2}})"
+)
+DATE_RANGE = re.compile(
+    r"\b" + _DATE.format(p="start_") + r"\s*(?:-|–|—|to|until)\s*"
+    r"(?:(?P<ongoing>present|current|now|today|ongoing|date)\b|" + _DATE.format(p="end_") + r")",
+    re.IGNORECASE,
+)
+STATED_EXPERIENCE = re.compile(
+    r"\b(\d{1,2}(?:\.\d)?)\s*\+?\s*(?:years|yrs)\b(?:\s+of)?(?:\s+[a-z-]+){0,3}?\s+experience",
+    re.IGNORECASE,
+)
+# Highest level first
+DEGREES = (
+    ("doctorate", re.compile(r"\b(ph\.?\s?d|doctor(ate)?|d\.?phil)(?!\w)", re.IGNORECASE)),
+    ("master", re.compile(r"\b(master'?s?|m\.?sc|m\.s\.|mba|m\.?tech|m\.?eng|m\.a\.)(?!\w)", re.IGNORECASE)),
+    ("bachelor", re.compile(r"\b(bachelor'?s?|b\.?sc|b\.s\.|b\.?tech|b\.?eng|b\.e\.|b\.a\.)(?!\w)", re.IGNORECASE)),
+    ("associate", re.compile(r"\bassociate'?s?\s+(degree|of)(?!\w)", re.IGNORECASE)),
+    ("diploma", re.compile(r"\b(diploma|high school)(?!\w)", re.IGNORECASE)),
+)
+SKILL_SEPARATORS = re.compile(r"[,;|•·●▪]|\s/\s")
+MAX_SKILL_WORDS = 3
+MAX_SKILL_LENGTH = 32
+MAX_EDUCATION_ENTRIES = 4
+MAX_EDUCATION_LENGTH = 120
+# Ranges longer than this are parse errors, not careers
+MAX_RANGE_MONTHS = 50 * 12
+
+
+class ResumeProfile:
+    """
+    Parsed facts about one resume. experience_years is computed from date
+    ranges (overlapping jobs counted once), stated_experience_years is the
+    largest "N years of experience" claim; either may be None. sections is
+    a tuple of (name, tokens) in document order.
+    """
+
+    __slots__ = ("content_hash", "skills", "experience_years", "stated_experience_years", "degree", "education",
+                 "sections")
+
+    def __init__(self, content_hash, skills, experience_years, stated_experience_years, degree, education, sections):
+        self.content_hash = content_hash
+        self.skills = skills
+        self.experience_years = experience_years
+        self.stated_experience_years = stated_experience_years
+        self.degree = degree
+        self.education = education
+        self.sections = sections
+
+    @property
+    def total_experience_years(self):
+        """Best available estimate: the larger of the computed and stated figures."""
+        known = [years for years in (self.experience_years, self.stated_experience_years) if years is not None]
+        return max(known) if known else None
+
+    def meets_experience(self, required_years, tolerance=0.0):
+        """True/False against a requirement; None when the resume gives no usable dates or claim."""
+        if required_years is None or self.total_experience_years is None:
+            return None
+        return self.total_experience_years + tolerance >= required_years
+
+    def to_dict(self):
+        return {
+            "skills": list(self.skills),
+            "experience_years": self.experience_years,
+            "stated_experience_years": self.stated_experience_years,
+            "total_experience_years": self.total_experience_years,
+            "degree": self.degree,
+            "education": list(self.education),
+            "sections": [name for name, _ in self.sections],
+        }
+
+
+def _month_index(month, number, year, default_month):
+    if month:
+        value = MONTHS[month[:3].lower()]
+    elif number and 1 <= int(number) <= 12:
+        value = int(number)
+    else:
+        value = default_month
+    return int(year) * 12 + value - 1
+
+
+def experience_months(lines, now=None):
+    """
+    Months covered by the date ranges in lines ("Jan 2019 - Mar 2021",
+    "2018 - Present", "03/2017 to 06/2019"), with overlaps merged.
+    Returns None when no range is found.
+    """
+    now = time.localtime(now)
+    current = now.tm_year * 12 + now.tm_mon - 1
+    spans = []
+    for match in DATE_RANGE.finditer("\n".join(lines)):
+        start = _month_index(match["start_month"], match["start_number"], match["start_year"], 1)
+        if match["ongoing"]:
+            end = current
+        else:
+            end = _month_index(match["end_month"], match["end_number"], match["end_year"], 1)
+        end = min(end, current)
+        if start <= end and end - start <= MAX_RANGE_MONTHS:
+            spans.append((start, end))
+    if not spans:
+        return None
+    months = 0
+    covered_until = None
+    for start, end in sorted(spans):
+        if covered_until is not None and start <= covered_until:
+            if end > covered_until:
+                months += end - covered_until
+                covered_until = end
+            continue
+        months += max(end - start, 1)
+        covered_until = end
+    return months
+
+
+def stated_experience(text):
+    claims = [float(value) for value in STATED_EXPERIENCE.findall(text)]
+    return max(claims) if claims else None
+
+
+def extract_skills(normalized_text, skill_lines):
+    """Vocabulary skills found anywhere, plus the short items listed in the skills section."""
+    skills = {keyword for keyword in SKILL_VOCABULARY if f" {keyword} " in normalized_text}
+    for line in skill_lines:
+        for item in SKILL_SEPARATORS.split(line):
+            # "Languages: Python" - the item follows its label
+            keyword = canonical_keyword(item.split(":", 1)[-1])
+            if keyword and len(keyword) <= MAX_SKILL_LENGTH and keyword.count(" ") < MAX_SKILL_WORDS:
+                skills.add(keyword)
+    return tuple(sorted(skills))
+
+
+def highest_degree(lines):
+    text = "\n".join(lines)
+    for level, pattern in DEGREES:
+        if pattern.search(text):
+            return level
+    return None
+
+
+def parse_resume(text, content_hash=None, now=None):
+    """Builds the ResumeProfile of extracted resume text (page breaks included)."""
+    pages, _ = strip_repeated_page_lines(normalize_whitespace(text))
+    lines, _ = dedupe_lines([line for page in pages for line in page])
+    sections = split_sections(lines)
+    # Section body without its heading line
+    bodies = {}
+    for name, block in sections:
+        body = block if name == "header" else block[1:]
+        bodies.setdefault(name, []).extend(line for line in body if line)
+
+    # Dates in the education section are study years, not experience
+    experience_lines = bodies.get("experience") or [
+        line for name, block in bodies.items() if name != "education" for line in block
+    ]
+    months = experience_months(experience_lines, now)
+    education = bodies.get("education", [])
+    return ResumeProfile(
+        content_hash=content_hash or make_cache_key(text),
+        skills=extract_skills(normalize_text(text), bodies.get("skills", [])),
+        experience_years=round(months / 12, 1) if months is not None else None,
+        stated_experience_years=stated_experience("\n".join(lines)),
+        degree=highest_degree(education),
+        education=tuple(line[:MAX_EDUCATION_LENGTH] for line in education[:MAX_EDUCATION_ENTRIES]),
+        sections=tuple((name, count_tokens("\n".join(block))) for name, block in sections),
+    )
+
+
+def describe_experience_skip(profile, required_years):
+    return (
+        f"Local pre-screen: about {profile.total_experience_years:g} years of experience found in the resume, "
+        f"below the required {required_years:g} years. AI analysis was skipped."
+    )
+
+
+class ResumeParser:
+    """
+    Profiles cached by the content hash of the resume text. Entries expire
+    after `ttl` seconds, since an open-ended range ("2019 - Present") grows
+    with the calendar.
+    """
+
+    def __init__(self, experience_tolerance=1.0, max_entries=4096, ttl=86400):
+        self.experience_tolerance = experience_tolerance
+        self.profiles = LRUCache(max_entries, ttl)
+        self.parsed = 0
+        self.hits = 0
+        self.parse_seconds = 0.0
+        self.llm_skipped = 0
+
+    def parse(self, text):
+        content_hash = make_cache_key(text)
+        profile = self.profiles.get(content_hash)
+        if profile is not None:
+            self.hits += 1
+            return profile
+        started = time.perf_counter()
+        profile = parse_resume(text, content_hash)
+        self.parse_seconds += time.perf_counter() - started
+        self.parsed += 1
+        self.profiles.set(content_hash, profile)
+        return profile
+
+    def below_experience(self, profile, required_years):
+        """True when the resume clearly falls short of required_years (beyond the tolerance)."""
+        return profile.meets_experience(required_years, self.experience_tolerance) is False
+
+    def stats(self):
+        lookups = self.parsed + self.hits
+        return {
+            "profiles": len(self.profiles),
+            "parsed": self.parsed,
+            "hits": self.hits,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "average_parse_ms": round(self.parse_seconds / self.parsed * 1000, 2) if self.parsed else 0.0,
+            "llm_skipped": self.llm_skipped,
+        }
@@ -0,0 +1,289 @@
+"""
+Latency-aware routing across a pool of OpenRouter models.
+
+Every call goes to the fastest healthy model (by a moving average of its
+latency). A model that errors is failed over to the next one; a model that
+is rate limited, or fails several times in a row, sits out a cooldown.
+With hedging on, a second request goes to the next model once the first
+has run past its model's p95 latency, and whichever answers first wins.
+
+The OpenAI SDK is imported inside the functions that inspect its errors,
+so importing this module does not pay for it (see clients.py).
+"""
+import asyncio
+import random
+import time
+from collections import deque
+
+from fastapi import HTTPException
+
+from metrics import record_llm_request, record_upstream_error
+
+LATENCY_WINDOW = 200
+EWMA_ALPHA = 0.2
+
+
+class EmptyStreamError(Exception):
+    """The model closed a stream without sending a single chunk."""
+
+
+def error_reason(error):
+    """Short, low-cardinality label for a failed OpenRouter call."""
+    import openai
+
+    if isinstance(error, openai.APITimeoutError):
+        return "timeout"
+    if isinstance(error, openai.APIStatusError):
+        return f"http_{error.status_code}"
+    if isinstance(error, openai.APIConnectionError):
+        return "connection"
+    return type(error).__name__
+
+
+def is_transient(error):
+    """Errors another attempt (same or other model) may not hit."""
+    import openai
+
+    if isinstance(error, (EmptyStreamError, openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+def retry_after_seconds(error):
+    import openai
+
+    if isinstance(error, openai.APIStatusError):
+        value = error.response.headers.get("retry-after", "")
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            return None
+    return None
+
+
+class ModelHealth:
+    """Latency window, moving average and failure state of one model."""
+
+    def __init__(self, model):
+        self.model = model
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.ewma = None
+        self.calls = 0
+        self.failures = 0
+        self.rate_limited = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.hedge_wins = 0
+
+    def healthy(self, now):
+        return now >= self.cooldown_until
+
+    def percentile(self, q):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def record_success(self, seconds):
+        self.calls += 1
+        self.consecutive_failures = 0
+        self.latencies.append(seconds)
+        self.ewma = seconds if self.ewma is None else EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * self.ewma
+
+    def snapshot(self, now):
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "rate_limited": self.rate_limited,
+            "healthy": self.healthy(now),
+            "cooldown_seconds": round(max(self.cooldown_until - now, 0.0), 1),
+            "ewma_ms": round(self.ewma * 1000, 1) if self.ewma is not None else None,
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+class ModelRouter:
+    """
+    Orders models by health and latency, fails over between them and
+    optionally hedges slow calls. Requests are async callables taking the
+    model name, so the router knows nothing about prompts or clients.
+    """
+
+    def __init__(self, models, hedge=False, hedge_min_delay=1.0, hedge_min_samples=20, hedge_max_ratio=0.1,
+                 failure_threshold=3, cooldown=30.0, rate_limit_cooldown=60.0, explore_ratio=0.05):
+        self.models = list(dict.fromkeys(models))
+        self.health = {model: ModelHealth(model) for model in self.models}
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_max_ratio = hedge_max_ratio
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.rate_limit_cooldown = rate_limit_cooldown
+        self.explore_ratio = explore_ratio
+        self.requests = 0
+        self.failovers = 0
+        self.hedges = 0
+
+    @property
+    def primary(self):
+        return self.models[0]
+
+    def ranked(self):
+        """
+        Healthy models fastest first (unmeasured ones count as fastest so they
+        get sampled), then models in cooldown by how soon they come back. Now
+        and then a random healthy model goes first so stale averages refresh.
+        """
+        now = time.monotonic()
+        healthy = [m for m in self.models if self.health[m].healthy(now)]
+        healthy.sort(key=lambda m: self.health[m].ewma or 0.0)
+        if len(healthy) > 1 and random.random() < self.explore_ratio:
+            healthy.insert(0, healthy.pop(random.randrange(1, len(healthy))))
+        cooling = sorted((m for m in self.models if m not in healthy), key=lambda m: self.health[m].cooldown_until)
+        return healthy + cooling
+
+    def hedge_delay(self, model):
+        health = self.health[model]
+        if not self.hedge or len(health.latencies) < self.hedge_min_samples:
+            return None
+        if self.hedges >= self.hedge_max_ratio * self.requests:
+            return None
+        return max(health.percentile(0.95), self.hedge_min_delay)
+
+    def _record_failure(self, model, error):
+        import openai
+
+        health = self.health[model]
+        health.calls += 1
+        health.failures += 1
+        health.consecutive_failures += 1
+        now = time.monotonic()
+        if isinstance(error, openai.RateLimitError):
+            health.rate_limited += 1
+            wait = retry_after_seconds(error)
+            health.cooldown_until = now + (wait if wait is not None else self.rate_limit_cooldown)
+        elif health.consecutive_failures >= self.failure_threshold:
+            health.cooldown_until = now + self.cooldown
+        reason = error_reason(error)
+        record_upstream_error("openrouter", reason)
+        record_llm_request(model, reason)
+        print(f"Model {model} failed ({reason}): {str(error)[:200]}")
+
+    async def _attempt(self, model, request):
+        started = time.perf_counter()
+        try:
+            result = await request(model)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._record_failure(model, e)
+            raise
+        seconds = time.perf_counter() - started
+        self.health[model].record_success(seconds)
+        record_llm_request(model, "success", seconds)
+        return result
+
+    async def call(self, request):
+        """Runs request(model) with failover and hedging. Returns (result, model)."""
+        self.requests += 1
+        candidates = self.ranked()
+        running = {}
+        errors = []
+        hedge_task = None
+
+        def launch(model):
+            task = asyncio.create_task(self._attempt(model, request))
+            running[task] = (model, time.perf_counter())
+            return task
+
+        launch(candidates.pop(0))
+        try:
+            while running:
+                timeout = None
+                if hedge_task is None and candidates and len(running) == 1:
+                    (model, launched_at), = running.values()
+                    delay = self.hedge_delay(model)
+                    if delay is not None:
+                        timeout = max(delay - (time.perf_counter() - launched_at), 0.0)
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    self.hedges += 1
+                    hedge_task = launch(candidates.pop(0))
+                    continue
+                for task in done:
+                    model, _ = running.pop(task)
+                    if task.exception() is None:
+                        if task is hedge_task:
+                            self.health[model].hedge_wins += 1
+                        return task.result(), model
+                    errors.append(task.exception())
+                if not running and candidates:
+                    self.failovers += 1
+                    launch(candidates.pop(0))
+        finally:
+            for task in running:
+                task.cancel()
+        raise self.exhausted(errors)
+
+    async def stream(self, open_stream):
+        """
+        Streams from the first model that produces a chunk, failing over on
+        errors before that point (an empty stream counts as one).
+        open_stream(model) returns an async iterator. Yields (chunk, model).
+        """
+        self.requests += 1
+        errors = []
+        for position, model in enumerate(self.ranked()):
+            if position:
+                self.failovers += 1
+            started = time.perf_counter()
+            try:
+                chunks = await open_stream(model)
+                try:
+                    first = await chunks.__anext__()
+                except StopAsyncIteration:
+                    raise EmptyStreamError(f"{model} returned an empty stream") from None
+            except Exception as e:
+                self._record_failure(model, e)
+                errors.append(e)
+                continue
+            yield first, model
+            try:
+                async for chunk in chunks:
+                    yield chunk, model
+            except Exception as e:
+                # Too late to fail over, the caller already has part of the reply
+                self._record_failure(model, e)
+                raise
+            seconds = time.perf_counter() - started
+            self.health[model].record_success(seconds)
+            record_llm_request(model, "success", seconds)
+            return
+        raise self.exhausted(errors)
+
+    def exhausted(self, errors):
+        """503 with Retry-After when every model is temporarily unavailable, else 500."""
+        last = errors[-1] if errors else None
+        if errors and all(is_transient(e) for e in errors):
+            now = time.monotonic()
+            wait = min(max(h.cooldown_until - now, 1.0) for h in self.health.values())
+            return HTTPException(
+                status_code=503,
+                detail=f"All models are unavailable, last error: {str(last)}",
+                headers={"Retry-After": str(int(wait + 0.999))},
+            )
+        return HTTPException(status_code=500, detail=f"OpenRouter API error: {str(last)}")
+
+    def stats(self):
+        now = time.monotonic()
+        return {
+            "requests": self.requests,
+            "failovers": self.failovers,
+            "hedges": self.hedges,
+            "hedging": self.hedge,
+            "models": {model: self.health[model].snapshot(now) for model in self.models},
+        }
@@ -0,0 +1,98 @@
+"""
+Production launcher: runs the API in N uvicorn worker processes.
+
+Per-process state would split N ways under `uvicorn --workers`, so before
+the workers start this points every shared piece at a local SQLite file
+(WAL mode) that all of them open:
+
+    RESULT_CACHE_DB   analysis results (each worker keeps its LRU in front)
+    TEXT_CACHE_DB     extracted resume text and URL validators
+    LLM_LIMITER_DB    the RPM/TPM token buckets, so the workers together
+                      stay under one provider limit
+    JOB_REGISTRY_DB   job contexts (already on disk; LRUs are invalidated
+                      on commits from other workers)
+
+The job queue and the embedding index are already shared through their
+files. Settings that are already set in the environment are left alone.
+Per-process caps (LLM_MAX_CONCURRENCY, LLM_QUEUE_SIZE, JOB_QUEUE_WORKERS)
+are treated as totals and divided between the workers, and each worker's
+PDF process pool gets its share of the cores.
+
+Usage:
+    python serve.py                 # one worker per available core
+    python serve.py --workers 4 --port 8000
+"""
+import argparse
+import math
+import os
+
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SHARED_STORES = {
+    "RESULT_CACHE_DB": "result_cache.db",
+    "TEXT_CACHE_DB": "text_cache.db",
+    "LLM_LIMITER_DB": "llm_limiter.db",
+    "JOB_REGISTRY_DB": "job_registry.db",
+    "JOB_QUEUE_DB": "job_queue.db",
+}
+# Per-process limits that are split between workers, with the defaults api.py uses
+PER_WORKER_TOTALS = {
+    "LLM_MAX_CONCURRENCY": 16,
+    "LLM_QUEUE_SIZE": 100,
+    "JOB_QUEUE_WORKERS": 4,
+}
+
+
+def available_cores():
+    """Cores this process may run on (respects CPU affinity and container cpusets)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def configure_workers(workers, state_dir, environ=os.environ):
+    """Sets the shared-store paths and per-worker limits in environ. Returns what was set."""
+    applied = {}
+    for name, filename in SHARED_STORES.items():
+        if not environ.get(name):
+            applied[name] = os.path.join(state_dir, filename)
+    for name, default in PER_WORKER_TOTALS.items():
+        total = int(environ.get(name) or default)
+        applied[name] = str(max(1, math.ceil(total / workers)))
+    if not environ.get("PDF_PROCESS_WORKERS"):
+        applied["PDF_PROCESS_WORKERS"] = str(max(1, available_cores() // workers))
+    environ.update(applied)
+    return applied
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "0")) or None,
+                        help="worker processes (default: WEB_CONCURRENCY, else one per available core)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--state-dir", default=".", help="directory for the shared SQLite files")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    workers = args.workers or available_cores()
+    os.makedirs(args.state_dir, exist_ok=True)
+    applied = configure_workers(workers, os.path.abspath(args.state_dir))
+    print(f"Starting {workers} workers on {args.host}:{args.port}")
+    for name, value in applied.items():
+        print(f"  {name}={value}")
+    uvicorn.run(
+        "api:app",
+        app_dir=SERVICE_DIR,
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        log_level=args.log_level,
+    )
+
+
+if __name__ == "__main__":
+    main()
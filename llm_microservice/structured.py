@@ -0,0 +1,258 @@
+"""
+Structured (JSON) model output: request, extract, repair, re-ask.
+
+Models are asked for JSON through `response_format` - a JSON schema where
+the model accepts one, plain JSON mode otherwise - and a model that rejects
+the parameter is stepped down for the rest of the process. Replies are
+parsed leniently: code fences and prose around the object are dropped and
+common defects (trailing commas, smart quotes, Python literals, a reply cut
+off before its closing braces) are repaired. Only when that fails is the
+model asked, in a short follow-up without the resume, to restate its reply
+as JSON.
+"""
+import json
+import re
+
+from metrics import record_structured_output
+
+# Response format ladder, most constrained first
+JSON_SCHEMA = "json_schema"
+JSON_OBJECT = "json_object"
+OFF = "off"
+MODES = (JSON_SCHEMA, JSON_OBJECT, OFF)
+
+# Outcomes
+VALID = "valid"
+REPAIRED = "repaired"
+REASKED = "reasked"
+FAILED = "failed"
+
+REASK_PROMPT = """Your previous reply could not be parsed as JSON.
+Rewrite it as a single JSON object with exactly these keys: {keys}.
+Return only the JSON object, no code fences or commentary.
+
+Previous reply:
+{reply}
+"""
+REASK_REPLY_CHARS = 4000
+
+FENCE = re.compile(r"^```[a-zA-Z]*\s*|\s*```$")
+TRAILING_COMMA = re.compile(r",\s*([}\]])")
+SMART_QUOTES = str.maketrans({"\u201c": '"', "\u201d": '"', "\u2018": "'", "\u2019": "'"})
+# Python literals in value position; only applied outside strings (see outside_strings)
+PYTHON_LITERALS = re.compile(r"([:\[,]\s*)(True|False|None)\b")
+PYTHON_TO_JSON = {"True": "true", "False": "false", "None": "null"}
+
+
+def scan(text, start=0):
+    """
+    Yields (index, char, in_string) for text[start:], where in_string is
+    True for the characters of a string literal, its quotes included.
+    """
+    in_string = False
+    escaped = False
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            yield index, char, True
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+            yield index, char, True
+        else:
+            yield index, char, False
+
+
+def outside_strings(text, transform):
+    """Applies transform to each stretch of text between string literals; strings are kept as they are."""
+    parts = []
+    run_start = 0
+    run_in_string = False
+    for index, _, in_string in scan(text):
+        if in_string != run_in_string:
+            chunk = text[run_start:index]
+            parts.append(chunk if run_in_string else transform(chunk))
+            run_start, run_in_string = index, in_string
+    chunk = text[run_start:]
+    parts.append(chunk if run_in_string else transform(chunk))
+    return "".join(parts)
+
+
+def find_object(text):
+    """
+    Returns the first top-level {...} span, tracking strings so braces in
+    values do not count. A reply cut off mid-object is returned up to its
+    end, for close_truncated to finish.
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+    depth = 0
+    for index, char, in_string in scan(text, start):
+        if in_string:
+            continue
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:index + 1]
+    return text[start:]
+
+
+def close_truncated(text):
+    """Closes an unterminated string and any open brackets, in order."""
+    stack = []
+    in_string = False
+    escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+    if in_string:
+        text += '"'
+    text = text.rstrip().rstrip(",")
+    return text + "".join(reversed(stack))
+
+
+def _fix_syntax(chunk):
+    chunk = TRAILING_COMMA.sub(r"\1", chunk)
+    return PYTHON_LITERALS.sub(lambda m: m.group(1) + PYTHON_TO_JSON[m.group(2)], chunk)
+
+
+def repair(text):
+    text = outside_strings(text.translate(SMART_QUOTES), _fix_syntax)
+    return outside_strings(close_truncated(text), lambda chunk: TRAILING_COMMA.sub(r"\1", chunk))
+
+
+def extract_json(text):
+    """
+    Parses the JSON object in a model reply. Returns (data, repaired) or
+    raises ValueError when no object can be recovered.
+    """
+    cleaned = FENCE.sub("", (text or "").strip())
+    try:
+        data = json.loads(cleaned)
+        if isinstance(data, dict):
+            return data, False
+    except json.JSONDecodeError:
+        pass
+    candidate = find_object(cleaned)
+    if candidate is None:
+        raise ValueError("no JSON object in reply")
+    for attempt in (candidate, repair(candidate)):
+        try:
+            data = json.loads(attempt)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(data, dict):
+            return data, True
+    raise ValueError("JSON object could not be repaired")
+
+
+def response_format(mode, response_schema):
+    """response_schema is {"name": ..., "schema": <JSON schema>}."""
+    if mode == JSON_SCHEMA:
+        return {"type": "json_schema", "json_schema": {**response_schema, "strict": True}}
+    if mode == JSON_OBJECT:
+        return {"type": "json_object"}
+    return None
+
+
+def rejects_response_format(error):
+    """True when a 400/422 is about the response_format parameter itself."""
+    message = str(error).lower()
+    return any(hint in message for hint in ("response_format", "json_schema", "json mode", "structured output"))
+
+
+class StructuredOutput:
+    """
+    Per-model response-format support plus outcome counters. A model starts
+    at the configured mode and is stepped down the first time it rejects it.
+    """
+
+    def __init__(self, mode=JSON_SCHEMA):
+        self.mode = mode
+        self.model_modes = {}
+        self.outcomes = {VALID: 0, REPAIRED: 0, REASKED: 0, FAILED: 0}
+
+    def mode_for(self, model):
+        return self.model_modes.get(model, self.mode)
+
+    def downgrade(self, model):
+        current = self.mode_for(model)
+        self.model_modes[model] = MODES[min(MODES.index(current) + 1, len(MODES) - 1)]
+        print(f"Model {model} rejected response_format={current}, using {self.model_modes[model]}")
+
+    async def create(self, model, response_schema, create):
+        """
+        Calls create(response_format) for the model's supported mode, stepping
+        down and retrying once per rejected mode.
+        """
+        import openai
+
+        while True:
+            mode = self.mode_for(model)
+            try:
+                return await create(response_format(mode, response_schema))
+            except (openai.BadRequestError, openai.UnprocessableEntityError) as e:
+                if mode == OFF or not rejects_response_format(e):
+                    raise
+                self.downgrade(model)
+
+    def record(self, outcome):
+        self.outcomes[outcome] += 1
+        record_structured_output(outcome)
+
+    async def parse(self, reply, keys, reask, required=None):
+        """
+        Returns the reply's JSON object, re-asking once through
+        reask(prompt) -> reply text when it cannot be parsed or lacks a
+        required key (all keys by default). Raises ValueError if the re-ask
+        does not help either.
+        """
+        required = keys if required is None else required
+        try:
+            data, repaired = extract_json(reply)
+            if all(key in data for key in required):
+                self.record(REPAIRED if repaired else VALID)
+                return data
+            problem = f"missing keys {[key for key in required if key not in data]}"
+        except ValueError as e:
+            problem = str(e)
+        print(f"Structured output unusable ({problem}), re-asking")
+
+        retry = await reask(REASK_PROMPT.format(keys=", ".join(keys), reply=(reply or "")[:REASK_REPLY_CHARS]))
+        try:
+            data, _ = extract_json(retry)
+        except ValueError:
+            data = {}
+        if all(key in data for key in required):
+            self.record(REASKED)
+            return data
+        self.record(FAILED)
+        raise ValueError(f"reply was not usable JSON ({problem}) and the re-ask did not fix it")
+
+    def stats(self):
+        total = sum(self.outcomes.values())
+        fallbacks = total - self.outcomes[VALID]
+        return {
+            **self.outcomes,
+            "fallback_rate": round(fallbacks / total, 3) if total else 0.0,
+            "model_modes": dict(self.model_modes),
+        }
@@ -0,0 +1,40 @@
+import os
+import sys
+
+import pytest
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Service modules are imported by their plain names, as uvicorn runs them
+sys.path.insert(0, SERVICE_DIR)
+# Mock upstreams and PDF builders shared with the benchmarks
+sys.path.insert(0, os.path.join(SERVICE_DIR, "benchmarks"))
+
+
+@pytest.fixture(scope="session")
+def service(tmp_path_factory):
+    """TestClient for api.app against the mock LLM, with its state in a temporary directory."""
+    from bench_concurrency import free_port, start_server
+    from mock_llm import build_mock_llm
+
+    state = tmp_path_factory.mktemp("service")
+    port = free_port()
+    server = start_server(build_mock_llm(latency=0.0, tokens_per_second=1e6), port)
+    os.environ.update({
+        "OPENROUTER_API_KEY": "test",
+        "OPENROUTER_BASE_URL": f"http://127.0.0.1:{port}/v1",
+        "AI_MODELS": "anthropic/test",
+        "JOB_QUEUE_DB": str(state / "job_queue.db"),
+        "JOB_REGISTRY_DB": str(state / "job_registry.db"),
+        "EMBEDDING_INDEX_DIR": str(state / "embedding_index"),
+        "RESULT_CACHE_DB": "",
+        "TEXT_CACHE_DB": "",
+        "LLM_RPM": "0",
+        "LLM_TPM": "0",
+    })
+    import api
+    from fastapi.testclient import TestClient
+
+    with TestClient(api.app) as client:
+        yield client
+    server.should_exit = True
@@ -0,0 +1,45 @@
+from bench_concurrency import make_pdf
+
+RESUME = make_pdf([
+    "Jane Doe - Backend Engineer",
+    "Skills: Python, Docker, PostgreSQL, Kubernetes",
+    "Experience: Built Python services on Kubernetes, 2018 - 2024",
+])
+
+
+def analyze(service, job_id, applicant_id):
+    response = service.post(
+        "/api/analyze-resume/upload",
+        data={"job_id": job_id, "applicant_id": applicant_id},
+        files={"resume": ("cv.pdf", RESUME, "application/pdf")},
+    )
+    assert response.status_code == 200, response.text
+
+
+def test_small_edit_updates_locally(service):
+    service.put("/api/jobs/rescore-1", json={"job_description": "Backend engineer: Python, Docker, Kubernetes.",
+                                            "tags": ["python"]})
+    analyze(service, "rescore-1", "a1")
+    service.put("/api/jobs/rescore-1", json={"job_description": "Backend engineer: Python, Docker, Kubernetes, AWS.",
+                                            "tags": ["python"]})
+    body = service.post("/api/jobs/rescore-1/rescore", json={"threshold": 100}).json()
+    assert (body["version"], body["updated"], body["queued"]) == (2, 1, 0)
+    assert "aws" in body["applicants"][0]["missing_keywords"]
+
+
+def test_missing_stored_text_falls_back_to_reanalysis(service):
+    import api
+
+    service.put("/api/jobs/rescore-2", json={"job_description": "Backend engineer: Python, Docker, Kubernetes.",
+                                            "tags": ["python"]})
+    analyze(service, "rescore-2", "a1")
+    with api.job_registry._lock:
+        api.job_registry._conn.execute("DELETE FROM resume_texts")
+        api.job_registry._conn.commit()
+    service.put("/api/jobs/rescore-2", json={"job_description": "Backend engineer: Python, Docker, Kubernetes, AWS.",
+                                            "tags": ["python"]})
+    response = service.post("/api/jobs/rescore-2/rescore", json={"threshold": 100, "wait": True})
+    assert response.status_code == 200, response.text
+    item, = response.json()["applicants"]
+    assert item["status"] == "failed"
+    assert "Stored resume text" in item["error"]
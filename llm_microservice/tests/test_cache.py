@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+import httpx
+
+from bench_concurrency import make_pdf
+from cache import LRUCache, ResultCache, SqliteCache, make_cache_key
+from extraction import ResumeTextCache, download_resume
+
+
+def test_cache_key_is_stable_and_distinguishes_none():
+    assert make_cache_key("job", "resume") == make_cache_key("job", "resume")
+    assert make_cache_key("job", None) != make_cache_key("job", "")
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert len(cache) == 2
+
+
+def test_lru_entries_expire(monkeypatch):
+    cache = LRUCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=600)
+    now = time.time()
+    monkeypatch.setattr("cache.time.time", lambda: now + 120)
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+
+def test_sqlite_cache_keeps_the_newest_rows(tmp_path):
+    cache = SqliteCache(str(tmp_path / "cache.db"), ttl=60, max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.set(key, {"key": key})
+    assert len(cache) == 2
+    assert cache.get("a") is None
+    assert cache.get("c") == {"key": "c"}
+    cache.close()
+
+
+def test_disk_hits_are_promoted_to_memory(tmp_path):
+    path = str(tmp_path / "results.db")
+    first = ResultCache("results", db_path=path)
+    first.set("key", {"score": 80})
+    first.close()
+
+    second = ResultCache("results", db_path=path)
+    assert second.get("key") == {"score": 80}
+    assert second.get("key") == {"score": 80}
+    assert second.get("other") is None
+    stats = second.stats()
+    assert (stats["hits"], stats["disk_hits"], stats["misses"]) == (2, 1, 1)
+    assert stats["memory_entries"] == 1
+    second.close()
+
+
+def resume_origin(pdf, requests):
+    """Origin answering 304 to a matching If-None-Match."""
+    def handler(request):
+        requests.append(request)
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304, headers={"ETag": '"v1"'})
+        return httpx.Response(200, content=pdf, headers={"ETag": '"v1"', "Content-Type": "application/pdf"})
+    return handler
+
+
+def test_known_resume_is_revalidated_with_a_conditional_get(tmp_path):
+    pdf = make_pdf(["Jane Doe", "Python Engineer"])
+    requests = []
+    text_cache = ResumeTextCache(db_path=str(tmp_path / "texts.db"))
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(resume_origin(pdf, requests))) as client:
+            first = await download_resume(client, "https://cdn.test/jane.pdf", text_cache)
+            assert first == (None, pdf)
+            # Not parsed yet: no cached text, so no conditional request either
+            assert await download_resume(client, "https://cdn.test/jane.pdf", text_cache) == (None, pdf)
+            assert "if-none-match" not in requests[-1].headers
+
+            text_cache.set_text(text_cache.get_validators("https://cdn.test/jane.pdf")["sha256"], "Jane Doe")
+            return await download_resume(client, "https://cdn.test/jane.pdf", text_cache)
+
+    assert asyncio.run(scenario()) == ("Jane Doe", None)
+    assert requests[-1].headers["if-none-match"] == '"v1"'
+    assert text_cache.stats()["not_modified"] == 1
+    text_cache.close()
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from coalesce import SingleFlight
+
+
+def test_concurrent_callers_share_one_computation():
+    flights = SingleFlight()
+    runs = []
+
+    async def compute():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return {"score": 80}
+
+    async def scenario():
+        results = await asyncio.gather(*(flights.run("analyze", "key", compute) for _ in range(5)))
+        # Finished keys are forgotten: the next call computes again
+        await flights.run("analyze", "key", compute)
+        return results
+
+    results = asyncio.run(scenario())
+    assert results == [{"score": 80}] * 5
+    assert len(runs) == 2
+    assert flights.stats() == {
+        "in_flight": 0,
+        "analyze": {"calls": 2, "coalesced": 4, "saved_ratio": 0.667},
+    }
+
+
+def test_kinds_and_keys_are_separate():
+    flights = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.01)
+        return object()
+
+    async def scenario():
+        return await asyncio.gather(
+            flights.run("analyze", "a", compute),
+            flights.run("analyze", "b", compute),
+            flights.run("summary", "a", compute),
+        )
+
+    assert len({id(result) for result in asyncio.run(scenario())}) == 3
+
+
+def test_errors_are_shared():
+    flights = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.01)
+        raise ValueError("bad PDF")
+
+    async def scenario():
+        return await asyncio.gather(*(flights.run("analyze", "key", compute) for _ in range(3)),
+                                    return_exceptions=True)
+
+    errors = asyncio.run(scenario())
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_cancelled_caller_does_not_stop_the_others():
+    flights = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def scenario():
+        first = asyncio.create_task(flights.run("analyze", "key", compute))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(flights.run("analyze", "key", compute))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == "done"
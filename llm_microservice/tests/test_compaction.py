@@ -0,0 +1,61 @@
+import compaction
+
+
+def test_first_count_loads_the_tokenizer(monkeypatch):
+    monkeypatch.setattr(compaction, "_tokenizer", None)
+    monkeypatch.setattr(compaction, "_tokenizer_loaded", False)
+    text = "Senior Python engineer with Kubernetes and PostgreSQL experience. " * 20
+    first = compaction.count_tokens(text)
+    assert compaction._tokenizer_loaded
+    # The warm-up loading it again changes nothing
+    compaction.load_tokenizer()
+    assert compaction.count_tokens(text) == first
+
+
+def resume(pages):
+    return compaction.PAGE_BREAK.join("\n".join(lines) for lines in pages)
+
+
+def test_running_headers_page_numbers_and_duplicates_are_removed():
+    text = resume([
+        ["Jane Doe - Resume", "Skills", "Python", "Docker", "Go", "AWS", "Page 1 of 2"],
+        ["Jane Doe - Resume", "Experience", "Acme", "Docker", "Led a team", "Shipped APIs", "Page 2 of 2"],
+    ])
+    compactor = compaction.Compactor({}, default_resume_budget=1000, job_description_budget=100)
+    compacted, report = compactor.compact_resume(text, "any/model")
+    assert compacted.splitlines() == [
+        "Skills", "Python", "Docker", "Go", "AWS", "Experience", "Acme", "Led a team", "Shipped APIs",
+    ]
+    assert report["removed_header_lines"] == 4
+    assert report["removed_duplicate_lines"] == 1
+    assert report["dropped_sections"] == []
+
+
+def test_sections_are_kept_by_priority_within_the_budget():
+    lines = ["Jane Doe", "Interests", *[f"Hobby number {n} with a long description" for n in range(30)],
+             "Skills", "Python, Kubernetes, PostgreSQL"]
+    compactor = compaction.Compactor({"small/model": 40}, default_resume_budget=1000, job_description_budget=100)
+    compacted, report = compactor.compact_resume("\n".join(lines), "small/model")
+    # Original order, with the low-priority section cut short to fill the budget
+    assert compacted.splitlines()[0] == "Jane Doe"
+    assert compacted.splitlines()[-2:] == ["Skills", "Python, Kubernetes, PostgreSQL"]
+    assert report["dropped_sections"] == ["interests (truncated)"]
+    assert report["compacted_tokens"] <= 40
+    assert compactor.stats()["tokens_saved"] > 0
+
+
+def test_excluded_sections_are_left_out():
+    text = "Jane Doe\nReferences\nAvailable on request\nSkills:\nPython"
+    compactor = compaction.Compactor({}, default_resume_budget=1000, job_description_budget=100)
+    compacted, report = compactor.compact_resume(text, "any/model", exclude_sections=("references",))
+    assert compacted.splitlines() == ["Jane Doe", "Skills:", "Python"]
+    assert report["excluded_sections"] == ["references"]
+
+
+def test_job_description_is_cut_at_a_line_boundary():
+    text = "\n".join(f"Requirement {n}: five years of production Python" for n in range(50))
+    compactor = compaction.Compactor({}, default_resume_budget=1000, job_description_budget=60)
+    compacted, report = compactor.compact_job_description(text)
+    assert report["truncated"]
+    assert compacted.startswith("Requirement 0:")
+    assert compaction.count_tokens(compacted) <= 60
@@ -0,0 +1,31 @@
+import pytest
+
+from embeddings import EmbeddingIndex, HashingEncoder, fastembed_available, load_encoder
+
+
+def applicant(item_id, text):
+    return {"id": item_id, "resume_url": f"https://cdn.test/{item_id}.pdf", "cover_letter": None, "text": text}
+
+
+def test_auto_falls_back_to_hashing_without_fastembed():
+    if fastembed_available():
+        pytest.skip("fastembed is installed")
+    assert isinstance(load_encoder("auto"), HashingEncoder)
+
+
+def test_hashing_index_ranks_by_shared_terms_and_reports_its_backend(tmp_path):
+    index = EmbeddingIndex(str(tmp_path / "index"), backend="hashing", dim=256)
+    assert index.stats()["backend"] is None
+    index.add("job-1", [
+        applicant("python", "Python engineer, Django, PostgreSQL, Kubernetes"),
+        applicant("design", "Graphic designer, Figma, illustration, branding"),
+    ])
+    candidates, pool_size = index.rank("job-1", "Backend Python developer with PostgreSQL", top_k=2)
+    assert pool_size == 2
+    assert [c["id"] for c in candidates] == ["python", "design"]
+    # Lexical: a job text sharing no terms with the resumes matches none of them
+    unrelated, _ = index.rank("job-1", "Builds web services", top_k=1)
+    assert unrelated[0]["similarity"] == pytest.approx(0.0, abs=0.05)
+    assert index.stats()["backend"] == "hashing"
+    assert index.stats()["encoder"] == "hashing-256"
+    index.close()
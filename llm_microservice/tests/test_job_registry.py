@@ -0,0 +1,94 @@
+import threading
+
+import pytest
+
+from job_registry import KEPT_VERSIONS, JobRegistry, diff_job_contexts
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "job_registry.db")
+
+
+def put(registry, job_id, summary, tags=("python",)):
+    return registry.put(job_id, summary, list(tags), ["python"], len(summary) // 4)
+
+
+def test_unchanged_put_keeps_the_version(db_path):
+    registry = JobRegistry(db_path)
+    record, changed = put(registry, "1", "Backend engineer")
+    assert changed and record["version"] == 1
+    record, changed = put(registry, "1", "Backend engineer")
+    assert not changed and record["version"] == 1
+    record, changed = put(registry, "1", "Backend engineer, Kubernetes")
+    assert changed and record["version"] == 2
+    assert registry.get_version("1", 1)["summary"] == "Backend engineer"
+
+
+def test_concurrent_edits_get_consecutive_versions(db_path):
+    # Two registries on one file stand in for two workers, each with several threads
+    registries = [JobRegistry(db_path), JobRegistry(db_path)]
+    put(registries[0], "1", "initial")
+
+    def edit(registry, worker):
+        for n in range(10):
+            put(registry, "1", f"summary {worker}-{n}")
+
+    threads = [threading.Thread(target=edit, args=(registries[w % 2], w)) for w in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    final = registries[1].get("1")
+    assert final["version"] == 41
+    kept = [registries[0].get_version("1", v) for v in range(1, 42)]
+    assert [v is not None for v in kept].count(True) == KEPT_VERSIONS
+    assert all(record is not None for record in kept[-KEPT_VERSIONS:])
+
+
+def test_results_from_other_workers_keep_the_cache(db_path):
+    reader, writer = JobRegistry(db_path), JobRegistry(db_path)
+    put(reader, "1", "Backend engineer")
+    reader.get("1")
+    for n in range(5):
+        writer.record_result("1", f"applicant-{n}", 1, f"resume {n}", None, {"score": 50})
+    reader.get("1")
+    assert reader.memory_hits == 2
+    assert reader.invalidations == 0
+
+
+def test_edit_through_another_worker_is_seen(db_path):
+    reader, writer = JobRegistry(db_path), JobRegistry(db_path)
+    put(reader, "1", "Backend engineer")
+    assert reader.get("1")["version"] == 1
+    put(writer, "1", "Frontend engineer", ["react"])
+    record = reader.get("1")
+    assert (record["version"], record["tags"]) == (2, ["react"])
+    assert reader.invalidations == 1
+
+    # Deleted and registered again: same version number, different context
+    writer.delete("1")
+    put(writer, "1", "Data engineer", ["spark"])
+    assert reader.get("1")["tags"] == ["spark"]
+
+
+def test_delete_removes_results_and_texts(db_path):
+    registry = JobRegistry(db_path)
+    put(registry, "1", "Backend engineer")
+    registry.record_result("1", "a", 1, "resume text", None, {"score": 70})
+    text_hash = registry.results("1")[0]["text_hash"]
+    assert registry.resume_text(text_hash) == "resume text"
+    assert registry.delete("1")
+    assert registry.get("1") is None
+    assert registry.results("1") == []
+    assert registry.resume_text(text_hash) is None
+    assert not registry.delete("1")
+
+
+def test_diff_reports_keywords_and_summary_change():
+    old = {"version": 1, "summary": "python docker backend", "keywords": ["python", "docker"]}
+    new = {"version": 2, "summary": "python kubernetes backend", "keywords": ["python", "kubernetes"]}
+    diff = diff_job_contexts(old, new)
+    assert diff["added_keywords"] == ["kubernetes"]
+    assert diff["removed_keywords"] == ["docker"]
+    assert 0 < diff["summary_change"] < 1
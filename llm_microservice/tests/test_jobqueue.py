@@ -0,0 +1,94 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from jobqueue import FAILED, QUEUED, RUNNING, SUCCEEDED, JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), workers=1, backoff_base=0.0, lease_seconds=60, poll_interval=0.01)
+    yield queue
+    queue.close()
+
+
+def test_identical_inputs_share_a_job(queue):
+    first = queue.enqueue("analyze", {"resume_url": "a"}, "hash-a")
+    assert queue.enqueue("analyze", {"resume_url": "a"}, "hash-a") == first
+    assert queue.enqueue("analyze", {"resume_url": "b"}, "hash-b") != first
+    assert queue.stats()["deduplicated"] == 1
+
+
+def test_failed_duplicate_is_requeued(queue):
+    job_id = queue.enqueue("analyze", {}, "hash")
+    job = queue.claim()
+    queue.fail(job["id"], job["attempts"], "bad PDF", retryable=False)
+    assert queue.get(job_id)["status"] == FAILED
+
+    assert queue.enqueue("analyze", {}, "hash") == job_id
+    requeued = queue.get(job_id)
+    assert (requeued["status"], requeued["attempts"], requeued["error"]) == (QUEUED, 0, None)
+
+
+def test_claims_lease_each_job_once(queue):
+    for number in range(20):
+        queue.enqueue("analyze", {"number": number}, f"hash-{number}")
+    claimed = []
+
+    def worker():
+        while (job := queue.claim()) is not None:
+            claimed.append(job["payload"]["number"])
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == list(range(20))
+    assert queue.counts()[RUNNING] == 20
+
+
+def test_expired_lease_is_claimed_again(queue):
+    job_id = queue.enqueue("analyze", {}, "hash")
+    queue.lease_seconds = -1
+    assert queue.claim()["attempts"] == 1
+    again = queue.claim()
+    assert (again["id"], again["attempts"]) == (job_id, 2)
+
+
+def test_retries_until_max_attempts(queue, monkeypatch):
+    # No jitter on top of the (zero) backoff, so the retry is due at once
+    monkeypatch.setattr("jobqueue.random.uniform", lambda low, high: 0.0)
+    queue.max_attempts = 2
+    job_id = queue.enqueue("analyze", {}, "hash")
+    job = queue.claim()
+    assert queue.fail(job["id"], job["attempts"], "timeout", retryable=True)
+    assert queue.get(job_id)["status"] == QUEUED
+    job = queue.claim()
+    assert not queue.fail(job["id"], job["attempts"], "timeout", retryable=True)
+    assert queue.get(job_id)["status"] == FAILED
+
+
+def test_workers_run_handlers_and_classify_errors(queue):
+    async def analyze(resume_url):
+        if resume_url == "missing":
+            raise HTTPException(status_code=404, detail="Could not download resume")
+        return {"score": 80}
+
+    async def scenario():
+        await queue.start({"analyze": analyze})
+        ok = queue.enqueue("analyze", {"resume_url": "ok"}, "hash-ok")
+        missing = queue.enqueue("analyze", {"resume_url": "missing"}, "hash-missing")
+        for _ in range(200):
+            if queue.counts()[QUEUED] == queue.counts()[RUNNING] == 0:
+                break
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return queue.get(ok), queue.get(missing)
+
+    ok, missing = asyncio.run(scenario())
+    assert (ok["status"], ok["result"]) == (SUCCEEDED, {"score": 80})
+    # A client error is not retried
+    assert (missing["status"], missing["attempts"], missing["error"]) == (FAILED, 1, "Could not download resume")
@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+import pdf_engine
+from bench_concurrency import make_multipage_pdf
+from pdf_engine import PAGE_BREAK, PdfExtractor, looks_like_pdf
+
+
+def stuck_range(file_bytes, start, stop, backend, deadline):
+    """Stands in for a worker stuck inside one page; runs in the pool's processes."""
+    time.sleep(60)
+    return [], False
+
+
+def document(pages):
+    return make_multipage_pdf([[f"Page {index}"] for index in range(pages)])
+
+
+def test_looks_like_pdf_accepts_leading_junk():
+    assert looks_like_pdf(b"\x00" * 100 + b"%PDF-1.4")
+    assert not looks_like_pdf(b"PK\x03\x04")
+
+
+def test_pages_over_the_cap_are_skipped():
+    extractor = PdfExtractor(backend="pypdf", max_pages=2)
+    text = asyncio.run(extractor.extract(document(4)))
+    assert [page.strip() for page in text.split(PAGE_BREAK)] == ["Page 0", "Page 1"]
+    assert extractor.stats()["truncated_documents"] == 1
+
+
+def test_non_pdf_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(PdfExtractor(backend="pypdf").extract(b"plain text"))
+    assert error.value.status_code == 415
+
+
+def test_overrunning_worker_recycles_the_pool(monkeypatch):
+    extractor = PdfExtractor(backend="pypdf", time_budget=0.5, parallel_min_pages=2, workers=2)
+    monkeypatch.setattr(pdf_engine, "extract_page_range", stuck_range)
+    workers = []
+    recycle = extractor._recycle_pool
+
+    def recycle_pool(pool):
+        workers.extend(pool._processes.values())
+        recycle(pool)
+
+    monkeypatch.setattr(extractor, "_recycle_pool", recycle_pool)
+    try:
+        pool = extractor._get_pool()
+        started = time.time()
+        text = asyncio.run(extractor.extract(document(4)))
+        assert text == ""
+        assert time.time() - started < 30
+        assert extractor.stats()["pool_recycles"] == 1
+        assert extractor.stats()["budget_exceeded"] == 1
+        assert extractor._pool is None
+        assert workers
+        for process in workers:
+            process.join(5)
+            assert not process.is_alive()
+
+        monkeypatch.undo()
+        extractor.time_budget = 30.0
+        text = asyncio.run(extractor.extract(document(4)))
+        assert [page.strip() for page in text.split(PAGE_BREAK)] == [f"Page {index}" for index in range(4)]
+        assert extractor._pool is not pool
+    finally:
+        extractor.close()
@@ -0,0 +1,63 @@
+import pytest
+
+from prescore import AVERAGE_RESUME_TERMS, JobKeywordIndex, PreScorer, keyword_idf, update_missing_keywords
+
+
+@pytest.fixture
+def scorer():
+    return PreScorer()
+
+
+def filler(terms):
+    return " ".join(f"word{n}" for n in range(terms))
+
+
+def test_synonyms_are_folded(scorer):
+    index = scorer.index_for(["kubernetes", "postgresql"], "")
+    result = scorer.score("Ran k8s clusters backed by postgres", index)
+    assert result["matched_keywords"] == ["kubernetes", "postgresql"]
+    assert result["missing_keywords"] == []
+    assert result["score"] == 100.0
+
+
+def test_score_is_deterministic_across_instances_and_traffic(scorer):
+    resume = "Python developer, Docker and Kubernetes. " + filler(200)
+    index = scorer.index_for(["python"], "Backend role: Docker, Kubernetes, Terraform")
+    first = scorer.score(resume, index)
+    for n in range(30):
+        scorer.score(f"Unrelated resume {n} about sales and marketing " + filler(n * 10), index)
+    assert scorer.score(resume, index) == first
+    assert PreScorer().score(resume, PreScorer().index_for(["python"], "Backend role: Docker, Kubernetes, Terraform")) == first
+
+
+def test_repetition_saturates(scorer):
+    index = scorer.index_for(["python", "kubernetes"], "")
+    text = filler(AVERAGE_RESUME_TERMS - 1)
+    once = scorer.score("python " + text, index)["score"]
+    many = scorer.score("python " * 40 + text, index)["score"]
+    assert many == once
+
+
+def test_rare_keywords_weigh_more_than_common_ones(scorer):
+    assert keyword_idf("kubernetes") > keyword_idf("python") > keyword_idf("communication")
+    index = scorer.index_for([], "Python and Kubernetes")
+    text = filler(300)
+    assert scorer.score("kubernetes " + text, index)["score"] > scorer.score("python " + text, index)["score"]
+
+
+def test_tags_weigh_more_than_summary_terms():
+    index = JobKeywordIndex(["terraform"], "Experience with Ansible")
+    weights = dict(zip(index.keywords, index.weights))
+    assert weights["terraform"] == pytest.approx(2 * weights["ansible"])
+
+
+def test_job_without_keywords_has_no_score(scorer):
+    assert scorer.score("Python", scorer.index_for([], "Friendly team")) == {
+        "score": None, "matched_keywords": [], "missing_keywords": [],
+    }
+
+
+def test_update_missing_keywords_after_edit(scorer):
+    prescore = scorer.score("python and react", scorer.index_for(["python", "react", "go"], ""))
+    updated = update_missing_keywords(["Docker", "React", "graphql"], ["docker"], prescore)
+    assert updated == ["graphql", "go"]
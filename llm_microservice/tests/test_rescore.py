@@ -0,0 +1,75 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from bench_concurrency import free_port, start_server
+from conftest import SERVICE_DIR
+from mock_llm import build_mock_llm
+from resume_server import generate_corpus
+
+JOB_DESCRIPTION = "Backend engineer with Python, Docker, PostgreSQL and Kubernetes experience."
+
+
+@pytest.fixture(scope="module")
+def llm_url():
+    port = free_port()
+    server = start_server(build_mock_llm(latency=0.0, tokens_per_second=1e6), port)
+    yield f"http://127.0.0.1:{port}/v1"
+    server.should_exit = True
+
+
+def run_cli(tmp_path, llm_url, records, *extra):
+    input_path = tmp_path / "records.jsonl"
+    output_path = tmp_path / "results.jsonl"
+    input_path.write_text("".join(json.dumps(record) + "\n" for record in records))
+    env = {
+        **os.environ,
+        "OPENROUTER_API_KEY": "test",
+        "OPENROUTER_BASE_URL": llm_url,
+        "AI_MODELS": "anthropic/test",
+        "JOB_QUEUE_DB": str(tmp_path / "job_queue.db"),
+        "JOB_REGISTRY_DB": str(tmp_path / "job_registry.db"),
+        "EMBEDDING_INDEX_DIR": str(tmp_path / "embedding_index"),
+        "RESULT_CACHE_DB": "",
+        "TEXT_CACHE_DB": "",
+        "LLM_RPM": "0",
+        "LLM_TPM": "0",
+    }
+    subprocess.run(
+        [sys.executable, "rescore.py", str(input_path), str(output_path), "--report-every", "60", *extra],
+        cwd=SERVICE_DIR, env=env, check=True, capture_output=True, text=True, timeout=120,
+    )
+    return {entry["id"]: entry for entry in map(json.loads, output_path.read_text().splitlines())}
+
+
+def test_job_id_records_register_and_reuse_the_job(tmp_path, llm_url):
+    names = generate_corpus(str(tmp_path / "resumes"), 2)
+    paths = [str(tmp_path / "resumes" / name) for name in names]
+    records = [
+        # Registers job 7 on the way, like an analysis request carrying both
+        {"id": "first", "resume_path": paths[0], "job_id": "7", "job_description": JOB_DESCRIPTION,
+         "job_tags": ["python"]},
+        {"id": "second", "resume_path": paths[1], "job_id": "7", "job_description": JOB_DESCRIPTION},
+    ]
+    results = run_cli(tmp_path, llm_url, records)
+    assert {key: entry["status"] for key, entry in results.items()} == {"first": "ok", "second": "ok"}
+    assert all(0 <= entry["result"]["score"] <= 100 for entry in results.values())
+
+    # A later run can refer to the registered job by id alone
+    results = run_cli(tmp_path, llm_url, [{"id": "third", "resume_path": paths[0], "job_id": "7"}])
+    assert results["third"]["status"] == "ok", results["third"]
+
+
+def test_unknown_job_id_fails_only_that_record(tmp_path, llm_url):
+    names = generate_corpus(str(tmp_path / "resumes"), 1)
+    path = str(tmp_path / "resumes" / names[0])
+    results = run_cli(tmp_path, llm_url, [
+        {"id": "unknown", "resume_path": path, "job_id": "404"},
+        {"id": "inline", "resume_path": path, "job_description": JOB_DESCRIPTION},
+    ])
+    assert results["unknown"]["status"] == "error"
+    assert results["unknown"]["stage"] == "download"
+    assert results["inline"]["status"] == "ok"
@@ -0,0 +1,69 @@
+import calendar
+
+import pytest
+
+from resume_parser import ResumeParser, experience_months, highest_degree, parse_resume
+
+# Mid-July 2024, so "Present" ends in July 2024 whatever the test machine's clock says
+NOW = calendar.timegm((2024, 7, 15, 12, 0, 0))
+
+RESUME = """Jane Doe
+Senior Backend Engineer - 6+ years of professional experience
+Skills
+Languages: Python, Go; Kubernetes | PostgreSQL
+Experience
+Backend Engineer, Acme - Jan 2020 - Present
+Software Engineer, Initech - 03/2017 to 06/2020
+Education
+M.Sc. Computer Science, 2015 - 2017
+B.Sc. Mathematics, 2011 - 2015"""
+
+
+@pytest.mark.parametrize("line, months", [
+    ("Jan 2019 - Mar 2021", 26),
+    ("March 2019 – June 2019", 3),
+    ("03/2017 to 06/2019", 27),
+    ("2018 - 2020", 24),
+    ("Jan 2023 - Present", 18),
+])
+def test_date_range_formats(line, months):
+    assert experience_months([line], NOW) == months
+
+
+def test_overlapping_jobs_are_counted_once():
+    lines = ["Jan 2018 - Dec 2020", "Jun 2020 - Jun 2021", "Jan 2019 - Jan 2020"]
+    assert experience_months(lines, NOW) == 41
+
+
+def test_implausible_ranges_are_ignored():
+    assert experience_months(["1950 - 2024", "2025 - 2026"], NOW) is None
+    assert experience_months(["No dates here"], NOW) is None
+
+
+def test_highest_degree_wins():
+    assert highest_degree(["B.Sc. Physics", "MBA, 2020"]) == "master"
+    assert highest_degree(["PhD in Chemistry"]) == "doctorate"
+    assert highest_degree(["Masters of nothing in particular"]) == "master"
+    assert highest_degree(["Bootcamp graduate"]) is None
+
+
+def test_profile_sections_skills_and_experience():
+    profile = parse_resume(RESUME, now=NOW)
+    assert [name for name, _ in profile.sections] == ["header", "skills", "experience", "education"]
+    assert {"python", "go", "kubernetes", "postgresql"} <= set(profile.skills)
+    # Jan 2020 - Jul 2024 and Mar 2017 - Jun 2020 merged; study years are not experience
+    assert profile.experience_years == pytest.approx(7.3)
+    assert profile.stated_experience_years == 6.0
+    assert profile.total_experience_years == pytest.approx(7.3)
+    assert profile.degree == "master"
+    assert profile.education[0].startswith("M.Sc.")
+
+
+def test_experience_pre_screen_and_cache():
+    parser = ResumeParser(experience_tolerance=1.0)
+    profile = parser.parse("Jane Doe\nExperience\nDeveloper, Jan 2022 - Jan 2024")
+    assert parser.parse("Jane Doe\nExperience\nDeveloper, Jan 2022 - Jan 2024") is profile
+    assert parser.stats()["hits"] == 1
+    assert parser.below_experience(profile, 5)
+    assert not parser.below_experience(profile, 3)
+    assert not parser.below_experience(parse_resume("Jane Doe"), 5)
@@ -0,0 +1,127 @@
+import asyncio
+
+import httpx
+import openai
+import pytest
+from fastapi import HTTPException
+
+from router import ModelRouter
+
+
+def rate_limited(retry_after):
+    request = httpx.Request("POST", "https://openrouter.test/v1/chat/completions")
+    response = httpx.Response(429, headers={"Retry-After": str(retry_after)}, request=request)
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+
+def router(models=("fast", "slow"), **options):
+    return ModelRouter(list(models), explore_ratio=0.0, **options)
+
+
+def test_failover_to_the_next_model():
+    models = router()
+    calls = []
+
+    async def request(model):
+        calls.append(model)
+        if model == "fast":
+            raise openai.APITimeoutError(request=httpx.Request("POST", "https://openrouter.test"))
+        return "answer"
+
+    assert asyncio.run(models.call(request)) == ("answer", "slow")
+    assert calls == ["fast", "slow"]
+    stats = models.stats()
+    assert stats["failovers"] == 1
+    assert stats["models"]["fast"]["failures"] == 1
+
+
+def test_rate_limited_model_sits_out_retry_after():
+    models = router()
+
+    async def request(model):
+        if model == "fast":
+            raise rate_limited(120)
+        return model
+
+    asyncio.run(models.call(request))
+    assert models.ranked() == ["slow", "fast"]
+    assert models.stats()["models"]["fast"]["cooldown_seconds"] == pytest.approx(120, abs=1)
+
+
+def test_repeated_failures_start_a_cooldown():
+    models = router(models=("flaky",), failure_threshold=2, cooldown=30.0)
+
+    async def request(model):
+        raise ValueError("bad reply")
+
+    for _ in range(2):
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(models.call(request))
+        assert error.value.status_code == 500
+    assert not models.stats()["models"]["flaky"]["healthy"]
+
+
+def test_all_models_unavailable_is_503_with_retry_after():
+    models = router()
+
+    async def request(model):
+        raise rate_limited(5)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(models.call(request))
+    assert error.value.status_code == 503
+    assert error.value.headers["Retry-After"] == "5"
+
+
+def test_empty_stream_fails_over():
+    models = router()
+
+    async def chunks(items):
+        for item in items:
+            yield item
+
+    async def open_stream(model):
+        return chunks([] if model == "fast" else ["Hel", "lo"])
+
+    async def collect():
+        return [item async for item in models.stream(open_stream)]
+
+    assert asyncio.run(collect()) == [("Hel", "slow"), ("lo", "slow")]
+    assert models.stats()["models"]["fast"]["failures"] == 1
+
+
+def test_slow_call_is_hedged_and_the_first_answer_wins():
+    models = router(hedge=True, hedge_min_delay=0.05, hedge_min_samples=1, hedge_max_ratio=1.0)
+    models.health["fast"].record_success(0.01)
+    models.health["slow"].record_success(0.02)
+    cancelled = []
+
+    async def request(model):
+        if model == "fast":
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(model)
+                raise
+        return model
+
+    async def scenario():
+        result = await models.call(request)
+        # Let the losing attempt see its cancellation
+        await asyncio.sleep(0.01)
+        return result
+
+    assert asyncio.run(scenario()) == ("slow", "slow")
+    assert cancelled == ["fast"]
+    stats = models.stats()
+    assert stats["hedges"] == 1
+    assert stats["models"]["slow"]["hedge_wins"] == 1
+
+
+def test_hedging_is_capped_by_ratio():
+    models = router(hedge=True, hedge_min_delay=0.0, hedge_min_samples=1, hedge_max_ratio=0.1)
+    models.health["fast"].record_success(0.01)
+    models.requests, models.hedges = 10, 1
+    assert models.hedge_delay("fast") is None
+    models.requests = 20
+    assert models.hedge_delay("fast") == pytest.approx(0.01)
@@ -0,0 +1,38 @@
+import pytest
+
+from structured import extract_json, repair
+
+
+def test_valid_reply_is_not_repaired():
+    assert extract_json('{"score": 80, "summary": "Good fit"}') == ({"score": 80, "summary": "Good fit"}, False)
+
+
+def test_python_literals_become_json():
+    data, repaired = extract_json('{"score": 72, "remote": True, "notes": None, "flags": [False]}')
+    assert repaired
+    assert data == {"score": 72, "remote": True, "notes": None, "flags": [False]}
+
+
+def test_python_literals_inside_strings_are_kept():
+    data, _ = extract_json('{"score": True, "summary": "True story, None"}')
+    assert data == {"score": True, "summary": "True story, None"}
+
+
+def test_trailing_comma_inside_string_is_kept():
+    data, _ = extract_json('{"summary": "Python, }", "missing_keywords": ["go",],}')
+    assert data == {"summary": "Python, }", "missing_keywords": ["go"]}
+
+
+def test_truncated_reply_is_closed():
+    data, repaired = extract_json('```json\n{"score": 80, "summary": "Strong \\"fit\\", True", "missing_keywords": ["go",')
+    assert repaired
+    assert data == {"score": 80, "summary": 'Strong "fit", True', "missing_keywords": ["go"]}
+
+
+def test_escaped_quote_does_not_end_string():
+    assert repair('{"summary": "said \\"ok, None\\"", "x": None}') == '{"summary": "said \\"ok, None\\"", "x": null}'
+
+
+def test_no_object_raises():
+    with pytest.raises(ValueError):
+        extract_json("I cannot score this resume.")
@@ -0,0 +1,87 @@
+import hashlib
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+import uploads
+from bench_concurrency import make_pdf
+from uploads import receive_resume_upload
+
+MAX_BYTES = 64 * 1024
+SPOOL_BYTES = 4 * 1024
+
+
+@pytest.fixture(scope="module")
+def client():
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        fields, resume = await receive_resume_upload(request, MAX_BYTES, spool_bytes=SPOOL_BYTES)
+        try:
+            return {
+                "fields": fields,
+                "filename": resume.filename,
+                "size": resume.size,
+                "sha256": resume.sha256,
+                "on_disk": resume.file._rolled,
+                "intact": resume.read() == request.app.state.expected,
+            }
+        finally:
+            resume.close()
+
+    with TestClient(app) as client:
+        client.app.state.expected = None
+        yield client
+
+
+def post(client, pdf, data=None):
+    client.app.state.expected = pdf
+    return client.post("/upload", data=data or {}, files={"resume": ("cv.pdf", pdf, "application/pdf")})
+
+
+def test_fields_and_file_are_parsed(client):
+    pdf = make_pdf(["Jane Doe", "Python Engineer"])
+    response = post(client, pdf, {"job_description": "Python role", "job_tags": "python"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["fields"] == {"job_description": "Python role", "job_tags": "python"}
+    assert (body["filename"], body["size"]) == ("cv.pdf", len(pdf))
+    assert body["sha256"] == hashlib.sha256(pdf).hexdigest()
+    assert body["intact"] and not body["on_disk"]
+
+
+def test_large_file_is_spooled_to_disk(client):
+    pdf = make_pdf([f"Line {n} " + "x" * 60 for n in range(100)])
+    assert SPOOL_BYTES < len(pdf) <= MAX_BYTES
+    body = post(client, pdf).json()
+    assert body["on_disk"] and body["intact"]
+
+
+def test_oversized_file_is_413(client):
+    response = post(client, b"%PDF-1.4\n" + b"0" * MAX_BYTES)
+    assert response.status_code == 413
+
+
+def test_non_pdf_is_415(client):
+    assert post(client, b"PK\x03\x04" + b"0" * 2048).status_code == 415
+    response = client.post("/upload", content=b"{}", headers={"Content-Type": "application/json"})
+    assert response.status_code == 415
+
+
+def test_oversized_field_is_413(client, monkeypatch):
+    monkeypatch.setattr(uploads, "FIELD_MAX_BYTES", 1024)
+    response = post(client, make_pdf(["Jane Doe"]), {"job_description": "x" * 2048})
+    assert response.status_code == 413
+    assert "job_description" in response.json()["detail"]
+
+
+def test_too_many_fields_is_400(client):
+    data = {f"field{n}": "x" for n in range(uploads.MAX_FIELDS + 1)}
+    assert post(client, make_pdf(["Jane Doe"]), data).status_code == 400
+
+
+def test_missing_file_is_400(client):
+    response = client.post("/upload", data={"job_description": "Python role"}, files={"other": ("a.txt", b"a")})
+    assert response.status_code == 400
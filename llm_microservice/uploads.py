@@ -0,0 +1,170 @@
+"""
+Streaming multipart resume uploads.
+
+The request body is parsed as it arrives instead of being buffered whole:
+form fields are collected (each capped in size), and the single file part
+is hashed on the fly and spooled to a temporary file that stays in memory
+up to spool_bytes. The upload is rejected as soon as it exceeds max_bytes
+or does not start like a PDF, so an oversized or wrong file costs no more
+than the bytes read so far.
+"""
+import hashlib
+import tempfile
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from metrics import stage
+from pdf_engine import MAGIC_SEARCH_BYTES, looks_like_pdf
+
+FIELD_MAX_BYTES = 256 * 1024
+MAX_FIELDS = 16
+
+
+class ResumeUpload:
+    """
+    The file part of an upload: spooled body, SHA-256 and size. The spool is
+    a SpooledTemporaryFile, so small resumes never touch the disk.
+    """
+
+    def __init__(self, filename, spool_bytes):
+        self.filename = filename
+        self.spool_bytes = spool_bytes
+        self.file = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+        self.hash = hashlib.sha256()
+        self.size = 0
+        self.head = b""
+
+    @property
+    def sha256(self):
+        return self.hash.hexdigest()
+
+    async def write(self, data):
+        self.hash.update(data)
+        self.size += len(data)
+        if len(self.head) < MAGIC_SEARCH_BYTES:
+            self.head += data[:MAGIC_SEARCH_BYTES - len(self.head)]
+        # The write that takes the spool past spool_bytes moves it to disk, and so does every later one
+        if self.size > self.spool_bytes:
+            await run_in_threadpool(self.file.write, data)
+        else:
+            self.file.write(data)
+
+    def read(self):
+        self.file.seek(0)
+        return self.file.read()
+
+    def close(self):
+        self.file.close()
+
+
+async def receive_resume_upload(request, max_bytes, spool_bytes=1024 * 1024, file_field="resume"):
+    """
+    Parses a multipart/form-data request with one PDF part named file_field.
+    Returns (fields, upload); the caller closes upload. Text fields are
+    decoded as UTF-8, and a repeated field keeps its last value.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type"))
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise HTTPException(status_code=415, detail="Expected a multipart/form-data upload")
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes + FIELD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Resume exceeds {max_bytes} bytes")
+
+    fields = {}
+    upload = None
+    # Parts seen by the parser callbacks; a chunk can end one part and start the next
+    parts = []
+
+    def on_part_begin():
+        parts.append({"headers": {}, "field": b"", "value": b"", "name": None, "data": [],
+                      "ready": False, "done": False})
+
+    def on_header_field(data, start, end):
+        parts[-1]["field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        parts[-1]["value"] += data[start:end]
+
+    def on_header_end():
+        part = parts[-1]
+        part["headers"][part["field"].lower()] = part["value"]
+        part["field"] = part["value"] = b""
+
+    def on_headers_finished():
+        parts[-1]["ready"] = True
+
+    def on_part_data(data, start, end):
+        parts[-1]["data"].append(data[start:end])
+
+    def on_part_end():
+        parts[-1]["done"] = True
+
+    parser = MultipartParser(options[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+
+    async def flush_parts():
+        """Moves data parsed so far out of the callback buffers into the fields and the file."""
+        nonlocal upload
+        for part in list(parts):
+            if not part["ready"]:
+                break
+            if part["name"] is None:
+                _, disposition = parse_options_header(part["headers"].get(b"content-disposition"))
+                part["name"] = disposition.get(b"name", b"").decode("utf-8", "replace")
+                if part["name"] == file_field:
+                    if upload is not None:
+                        raise HTTPException(status_code=400, detail="Only one resume file per upload")
+                    filename = disposition.get(b"filename", b"").decode("utf-8", "replace")
+                    upload = ResumeUpload(filename, spool_bytes)
+                else:
+                    if len(fields) >= MAX_FIELDS:
+                        raise HTTPException(status_code=400, detail="Too many form fields")
+                    fields[part["name"]] = b""
+            data, part["data"] = b"".join(part["data"]), []
+            if part["name"] == file_field:
+                if data:
+                    await upload.write(data)
+                if upload.size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"Resume exceeds {max_bytes} bytes")
+                if len(upload.head) >= MAGIC_SEARCH_BYTES and not looks_like_pdf(upload.head):
+                    raise HTTPException(status_code=415, detail="Resume is not a PDF file")
+            else:
+                fields[part["name"]] += data
+                if len(fields[part["name"]]) > FIELD_MAX_BYTES:
+                    raise HTTPException(status_code=413, detail=f"Form field {part['name']!r} is too large")
+            if part["done"]:
+                parts.remove(part)
+
+    try:
+        with stage("upload"):
+            async for chunk in request.stream():
+                parser.write(chunk)
+                await flush_parts()
+            parser.finalize()
+            await flush_parts()
+    except HTTPException:
+        if upload is not None:
+            upload.close()
+        raise
+    except Exception as e:
+        if upload is not None:
+            upload.close()
+        raise HTTPException(status_code=400, detail=f"Malformed multipart upload: {str(e)}")
+
+    if upload is None or upload.size == 0:
+        if upload is not None:
+            upload.close()
+        raise HTTPException(status_code=400, detail=f"Upload must include a PDF file in the {file_field!r} field")
+    if not looks_like_pdf(upload.head):
+        upload.close()
+        raise HTTPException(status_code=415, detail="Resume is not a PDF file")
+    return {name: value.decode("utf-8", "replace") for name, value in fields.items()}, upload
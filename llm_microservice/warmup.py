@@ -0,0 +1,93 @@
+"""
+Background warm-up of the slow-to-load subsystems, and readiness.
+
+Importing api.py only pays for FastAPI and the light modules, so uvicorn
+answers /health (liveness) about as soon as the process is up. The heavy
+parts - the OpenAI SDK and the OpenRouter client, the PDF backend, the
+embedding encoder, the tokenizer - load on first use, and this runs those loads in a
+thread once the lifespan handler has started, so the first real request
+usually finds them ready. /ready (readiness) answers 503 until every step
+has finished, and keeps answering 503 if one failed.
+"""
+import asyncio
+import time
+
+from fastapi.concurrency import run_in_threadpool
+
+# Step states
+PENDING = "pending"
+RUNNING = "running"
+READY = "ready"
+FAILED = "failed"
+
+
+class Warmup:
+    """
+    Ordered warm-up steps, run one after another (in parallel they would
+    only fight over the GIL that request handling needs). Plain callables
+    run in the threadpool; coroutine functions run on the event loop and
+    hand their slow parts to the threadpool themselves. A subsystem used
+    before its step ran simply loads on that request instead.
+    """
+
+    def __init__(self):
+        self.steps = {}
+        self.states = {}
+        self.seconds = {}
+        self.errors = {}
+        self.started_at = None
+        self.finished_at = None
+        self._task = None
+
+    def add(self, name, load):
+        self.steps[name] = load
+        self.states[name] = PENDING
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        for name, load in self.steps.items():
+            self.states[name] = RUNNING
+            started = time.perf_counter()
+            try:
+                if asyncio.iscoroutinefunction(load):
+                    await load()
+                else:
+                    await run_in_threadpool(load)
+                self.states[name] = READY
+            except Exception as e:
+                self.states[name] = FAILED
+                self.errors[name] = str(e)
+                print(f"Warm-up step {name} failed: {str(e)}")
+            self.seconds[name] = time.perf_counter() - started
+        self.finished_at = time.monotonic()
+        print(f"Warm-up finished in {self.finished_at - self.started_at:.2f}s "
+              f"({', '.join(f'{name} {seconds:.2f}s' for name, seconds in self.seconds.items())})")
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    @property
+    def ready(self):
+        return all(state == READY for state in self.states.values())
+
+    def stats(self):
+        return {
+            "ready": self.ready,
+            "seconds": round(self.finished_at - self.started_at, 3) if self.finished_at else None,
+            "steps": {
+                name: {
+                    "state": self.states[name],
+                    "seconds": round(self.seconds[name], 3) if name in self.seconds else None,
+                    "error": self.errors.get(name),
+                }
+                for name in self.steps
+            },
+        }
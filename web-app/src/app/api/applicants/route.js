@@ -1,7 +1,7 @@
 import { NextResponse } from 'next/server';
 import { sql } from '@/lib/db';
 import { put } from '@vercel/blob';
-import { analyzeResume } from '@/lib/fastapi';
+import { analyzeResumeUpload } from '@/lib/fastapi';
 import { sendApplicationConfirmation } from '@/lib/email';
 
 // Increase function timeout to 60 seconds for AI processing
@@ -74,7 +74,7 @@ export async function POST(request) {
 
     // Fetch job description for AI resume analysis
     const jobs = await sql`
-      SELECT job_description, job_title
+      SELECT job_description, job_title, tags
       FROM jobs WHERE job_id = ${job_id}
     `;
 
@@ -84,10 +84,14 @@ export async function POST(request) {
     if (jobs.length > 0) {
       console.log(`[Applicant ${applicant.applicant_id}] Starting AI analysis...`);
       try {
-        aiAnalysis = await analyzeResume({
-          resume_url: blob.url,
+        // Send the file we already hold instead of having the service download it from blob storage
+        aiAnalysis = await analyzeResumeUpload({
+          resume,
+          job_id: String(job_id),
+          applicant_id: String(applicant.applicant_id),
           job_description: jobs[0].job_description,
           cover_letter: detail_box,
+          job_tags: jobs[0].tags || [],
         });
         
         console.log(`[Applicant ${applicant.applicant_id}] AI analysis received:`, {
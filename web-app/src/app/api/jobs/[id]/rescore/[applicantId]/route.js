@@ -0,0 +1,45 @@
+import { NextResponse } from 'next/server';
+import { sql } from '@/lib/db';
+import { verifyRescoreToken } from '@/lib/auth';
+
+/**
+ * POST /api/jobs/[id]/rescore/[applicantId]
+ * Webhook for a queued AI re-analysis after a job edit
+ * Called by the AI service - authenticated by the token the job edit signed
+ */
+export async function POST(request, { params }) {
+  try {
+    // Await params before accessing properties (Next.js 15)
+    const { id, applicantId } = await params;
+    const jobId = parseInt(id);
+
+    const token = request.nextUrl.searchParams.get('token');
+    if (!(await verifyRescoreToken(token, jobId))) {
+      return NextResponse.json({ error: 'Unauthorized' }, { status: 401 });
+    }
+
+    // Finished analysis job: { job_id, status, result, error }
+    const body = await request.json();
+    if (body.status !== 'succeeded' || !body.result) {
+      console.error('Re-analysis failed for applicant', applicantId, 'of job', jobId, body.error);
+      return NextResponse.json({ message: 'Existing score kept' });
+    }
+
+    // Applicants analyzed outside the app are keyed by resume URL - nothing to update here
+    if (!/^\d+$/.test(applicantId)) {
+      return NextResponse.json({ message: 'Not an applicant of this app' });
+    }
+
+    await sql`
+      UPDATE applicants
+      SET ai_generated_score = ${body.result.score},
+          ai_generated_summary = ${body.result.summary}
+      WHERE applicant_id = ${parseInt(applicantId)} AND job_id = ${jobId}
+    `;
+
+    return NextResponse.json({ message: 'Applicant re-scored' });
+  } catch (error) {
+    console.error('Rescore callback error:', error);
+    return NextResponse.json({ error: 'Failed to store re-analysis' }, { status: 500 });
+  }
+}
@@ -1,6 +1,7 @@
 import { NextResponse } from 'next/server';
 import { sql } from '@/lib/db';
-import { getCurrentUser } from '@/lib/auth';
+import { generateRescoreToken, getCurrentUser } from '@/lib/auth';
+import { rescoreJob } from '@/lib/fastapi';
 
 /**
  * GET /api/auth/jobs/[id]
@@ -81,6 +82,14 @@ export async function PUT(request, { params }) {
       RETURNING *
     `;
 
+    // Re-score existing applicants against the edited job. The service answers
+    // once it has queued the AI re-analyses (applicants the edit barely affects
+    // keep their score), and each finished one is posted to the rescore callback,
+    // so the edit does not wait for the AI
+    const origin = process.env.NEXT_PUBLIC_API_URL || request.nextUrl.origin;
+    const token = await generateRescoreToken(jobId);
+    await rescoreJob(String(jobId), result[0], `${origin}/api/jobs/${jobId}/rescore/{applicant_id}?token=${token}`);
+
     // Return the updated job
     return NextResponse.json({ job: result[0] });
   } catch (error) {
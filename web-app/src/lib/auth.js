@@ -44,6 +44,21 @@ export async function getCurrentUser() {
     }
 }
 
+// Sign the token the AI service sends back when a job's re-scoring finishes
+export async function generateRescoreToken(jobId) {
+    return new SignJWT({ jobId, purpose: 'rescore' })
+        .setProtectedHeader({ alg: 'HS256' })
+        .setExpirationTime('1d')
+        .setIssuedAt()
+        .sign(JWT_SECRET);
+}
+
+// True when token was signed by generateRescoreToken for this job
+export async function verifyRescoreToken(token, jobId) {
+    const payload = token ? await verifyToken(token) : null;
+    return payload?.purpose === 'rescore' && payload.jobId === jobId;
+}
+
 // Set authentication cookie
 export async function setAuthCookie(token) {
     const cookieStore = await cookies();
@@ -63,7 +63,9 @@ export async function generateJobSummary(jobData) {
  * @param {Object} data - Resume analysis data
  * @param {string} data.resume_url - URL of the resume file
  * @param {string} data.job_description - Job description
+ * @param {string} [data.job_id] - Job ID; the service keeps the job's context under it and reuses it across applicants
  * @param {string} data.cover_letter - Cover letter or additional details from applicant
+ * @param {string[]} [data.job_tags] - Job tags, used for local keyword pre-scoring
  * @returns {Promise<{score: number, summary: string, missing_keywords: array}>} Score and summary
  */
 export async function analyzeResume(data) {
@@ -137,6 +139,116 @@ export async function analyzeResume(data) {
   }
 }
 
+/**
+ * Analyze an uploaded resume file and generate score.
+ * Sends the file itself, so the service does not download it again from storage.
+ * @param {Object} data - Resume analysis data
+ * @param {Blob} data.resume - Resume PDF file
+ * @param {string} data.job_description - Job description
+ * @param {string} [data.job_id] - Job ID; the service keeps the job's context under it and reuses it across applicants
+ * @param {string} [data.applicant_id] - Applicant ID the service stores the result under, for re-scoring after job edits
+ * @param {string} data.cover_letter - Cover letter or additional details from applicant
+ * @param {string[]} [data.job_tags] - Job tags, used for local keyword pre-scoring
+ * @returns {Promise<{score: number, summary: string, missing_keywords: array}>} Score and summary
+ */
+export async function analyzeResumeUpload(data) {
+  try {
+    const url = `${FASTAPI_URL}/api/analyze-resume/upload`;
+    console.log('[analyzeResumeUpload] Calling:', url);
+
+    const form = new FormData();
+    if (data.job_id) form.append('job_id', data.job_id);
+    if (data.applicant_id) form.append('applicant_id', data.applicant_id);
+    if (data.job_description) form.append('job_description', data.job_description);
+    if (data.cover_letter) form.append('cover_letter', data.cover_letter);
+    if (data.job_tags) form.append('job_tags', JSON.stringify(data.job_tags));
+    form.append('resume', data.resume, data.resume.name || 'resume.pdf');
+
+    const response = await fetch(url, { method: 'POST', body: form });
+
+    console.log('[analyzeResumeUpload] Response status:', response.status);
+
+    if (!response.ok) {
+      let errorDetail = `FastAPI error: ${response.status}`;
+      try {
+        const errorData = await response.json();
+        if (errorData.detail) {
+          errorDetail = errorData.detail;
+        }
+      } catch (e) {
+        errorDetail = `${response.status} ${response.statusText}`;
+      }
+      console.error('[analyzeResumeUpload] Error Details:', errorDetail);
+      throw new Error(errorDetail);
+    }
+
+    const result = await response.json();
+    return {
+      score: result.score || 0,
+      summary: result.summary || 'Analysis pending',
+      missing_keywords: result.missing_keywords || [],
+    };
+  } catch (error) {
+    console.error('[analyzeResumeUpload] ERROR:', error);
+    // Graceful degradation
+    return {
+      score: 0,
+      summary: 'AI analysis failed. Please review manually.',
+      missing_keywords: []
+    };
+  }
+}
+
+/**
+ * Re-score a job's existing applicants after the job was edited.
+ * Registers the new job text, then lets the service update stored results:
+ * applicants the edit barely affects only get their missing keywords refreshed
+ * (status 'updated', returned right away), the rest are queued for AI
+ * re-analysis and posted to callbackUrl one by one when done.
+ * @param {string} jobId - Job ID the applicants were analyzed under
+ * @param {Object} jobData - Updated job data
+ * @param {string} jobData.job_description - Job description
+ * @param {string[]} [jobData.tags] - Job tags
+ * @param {string} callbackUrl - Webhook for queued re-analyses, `{applicant_id}` is filled in by the service
+ * @returns {Promise<Array<{applicant_id: string, status: string, analysis_job_id: string|null}>>} Per-applicant outcome, empty on failure
+ */
+export async function rescoreJob(jobId, jobData, callbackUrl) {
+  try {
+    const register = await fetch(`${FASTAPI_URL}/api/jobs/${encodeURIComponent(jobId)}`, {
+      method: 'PUT',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ job_description: jobData.job_description, tags: jobData.tags || [] }),
+    });
+    if (!register.ok) {
+      throw new Error(`FastAPI error: ${register.status}`);
+    }
+    const context = await register.json();
+    if (!context.changed) {
+      return [];
+    }
+
+    const response = await fetch(`${FASTAPI_URL}/api/jobs/${encodeURIComponent(jobId)}/rescore`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ wait: false, callback_url: callbackUrl }),
+    });
+    if (!response.ok) {
+      throw new Error(`FastAPI error: ${response.status}`);
+    }
+    const result = await response.json();
+    console.log('[rescoreJob] Job', jobId, 'v' + result.version, {
+      updated: result.updated,
+      queued: result.queued,
+      failed: result.failed,
+    });
+    return result.applicants;
+  } catch (error) {
+    console.error('[rescoreJob] ERROR:', error);
+    // Graceful degradation - existing scores stay as they are
+    return [];
+  }
+}
+
 /**
  * Health check for FastAPI service
  * @returns {Promise<boolean>} True if service is healthy